@@ -5,6 +5,7 @@ This example shows how to visit a page multiple times without being
 detected as a bot.
 """
 
+from httpcache import HTTPCache
 from scraper import WebScraper
 
 def example_basic():
@@ -76,8 +77,10 @@ def example_custom():
         print("⚠️  Invalid input! The default values will be used.")
         count, min_delay, max_delay = 3, 2, 6
     
+    use_cache = input("Use the HTTP cache? Unchanged pages are only revalidated (y/n): ").strip().lower()
+    
     # Perform the visit
-    scraper = WebScraper(url)
+    scraper = WebScraper(url, cache=HTTPCache() if use_cache in ['y', 'yes'] else None)
     stats = scraper.visit_multiple_times(
         count=count,
         min_delay=min_delay,
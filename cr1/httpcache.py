@@ -0,0 +1,356 @@
+"""
+persistent HTTP cache (SQLite, WAL mode)
+  - 200 responses to GET, keyed by URL and the request headers the
+    response Varies on
+  - freshness from Cache-Control max-age (or Expires); a fresh entry is
+    served without touching the network
+  - stale entries are revalidated with If-None-Match / If-Modified-Since:
+    a 304 costs a header round-trip instead of a download, and the data
+    already extracted from the page is reused (no parse either)
+  - no-store responses are not kept; no-cache / a request asking for
+    max-age=0 always revalidate
+  - least recently used entries are evicted above `max_bytes`
+  - hits, revalidations and misses are counted
+
+CachedTransport wraps a Transport with the same get() API, so
+WebScraper(url, cache=HTTPCache()) is all a caller needs.
+"""
+
+import calendar
+import email.utils
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+# defaults
+CACHE_PATH = "http_cache/cache.sqlite"
+CACHE_MAX_BYTES = 100 * 1024 * 1024
+DEFAULT_TTL = 0  # seconds an entry without Cache-Control / Expires is fresh
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    vary TEXT NOT NULL,
+    vary_values TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    encoding TEXT,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_url ON entries (url);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at);
+CREATE TABLE IF NOT EXISTS extracted (
+    key TEXT NOT NULL,
+    parser TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (key, parser)
+);
+"""
+
+# headers of a 304 that replace the stored ones
+REVALIDATION_HEADERS = ("Cache-Control", "Date", "ETag", "Expires", "Last-Modified", "Vary")
+
+
+def cache_control(headers):
+    """
+    Returns:
+      - dict of Cache-Control directives (lowercase names, value or True)
+    """
+    directives = {}
+    for part in (headers.get("Cache-Control") or "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip().strip('"') or True
+    return directives
+
+
+def _http_date(value):
+    parsed = email.utils.parsedate(value) if value else None
+    return calendar.timegm(parsed) if parsed else None
+
+
+def freshness(headers, now, default_ttl=DEFAULT_TTL):
+    """
+    Seconds a response stays fresh: max-age, else Expires - Date, else
+    `default_ttl`; 0 for no-cache.
+    """
+    directives = cache_control(headers)
+    if "no-cache" in directives:
+        return 0
+    max_age = directives.get("max-age")
+    if isinstance(max_age, str) and max_age.isdigit():
+        return int(max_age)
+    expires = _http_date(headers.get("Expires"))
+    if headers.get("Expires") is not None:
+        # an invalid Expires (e.g. "0") means already expired
+        date = _http_date(headers.get("Date")) or now
+        return max(expires - date, 0) if expires is not None else 0
+    return default_ttl
+
+
+def _vary_names(headers):
+    return sorted({name.strip().lower() for name in (headers.get("Vary") or "").split(",") if name.strip()})
+
+
+def _vary_values(names, request_headers):
+    request_headers = CaseInsensitiveDict(request_headers or {})
+    return json.dumps([request_headers.get(name) for name in names])
+
+
+class HTTPCache:
+    """
+    Durable response store. Safe to share between threads.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES, default_ttl=DEFAULT_TTL):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        # freed pages go back to the file system after evictions
+        self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+
+    def _execute(self, sql, args=()):
+        with self._lock:
+            cursor = self.conn.execute(sql, args)
+            self.conn.commit()
+            return cursor.fetchall()
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def lookup(self, url, request_headers=None):
+        """
+        Returns:
+          - stored entry (dict) matching the URL and the Vary headers, or None
+        """
+        rows = self._execute(
+            "SELECT key, vary, vary_values, status, headers, encoding, body, expires_at "
+            "FROM entries WHERE url = ?",
+            (url,),
+        )
+        for key, vary, vary_values, status, headers, encoding, body, expires_at in rows:
+            names = json.loads(vary)
+            if _vary_values(names, request_headers) == vary_values:
+                return {
+                    "key": key, "url": url, "status": status,
+                    "headers": CaseInsensitiveDict(json.loads(headers)),
+                    "encoding": encoding, "body": body, "expires_at": expires_at,
+                }
+        return None
+
+    def touch(self, key):
+        self._execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+
+    def store(self, url, request_headers, response):
+        """
+        Keep a response if HTTP allows it.
+        Returns:
+          - entry key, None when the response is not cacheable
+        """
+        if response.status_code != 200 or response.history:
+            return None
+        if "no-store" in cache_control(response.headers):
+            return None
+
+        now = time.time()
+        names = _vary_names(response.headers)
+        if "*" in names:
+            return None
+        vary_values = _vary_values(names, request_headers)
+        key = hashlib.sha256(f"{url}\n{vary_values}".encode("utf-8")).hexdigest()
+        headers = json.dumps(dict(response.headers))
+        body = response.content
+        expires_at = now + freshness(response.headers, now, self.default_ttl)
+
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries (key, url, vary, vary_values, status, headers, encoding, "
+                "body, size, stored_at, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, json.dumps(names), vary_values, response.status_code, headers,
+                 response.encoding, body, len(body) + len(headers), now, expires_at, now),
+            )
+            # the body changed: data extracted from the old one is stale
+            self.conn.execute("DELETE FROM extracted WHERE key = ?", (key,))
+            self.conn.commit()
+            self.stored += 1
+        self._evict()
+        return key
+
+    def refresh(self, entry, response):
+        """
+        Apply a 304: take its validators and freshness, keep the body.
+        Returns:
+          - the updated entry
+        """
+        now = time.time()
+        headers = entry["headers"]
+        for name in REVALIDATION_HEADERS:
+            if name in response.headers:
+                headers[name] = response.headers[name]
+        entry["expires_at"] = now + freshness(headers, now, self.default_ttl)
+        self._execute(
+            "UPDATE entries SET headers = ?, expires_at = ?, accessed_at = ? WHERE key = ?",
+            (json.dumps(dict(headers)), entry["expires_at"], now, entry["key"]),
+        )
+        return entry
+
+    def _evict(self):
+        # least recently used entries go first
+        with self._lock:
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            evicted = []
+            for key, size in self.conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+                if total <= self.max_bytes:
+                    break
+                evicted.append((key,))
+                total -= size
+            self.conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+            self.conn.executemany("DELETE FROM extracted WHERE key = ?", evicted)
+            self.conn.commit()
+            self.conn.execute("PRAGMA incremental_vacuum")
+            self.evicted += len(evicted)
+
+    def load_extracted(self, key, parser):
+        """
+        Returns:
+          - data a parser backend extracted from the entry's body, or None
+        """
+        rows = self._execute("SELECT data FROM extracted WHERE key = ? AND parser = ?", (key, parser))
+        return json.loads(rows[0][0]) if rows else None
+
+    def save_extracted(self, key, parser, data):
+        self._execute(
+            "INSERT OR REPLACE INTO extracted (key, parser, data) "
+            "SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM entries WHERE key = ?)",
+            (key, parser, json.dumps(data), key),
+        )
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM entries")
+            self.conn.execute("DELETE FROM extracted")
+            self.conn.commit()
+            self.conn.execute("PRAGMA incremental_vacuum")
+
+    def stats(self):
+        rows = self._execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries")
+        lookups = self.hits + self.revalidated + self.misses
+        return {
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.revalidated) / lookups, 4) if lookups else 0.0,
+            "stored": self.stored,
+            "evicted": self.evicted,
+            "entries": rows[0][0],
+            "bytes": rows[0][1],
+        }
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def _from_entry(entry):
+    # stored entry -> requests.Response so callers only see one API
+    response = requests.Response()
+    response.status_code = entry["status"]
+    response.headers = CaseInsensitiveDict(entry["headers"])
+    response._content = entry["body"]
+    response.url = entry["url"]
+    response.reason = "OK"
+    response.encoding = entry["encoding"]
+    return response
+
+
+class CachedTransport:
+    """
+    Transport wrapper answering GETs from an HTTPCache. Responses carry
+    `cache_key` (None if not cached) and `cache_status`: hit,
+    revalidated, miss or bypass.
+    """
+
+    def __init__(self, transport, cache):
+        self.transport = transport
+        self.cache = cache
+
+    def get(self, url, params=None, headers=None, timeout=30, allow_redirects=True):
+        """
+        GET through the cache.
+        Returns:
+          - requests.Response
+        Raises:
+          - requests.exceptions.RequestException on network errors
+        """
+        if params:
+            url = requests.Request("GET", url, params=params).prepare().url
+        request_cc = cache_control(headers or {})
+        if "no-store" in request_cc:
+            response = self.transport.get(url, headers=headers, timeout=timeout, allow_redirects=allow_redirects)
+            response.cache_key, response.cache_status = None, "bypass"
+            return response
+
+        entry = self.cache.lookup(url, headers)
+        revalidate = "no-cache" in request_cc or request_cc.get("max-age") == "0"
+        if entry is not None and not revalidate and entry["expires_at"] > time.time():
+            self.cache.touch(entry["key"])
+            self.cache._count("hits")
+            response = _from_entry(entry)
+            response.cache_key, response.cache_status = entry["key"], "hit"
+            return response
+
+        conditional = dict(headers or {})
+        if entry is not None:
+            if entry["headers"].get("ETag"):
+                conditional["If-None-Match"] = entry["headers"]["ETag"]
+            if entry["headers"].get("Last-Modified"):
+                conditional["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+
+        response = self.transport.get(url, headers=conditional, timeout=timeout, allow_redirects=allow_redirects)
+        if response.status_code == 304 and entry is not None:
+            self.cache._count("revalidated")
+            response = _from_entry(self.cache.refresh(entry, response))
+            response.cache_key, response.cache_status = entry["key"], "revalidated"
+            return response
+
+        self.cache._count("misses")
+        response.cache_key = self.cache.store(url, headers, response)
+        response.cache_status = "miss"
+        return response
+
+    def stats(self):
+        return self.transport.stats()
+
+    def close(self):
+        self.transport.close()
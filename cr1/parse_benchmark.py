@@ -0,0 +1,179 @@
+"""
+parse benchmark for the WebScraper parser backends
+  - parses every saved .html / .htm file of a corpus (e.g. pages written
+    by WebScraper.save_html) with each installed backend
+  - reports ms/page for parsing and for extraction (title, links, images,
+    text), and the peak memory growth while parsing
+  - each backend runs in a fresh process, so the peak RSS of one does not
+    hide the next one (RSS covers the C parsers too, unlike tracemalloc)
+  - results are compared page by page with the html.parser backend
+
+usage:
+  python parse_benchmark.py saved_pages/
+  python parse_benchmark.py saved_pages/ --parsers lxml selectolax --repeat 5
+"""
+
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from typing import Dict, List
+
+from parsers import DEFAULT_PARSER, available_backends, get_backend
+
+try:
+    import resource
+except ImportError:  # Windows: no peak memory
+    resource = None
+
+
+def find_pages(paths: List[str]) -> List[str]:
+    """
+    HTML files of the corpus
+
+    Args:
+        paths: Files and directories (searched recursively)
+
+    Returns:
+        Sorted list of file paths
+    """
+    pages = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                pages.extend(os.path.join(root, name) for name in files
+                             if name.lower().endswith(('.html', '.htm')))
+        elif os.path.isfile(path):
+            pages.append(path)
+    return sorted(pages)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process in MB (0 if unknown)"""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def fingerprint(extracted: Dict[str, any]) -> Dict[str, str]:
+    """Short digest of every extracted field, for comparing backends"""
+    return {
+        field: hashlib.blake2b(json.dumps(value).encode('utf-8'), digest_size=8).hexdigest()
+        for field, value in extracted.items()
+    }
+
+
+def run_backend(name: str, pages: List[str], repeat: int) -> Dict[str, any]:
+    """
+    Parse and extract every page `repeat` times (runs in a child process)
+
+    Returns:
+        Timings, peak memory growth and the fingerprints of the last pass
+    """
+    backend = get_backend(name)
+    html = []
+    for path in pages:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            html.append(f.read())
+
+    baseline = peak_rss_mb()
+    parse_seconds = extract_seconds = 0.0
+    fingerprints = []
+    for _ in range(repeat):
+        fingerprints = []
+        for content in html:
+            started = time.perf_counter()
+            document = backend.parse(content)
+            parsed = time.perf_counter()
+            extracted = backend.extract(document)
+            parse_seconds += parsed - started
+            extract_seconds += time.perf_counter() - parsed
+            fingerprints.append(fingerprint(extracted))
+            del document
+
+    runs = max(len(html) * repeat, 1)
+    return {
+        'parse_ms': parse_seconds / runs * 1000,
+        'extract_ms': extract_seconds / runs * 1000,
+        'peak_mb': peak_rss_mb() - baseline,
+        'fingerprints': fingerprints,
+    }
+
+
+def benchmark(pages: List[str], names: List[str], repeat: int = 3) -> Dict[str, Dict[str, any]]:
+    """
+    Run every backend in its own process
+
+    Returns:
+        Results per backend name
+    """
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for name in names:
+        print(f"⏱️  {name} ...")
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results[name] = pool.submit(run_backend, name, pages, repeat).result()
+    return results
+
+
+def agreement(results: Dict[str, Dict[str, any]], reference: str) -> Dict[str, Dict[str, int]]:
+    """
+    Pages on which each field matches the reference backend
+
+    Returns:
+        {backend: {field: matching pages}}
+    """
+    expected = results[reference]['fingerprints']
+    matches = {}
+    for name, result in results.items():
+        matches[name] = {
+            field: sum(1 for a, b in zip(result['fingerprints'], expected) if a[field] == b[field])
+            for field in ('title', 'links', 'images', 'text')
+        }
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark the HTML parser backends on saved pages")
+    parser.add_argument('corpus', nargs='+', help="HTML files or directories of saved pages")
+    parser.add_argument('--parsers', nargs='+', default=None,
+                        help=f"backends to compare (default: all installed: {', '.join(available_backends())})")
+    parser.add_argument('--repeat', type=int, default=3, help="passes over the corpus per backend")
+    parser.add_argument('--reference', default=DEFAULT_PARSER, help="backend whose results count as correct")
+    args = parser.parse_args()
+
+    pages = find_pages(args.corpus)
+    if not pages:
+        print("❌ No .html files found in the corpus!")
+        return
+
+    names = args.parsers or available_backends()
+    for name in names + [args.reference]:
+        get_backend(name)  # fail early on unknown or missing backends
+    if args.reference not in names:
+        names = [args.reference] + names
+
+    size_mb = sum(os.path.getsize(path) for path in pages) / (1024 * 1024)
+    print(f"📂 {len(pages)} pages, {size_mb:.1f} MB, {args.repeat} passes\n")
+    results = benchmark(pages, names, args.repeat)
+    matches = agreement(results, args.reference)
+
+    print(f"\n{'='*78}")
+    print(f"{'parser':<14}{'parse ms/page':>14}{'extract ms/page':>16}{'peak MB':>9}"
+          f"   matches {args.reference} (title/links/images/text)")
+    print(f"{'='*78}")
+    for name in sorted(names, key=lambda n: results[n]['parse_ms'] + results[n]['extract_ms']):
+        result, match = results[name], matches[name]
+        print(f"{name:<14}{result['parse_ms']:>14.2f}{result['extract_ms']:>16.2f}{result['peak_mb']:>9.1f}"
+              f"   {match['title']}/{match['links']}/{match['images']}/{match['text']} of {len(pages)}")
+    print(f"{'='*78}\n")
+
+
+if __name__ == '__main__':
+    main()
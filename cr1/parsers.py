@@ -0,0 +1,244 @@
+"""
+HTML parser backends for WebScraper
+  - "html.parser": BeautifulSoup with the pure-Python parser (default, no extra install)
+  - "bs4-lxml": BeautifulSoup on top of lxml (same soup, faster tree building)
+  - "lxml": lxml.html tree, no soup at all (pip install lxml)
+  - "selectolax": lexbor engine through selectolax (pip install selectolax)
+
+Every backend extracts the same data: title, links (a[href]), images
+(img[src]) and the page text as soup.get_text('\\n', strip=True) gives it,
+so comments and the contents of script, style, template, rt and rp are
+left out.
+"""
+
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup, NavigableString, CData, Tag
+
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:  # the lxml backends are optional
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # selectolax is optional
+    LexborHTMLParser = None
+
+
+DEFAULT_PARSER = 'html.parser'
+
+# Elements whose strings BeautifulSoup does not count as page text
+SKIPPED_TEXT_TAGS = frozenset(('script', 'style', 'template', 'rt', 'rp'))
+
+
+class ParserBackend:
+    """Parses HTML and extracts title, links, images and text in one pass"""
+
+    name = None
+
+    def available(self) -> bool:
+        return True
+
+    def parse(self, html: str):
+        """
+        Build the document tree
+
+        Args:
+            html: Page HTML
+
+        Returns:
+            Backend-specific document (None for an empty page)
+        """
+        raise NotImplementedError
+
+    def extract(self, document) -> Dict[str, any]:
+        """
+        Walk the document once
+
+        Returns:
+            Dictionary with title, links, images and text
+        """
+        raise NotImplementedError
+
+    def to_soup(self, document, html: str) -> BeautifulSoup:
+        """
+        BeautifulSoup view of the page, for code that works on the soup
+
+        Returns:
+            The document itself for soup backends, else a new soup of the HTML
+        """
+        return BeautifulSoup(html, 'html.parser')
+
+
+def _result(title: Optional[str], links: List[str], images: List[str], text: List[str]) -> Dict[str, any]:
+    return {'title': title, 'links': links, 'images': images, 'text': '\n'.join(text)}
+
+
+class SoupBackend(ParserBackend):
+    """BeautifulSoup with one of its tree builders"""
+
+    def __init__(self, name: str, features: str):
+        self.name = name
+        self.features = features
+
+    def available(self) -> bool:
+        return self.features != 'lxml' or lxml is not None
+
+    def parse(self, html: str):
+        return BeautifulSoup(html, self.features)
+
+    def extract(self, document) -> Dict[str, any]:
+        # Same strings as soup.get_text(): no comments, doctypes, scripts...
+        text_types = document.interesting_string_types or (NavigableString, CData)
+        title_tag = None
+        links, images, text = [], [], []
+        for node in document.descendants:
+            if isinstance(node, Tag):
+                if node.name == 'a' and node.get('href') is not None:
+                    links.append(node['href'])
+                elif node.name == 'img' and node.get('src') is not None:
+                    images.append(node['src'])
+                elif node.name == 'title' and title_tag is None:
+                    title_tag = node
+            elif type(node) in text_types:
+                stripped = node.strip()
+                if stripped:
+                    text.append(stripped)
+
+        title = title_tag.get_text().strip() if title_tag else None
+        return _result(title, links, images, text)
+
+    def to_soup(self, document, html: str) -> BeautifulSoup:
+        return document
+
+
+class LxmlBackend(ParserBackend):
+    """lxml.html tree walked with start / end events (text, then tail)"""
+
+    name = 'lxml'
+
+    def available(self) -> bool:
+        return lxml is not None
+
+    def parse(self, html: str):
+        if not html.strip():
+            return None
+        try:
+            return lxml.html.document_fromstring(html)
+        except ValueError:
+            # a str with an XML encoding declaration: let lxml decode the bytes
+            return lxml.html.document_fromstring(html.encode('utf-8'))
+
+    def extract(self, document) -> Dict[str, any]:
+        title = None
+        links, images, text = [], [], []
+        if document is None:
+            return _result(title, links, images, text)
+
+        skipped = 0
+        for event, element in lxml.etree.iterwalk(document, events=('start', 'end')):
+            tag = element.tag
+            special = not isinstance(tag, str)  # comments and processing instructions
+            if event == 'start':
+                if special:
+                    continue
+                if tag in SKIPPED_TEXT_TAGS:
+                    skipped += 1
+                elif tag == 'a' and element.get('href') is not None:
+                    links.append(element.get('href'))
+                elif tag == 'img' and element.get('src') is not None:
+                    images.append(element.get('src'))
+                elif tag == 'title' and title is None:
+                    title = element.text_content().strip()
+                if element.text and not skipped:
+                    stripped = element.text.strip()
+                    if stripped:
+                        text.append(stripped)
+            else:
+                if not special and tag in SKIPPED_TEXT_TAGS:
+                    skipped -= 1
+                if element.tail and not skipped:
+                    stripped = element.tail.strip()
+                    if stripped:
+                        text.append(stripped)
+
+        return _result(title, links, images, text)
+
+
+class SelectolaxBackend(ParserBackend):
+    """selectolax / lexbor: C parser, nodes visited in document order"""
+
+    name = 'selectolax'
+
+    def available(self) -> bool:
+        return LexborHTMLParser is not None
+
+    def parse(self, html: str):
+        return LexborHTMLParser(html) if html.strip() else None
+
+    def extract(self, document) -> Dict[str, any]:
+        title = None
+        links, images, text = [], [], []
+        if document is None or document.root is None:
+            return _result(title, links, images, text)
+
+        for node in document.root.traverse(include_text=True):
+            tag = node.tag
+            if tag == '-text':
+                if node.parent is not None and node.parent.tag in SKIPPED_TEXT_TAGS:
+                    continue
+                stripped = node.text_content.strip()
+                if stripped:
+                    text.append(stripped)
+            elif tag == 'a':
+                href = node.attributes.get('href', False)
+                if href is not False:
+                    links.append(href or '')
+            elif tag == 'img':
+                src = node.attributes.get('src', False)
+                if src is not False:
+                    images.append(src or '')
+            elif tag == 'title' and title is None:
+                title = node.text(deep=True).strip()
+
+        return _result(title, links, images, text)
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (
+        SoupBackend('html.parser', 'html.parser'),
+        SoupBackend('bs4-lxml', 'lxml'),
+        LxmlBackend(),
+        SelectolaxBackend(),
+    )
+}
+
+
+def get_backend(name: Optional[str] = None) -> ParserBackend:
+    """
+    Look up a parser backend
+
+    Args:
+        name: Backend name (DEFAULT_PARSER if None)
+
+    Returns:
+        The backend
+
+    Raises:
+        ValueError: Unknown backend, or its package is not installed
+    """
+    name = name or DEFAULT_PARSER
+    backend = BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"Unknown parser {name!r}, choose one of {', '.join(BACKENDS)}")
+    if not backend.available():
+        raise ValueError(f"Parser {name!r} is not installed")
+    return backend
+
+
+def available_backends() -> List[str]:
+    """Names of the backends whose packages are installed"""
+    return [name for name, backend in BACKENDS.items() if backend.available()]
@@ -8,8 +8,25 @@ from bs4 import BeautifulSoup
 import time
 import random
 from datetime import datetime
+import os
+import sys
 from typing import List, Dict, Optional
 
+# transport and metrics come from the shared crawler package (../crawler)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from crawler.metrics import Metrics, SnapshotWriter, LATENCY_BUCKETS, PHASE_BUCKETS
+from crawler.transport import Transport, get_transport
+from httpcache import CachedTransport, HTTPCache
+from parsers import ParserBackend, get_backend
+
+# process-wide scraper metrics (serve with metrics.serve(METRICS, port))
+METRICS = Metrics("scraper")
+METRICS.counter("requests_total", "Page visits by HTTP status (error = no response)")
+METRICS.counter("response_bytes_total", "Response body bytes received")
+METRICS.histogram("request_seconds", "Request latency", LATENCY_BUCKETS)
+METRICS.histogram("phase_seconds", "Time spent per phase: fetch, parse, sleep", PHASE_BUCKETS)
+
 
 class WebScraper:
     """Scraper class with anti-bot detection capabilities"""
@@ -25,18 +42,41 @@ class WebScraper:
         'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36'
     ]
     
-    def __init__(self, url: str):
+    def __init__(
+        self,
+        url: str,
+        transport: Optional[Transport] = None,
+        parser: Optional[str] = None,
+        cache: Optional[HTTPCache] = None
+    ):
         """
         Class constructor
         
         Args:
             url: Web page URL
+            transport: Pooled HTTP transport (shared process-wide transport by default)
+            parser: HTML parser backend: html.parser (default), bs4-lxml, lxml or selectolax
+            cache: Persistent HTTP cache (ETag / Last-Modified revalidation, Cache-Control TTLs)
+        
+        Raises:
+            ValueError: Unknown parser, or its package is not installed
         """
         self.url = url
-        self.soup = None
-        self.html_content = None
+        self.transport = transport or get_transport()
+        self.cache = cache
+        if cache is not None:
+            self.transport = CachedTransport(self.transport, cache)
+        self.parser: ParserBackend = get_backend(parser)
+        # The page is decoded and parsed only when something needs it
+        self._page = None
+        self._html: Optional[str] = None
+        self._document = None
+        self._parsed = False
+        self._soup = None
         self.response = None
+        self._extracted: Optional[Dict[str, any]] = None
         self.visit_history: List[Dict] = []
+        self.timings: Dict[str, float] = {'fetch': 0.0, 'parse': 0.0, 'sleep': 0.0}
         
     def _get_random_headers(self) -> Dict[str, str]:
         """
@@ -76,12 +116,14 @@ class WebScraper:
             'Upgrade-Insecure-Requests': '1'
         }
     
-    def visit_page(self, random_agent: bool = False) -> bool:
+    def visit_page(self, random_agent: bool = False, fetch_only: bool = False) -> bool:
         """
-        Visit a web page
+        Visit a web page; the HTML is decoded and parsed later, when an
+        extraction method, soup or print_summary needs it
         
         Args:
             random_agent: Use random User-Agent
+            fetch_only: Only fetch the page and drop its content (no decoding or parsing)
             
         Returns:
             True on success, False on failure
@@ -92,33 +134,45 @@ class WebScraper:
             
             # Send request
             print(f"🌐 Visiting: {self.url}")
-            self.response = requests.get(
+            started = time.perf_counter()
+            self.response = self.transport.get(
                 self.url, 
                 headers=headers, 
                 timeout=10,
                 allow_redirects=True
             )
+            self._record('fetch', time.perf_counter() - started)
+            METRICS.observe('request_seconds', time.perf_counter() - started)
+            METRICS.inc('requests_total', status=self.response.status_code)
+            cache_status = getattr(self.response, 'cache_status', None)
+            if cache_status not in ('hit', 'revalidated'):
+                METRICS.inc('response_bytes_total', len(self.response.content))
             
             # Check response status
             self.response.raise_for_status()
             
-            # Process HTML
-            self.html_content = self.response.text
-            self.soup = BeautifulSoup(self.html_content, 'html.parser')
+            # Keep the page for lazy parsing (a fetch-only visit leaves no page)
+            self._set_page(None if fetch_only else self.response)
             
             # Record in history
-            self.visit_history.append({
+            visit = {
                 'time': datetime.now(),
                 'status': self.response.status_code,
                 'success': True,
                 'url': self.url
-            })
+            }
+            if cache_status:
+                visit['cache'] = cache_status
+            self.visit_history.append(visit)
             
-            print(f"✅ Visit successful - Status code: {self.response.status_code}")
+            cached = f" ({cache_status})" if cache_status in ('hit', 'revalidated') else ""
+            print(f"✅ Visit successful - Status code: {self.response.status_code}{cached}")
             return True
             
         except requests.exceptions.RequestException as e:
             print(f"❌ Visit error: {e}")
+            if e.response is None:
+                METRICS.inc('requests_total', status='error')
             
             # Record error in history
             self.visit_history.append({
@@ -131,21 +185,37 @@ class WebScraper:
             
             return False
     
+    def _record(self, phase: str, seconds: float):
+        """
+        Add time spent in a phase to this scraper's totals and the metrics
+        
+        Args:
+            phase: fetch, parse or sleep
+            seconds: Elapsed seconds
+        """
+        self.timings[phase] += seconds
+        METRICS.observe('phase_seconds', seconds, phase=phase)
+    
     def visit_multiple_times(
         self, 
         count: int = 3, 
         min_delay: int = 2, 
         max_delay: int = 5,
-        random_agent: bool = True
+        random_agent: bool = True,
+        metrics_path: Optional[str] = None,
+        fetch_only: bool = False
     ) -> Dict[str, any]:
         """
-        Multiple page visits with random delays (to avoid bot detection)
+        Multiple page visits with random delays (to avoid bot detection).
+        Pages are not parsed during the visits; only the last one is, if it is used.
         
         Args:
             count: Number of visits
             min_delay: Minimum delay between visits (seconds)
             max_delay: Maximum delay between visits (seconds)
             random_agent: Use random User-Agent
+            metrics_path: Write a JSON metrics snapshot to this file (every minute and at the end)
+            fetch_only: Drop the content of every visit (nothing left to extract afterwards)
             
         Returns:
             Dictionary containing visit statistics
@@ -157,12 +227,14 @@ class WebScraper:
         print(f"{'='*70}\n")
         
         success_count = 0
+        timings_before = dict(self.timings)
+        snapshots = SnapshotWriter(METRICS, metrics_path) if metrics_path else None
         
         for i in range(count):
             print(f"📍 Visit {i + 1}/{count}")
             
             # Visit the page
-            if self.visit_page(random_agent=random_agent):
+            if self.visit_page(random_agent=random_agent, fetch_only=fetch_only):
                 success_count += 1
             
             # Random delay between visits (except for the last visit)
@@ -170,24 +242,133 @@ class WebScraper:
                 delay = random.uniform(min_delay, max_delay)
                 print(f"⏳ Waiting {delay:.1f} seconds until next visit...\n")
                 time.sleep(delay)
+                self._record('sleep', delay)
+        
+        if snapshots:
+            snapshots.close()
         
         # Calculate statistics
         stats = {
             'total': count,
             'success': success_count,
             'failed': count - success_count,
-            'success_rate': (success_count / count) * 100 if count > 0 else 0
+            'success_rate': (success_count / count) * 100 if count > 0 else 0,
+            'connections': self.transport.stats(),
+            'timings': {
+                phase: round(seconds - timings_before[phase], 3)
+                for phase, seconds in self.timings.items()
+            }
         }
+        if self.cache is not None:
+            stats['cache'] = self.cache.stats()
         
         print(f"\n{'='*70}")
         print(f"📊 Final statistics:")
         print(f"   ✅ Successful: {stats['success']}")
         print(f"   ❌ Failed: {stats['failed']}")
         print(f"   📈 Success rate: {stats['success_rate']:.1f}%")
+        print(f"   🔌 New connections: {stats['connections']['new_connections']}, "
+              f"reused: {stats['connections']['reused_connections']}")
+        print(f"   ⏱️  Fetch: {stats['timings']['fetch']:.2f}s, "
+              f"parse: {stats['timings']['parse']:.2f}s, "
+              f"sleep: {stats['timings']['sleep']:.2f}s")
+        if 'cache' in stats:
+            print(f"   💾 Cache: {stats['cache']['hits']} hits, {stats['cache']['revalidated']} revalidated, "
+                  f"{stats['cache']['misses']} misses")
         print(f"{'='*70}\n")
         
         return stats
     
+    def _set_page(self, response, html: Optional[str] = None):
+        """
+        Replace the current page and drop everything derived from the previous one
+        
+        Args:
+            response: Response holding the page, or None
+            html: Already decoded HTML (decoded from the response if None)
+        """
+        self._page = response
+        self._html = html
+        self._document = None
+        self._parsed = False
+        self._soup = None
+        self._extracted = None
+    
+    @property
+    def html_content(self) -> Optional[str]:
+        """
+        HTML of the last page, decoded on first use
+        
+        Returns:
+            HTML string or None
+        """
+        if self._html is None and self._page is not None:
+            started = time.perf_counter()
+            self._html = self._page.text
+            self._record('parse', time.perf_counter() - started)
+        return self._html
+    
+    @html_content.setter
+    def html_content(self, html: Optional[str]):
+        self._set_page(None, html)
+    
+    @property
+    def document(self):
+        """
+        Parse tree of the last page in the parser backend's format, parsed on first use
+        
+        Returns:
+            Backend document or None
+        """
+        if not self._parsed:
+            html = self.html_content
+            if html is None:
+                return None
+            started = time.perf_counter()
+            self._document = self.parser.parse(html)
+            self._parsed = True
+            self._record('parse', time.perf_counter() - started)
+        return self._document
+    
+    @property
+    def soup(self) -> Optional[BeautifulSoup]:
+        """
+        BeautifulSoup of the last page; built on first use when the parser
+        backend is not a soup one
+        
+        Returns:
+            BeautifulSoup object or None before a successful visit
+        """
+        if self._soup is None and self.html_content is not None:
+            self._soup = self.parser.to_soup(self.document, self.html_content)
+        return self._soup
+    
+    def _extract(self) -> Optional[Dict[str, any]]:
+        """
+        Collect title, links, images and text in a single walk over the
+        parse tree; the result is cached until the next visit_page
+        
+        Returns:
+            Dictionary of extracted data, or None before a successful visit
+        """
+        if self._extracted is not None or self.html_content is None:
+            return self._extracted
+        
+        # An unchanged cached page keeps what was extracted from it last time
+        cache_key = getattr(self._page, 'cache_key', None) if self.cache is not None else None
+        if cache_key:
+            self._extracted = self.cache.load_extracted(cache_key, self.parser.name)
+            if self._extracted is not None:
+                return self._extracted
+        
+        document = self.document
+        started = time.perf_counter()
+        self._extracted = self.parser.extract(document)
+        self._record('parse', time.perf_counter() - started)
+        if cache_key:
+            self.cache.save_extracted(cache_key, self.parser.name, self._extracted)
+        return self._extracted
+    
     def get_title(self) -> Optional[str]:
         """
         Extract page title
@@ -195,10 +376,8 @@ class WebScraper:
         Returns:
             Page title or None
         """
-        if self.soup:
-            title_tag = self.soup.find('title')
-            return title_tag.get_text().strip() if title_tag else None
-        return None
+        extracted = self._extract()
+        return extracted['title'] if extracted else None
     
     def get_links(self) -> List[str]:
         """
@@ -207,12 +386,8 @@ class WebScraper:
         Returns:
             List of link URLs
         """
-        if self.soup:
-            links = []
-            for link in self.soup.find_all('a', href=True):
-                links.append(link['href'])
-            return links
-        return []
+        extracted = self._extract()
+        return list(extracted['links']) if extracted else []
     
     def get_images(self) -> List[str]:
         """
@@ -221,12 +396,8 @@ class WebScraper:
         Returns:
             List of image URLs
         """
-        if self.soup:
-            images = []
-            for img in self.soup.find_all('img', src=True):
-                images.append(img['src'])
-            return images
-        return []
+        extracted = self._extract()
+        return list(extracted['images']) if extracted else []
     
     def get_text(self) -> Optional[str]:
         """
@@ -235,9 +406,8 @@ class WebScraper:
         Returns:
             Page text or None
         """
-        if self.soup:
-            return self.soup.get_text(separator='\n', strip=True)
-        return None
+        extracted = self._extract()
+        return extracted['text'] if extracted else None
     
     def save_html(self, filename: str = "output.html") -> bool:
         """
@@ -273,7 +443,7 @@ class WebScraper:
     
     def print_summary(self):
         """Print summary of extracted information"""
-        if not self.soup:
+        if self._page is None and self._html is None:
             print("❌ You must visit the page first!")
             return
         
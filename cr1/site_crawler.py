@@ -0,0 +1,539 @@
+"""
+site crawler built on WebScraper
+  - seeds from one or more URLs and follows get_links() breadth first
+  - frontier with URL normalization and dedup, a max depth and a max page count
+  - obeys robots.txt (Disallow and Crawl-delay), fetched once per host
+  - bounded worker pool, polite per host: at most `per_host` requests at
+    a time and `delay` seconds between request starts on the same host,
+    so more workers help when there are more hosts (or a higher per_host)
+  - prints pages/s and the frontier size while running
+
+usage:
+  python site_crawler.py https://example.com --workers 8 --max-depth 2
+  python site_crawler.py https://a.example https://b.example --max-pages 500 --out pages.ndjson
+"""
+
+import argparse
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+# transport and metrics come from the shared crawler package (../crawler)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from crawler.metrics import serve
+from crawler.transport import Transport, get_transport
+from httpcache import CACHE_PATH, HTTPCache
+from parsers import DEFAULT_PARSER
+from scraper import METRICS, WebScraper
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url: str, base: Optional[str] = None) -> Optional[str]:
+    """
+    Canonical form of a link, used as the frontier's dedup key
+
+    Args:
+        url: Absolute or relative URL (href)
+        base: URL of the page the link was found on
+
+    Returns:
+        Absolute http(s) URL without fragment and default port, lowercase
+        scheme and host, '/' for an empty path; None for other schemes
+    """
+    url = urljoin(base, url.strip()) if base else url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+
+    host = parts.hostname.lower()
+    if ':' in host:
+        host = f'[{host}]'
+    if port is not None and port != DEFAULT_PORTS[scheme]:
+        host = f'{host}:{port}'
+    return urlunsplit((scheme, host, parts.path or '/', parts.query, ''))
+
+
+def host_of(url: str) -> str:
+    """Host (with a non-default port) of a normalized URL"""
+    return urlsplit(url).netloc
+
+
+class RobotsCache:
+    """robots.txt rules per host, fetched through the transport on first use"""
+
+    def __init__(self, transport: Transport, user_agent: str):
+        self.transport = transport
+        self.user_agent = user_agent
+        self._rules: Dict[str, RobotFileParser] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _fetch(self, url: str) -> RobotFileParser:
+        parts = urlsplit(url)
+        rules = RobotFileParser(f'{parts.scheme}://{parts.netloc}/robots.txt')
+        try:
+            response = self.transport.get(rules.url, headers={'User-Agent': self.user_agent}, timeout=10)
+        except requests.exceptions.RequestException as e:
+            # the pages of an unreachable host fail on their own
+            print(f"⚠️  robots.txt of {parts.netloc} not available: {e}")
+            rules.allow_all = True
+            return rules
+
+        if response.status_code in (401, 403) or response.status_code >= 500:
+            # same as urllib.robotparser for 401 / 403; a failing server is not crawled either
+            rules.disallow_all = True
+        elif response.status_code >= 400:
+            rules.allow_all = True
+        else:
+            rules.parse(response.text.splitlines())
+        return rules
+
+    def rules(self, url: str) -> RobotFileParser:
+        """
+        Rules of the URL's host (fetched once, other workers wait for it)
+        """
+        host = host_of(url)
+        with self._lock:
+            rules = self._rules.get(host)
+            if rules is not None:
+                return rules
+            host_lock = self._locks.setdefault(host, threading.Lock())
+        with host_lock:
+            with self._lock:
+                rules = self._rules.get(host)
+            if rules is None:
+                rules = self._fetch(url)
+                with self._lock:
+                    self._rules[host] = rules
+        return rules
+
+    def allowed(self, url: str) -> bool:
+        return self.rules(url).can_fetch(self.user_agent, url)
+
+    def crawl_delay(self, url: str) -> Optional[float]:
+        delay = self.rules(url).crawl_delay(self.user_agent)
+        return float(delay) if delay is not None else None
+
+
+class Frontier:
+    """
+    URLs to crawl, one FIFO queue per host. get() hands out a URL of a
+    host that is due (its delay passed and it has a free slot) and blocks
+    until one is; it returns None once everything is crawled, the page
+    limit is reached or close() was called.
+    """
+
+    def __init__(self, delay: float = 1.0, per_host: int = 1, max_pages: Optional[int] = None):
+        self.delay = delay
+        self.per_host = per_host
+        self.max_pages = max_pages
+        self._cond = threading.Condition()
+        self._queues: Dict[str, Deque[Tuple[str, int]]] = {}
+        self._due: List[Tuple[float, str]] = []    # heap of (time, host)
+        self._scheduled = set()                     # hosts in the heap
+        self._next_start: Dict[str, float] = {}
+        self._delays: Dict[str, float] = {}
+        self._active: Dict[str, int] = {}
+        self.seen = set()
+        self.queued = 0
+        self.in_flight = 0
+        self.dispatched = 0
+        self.closed = False
+
+    def _schedule(self, host: str):
+        # called with the lock held
+        if host in self._scheduled or not self._queues.get(host):
+            return
+        if self._active.get(host, 0) >= self.per_host:
+            return
+        heapq.heappush(self._due, (self._next_start.get(host, 0.0), host))
+        self._scheduled.add(host)
+        self._cond.notify()
+
+    def add(self, url: str, depth: int) -> bool:
+        """
+        Queue a normalized URL
+
+        Returns:
+            True if the URL was new
+        """
+        with self._cond:
+            if url in self.seen or self.closed:
+                return False
+            self.seen.add(url)
+            host = host_of(url)
+            self._queues.setdefault(host, deque()).append((url, depth))
+            self.queued += 1
+            self._schedule(host)
+            return True
+
+    def mark_seen(self, url: str) -> bool:
+        """
+        Remember a URL reached or refused without queueing it (e.g. a
+        redirect target, a page disallowed by robots.txt)
+
+        Returns:
+            True if the URL was new
+        """
+        with self._cond:
+            if url in self.seen:
+                return False
+            self.seen.add(url)
+            return True
+
+    def set_delay(self, host: str, delay: float):
+        """Use a longer delay for a host (robots.txt Crawl-delay)"""
+        with self._cond:
+            self._delays[host] = max(self.delay, delay)
+
+    def _finished(self) -> bool:
+        if self.closed:
+            return True
+        if self.max_pages is not None and self.dispatched >= self.max_pages:
+            return True
+        return not self.queued and not self.in_flight
+
+    def get(self) -> Optional[Tuple[str, int]]:
+        """
+        Next (url, depth), waiting for a host to become due
+
+        Returns:
+            (url, depth) or None when the crawl is over
+        """
+        with self._cond:
+            while True:
+                if self._finished():
+                    self._cond.notify_all()
+                    return None
+                if self._due:
+                    due, host = self._due[0]
+                    now = time.monotonic()
+                    if due <= now:
+                        heapq.heappop(self._due)
+                        self._scheduled.discard(host)
+                        url, depth = self._queues[host].popleft()
+                        self.queued -= 1
+                        self.in_flight += 1
+                        self.dispatched += 1
+                        self._active[host] = self._active.get(host, 0) + 1
+                        self._next_start[host] = now + self._delays.get(host, self.delay)
+                        self._schedule(host)
+                        return url, depth
+                    self._cond.wait(due - now)
+                else:
+                    # queued URLs all belong to busy hosts, or pages in flight may add more
+                    self._cond.wait()
+
+    def done(self, url: str):
+        """Mark a URL from get() as finished"""
+        with self._cond:
+            host = host_of(url)
+            self.in_flight -= 1
+            self._active[host] -= 1
+            self._schedule(host)
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                'queued': self.queued,
+                'in_flight': self.in_flight,
+                'seen': len(self.seen),
+                'hosts': sum(1 for queue in self._queues.values() if queue),
+            }
+
+
+class SiteCrawler:
+    """Crawls sites breadth first with a pool of WebScraper workers"""
+
+    def __init__(
+        self,
+        seeds: List[str],
+        workers: int = 4,
+        max_depth: int = 2,
+        max_pages: Optional[int] = None,
+        delay: float = 1.0,
+        per_host: int = 1,
+        same_host: bool = True,
+        obey_robots: bool = True,
+        parser: Optional[str] = None,
+        transport: Optional[Transport] = None,
+        cache: Optional[HTTPCache] = None,
+        on_page: Optional[Callable[[Dict[str, any]], None]] = None
+    ):
+        """
+        Class constructor
+
+        Args:
+            seeds: Start URLs
+            workers: Number of worker threads
+            max_depth: Links followed from the seeds (0 = seeds only)
+            max_pages: Stop after this many pages (None = no limit)
+            delay: Seconds between request starts on the same host
+            per_host: Concurrent requests per host
+            same_host: Only follow links to the hosts of the seeds
+            obey_robots: Check robots.txt before queueing a page
+            parser: HTML parser backend of the WebScraper workers
+            transport: Pooled HTTP transport (shared process-wide transport by default)
+            cache: Persistent HTTP cache shared by the workers (unchanged pages cost a 304)
+            on_page: Called with a record of every crawled page (from the worker threads)
+
+        Raises:
+            ValueError: No valid http(s) seed URL
+        """
+        self.seeds = []
+        for seed in seeds:
+            url = normalize_url(seed)
+            if url is None:
+                print(f"⚠️  Ignoring seed {seed!r}: not an http(s) URL")
+            elif url not in self.seeds:
+                self.seeds.append(url)
+        if not self.seeds:
+            raise ValueError("No valid http(s) seed URL")
+        self.workers = workers
+        self.max_depth = max_depth
+        self.same_host = same_host
+        self.parser = parser or DEFAULT_PARSER
+        self.transport = transport or get_transport()
+        self.cache = cache
+        self.on_page = on_page
+        self.frontier = Frontier(delay, per_host, max_pages)
+        self.robots = RobotsCache(self.transport, WebScraper.USER_AGENTS[0]) if obey_robots else None
+        self.hosts = {host_of(url) for url in self.seeds}
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.failed = 0
+        self.blocked = 0
+        self.timings: Dict[str, float] = {'fetch': 0.0, 'parse': 0.0}
+        self.started = None
+
+    def _follow(self, url: str) -> bool:
+        return not self.same_host or host_of(url) in self.hosts
+
+    def _queue(self, url: str, depth: int):
+        # robots.txt is checked before queueing: a disallowed URL never takes
+        # a host slot or counts toward max_pages, and Crawl-delay is known
+        # before the first request to the host
+        if self.robots is not None:
+            if not self.robots.allowed(url):
+                if self.frontier.mark_seen(url):
+                    print(f"🚫 Disallowed by robots.txt: {url}")
+                    with self._lock:
+                        self.blocked += 1
+                return
+            crawl_delay = self.robots.crawl_delay(url)
+            if crawl_delay:
+                self.frontier.set_delay(host_of(url), crawl_delay)
+        self.frontier.add(url, depth)
+
+    def _crawl_one(self, url: str, depth: int):
+        scraper = WebScraper(url, transport=self.transport, parser=self.parser, cache=self.cache)
+        success = scraper.visit_page()
+        response = scraper.response
+        record = {
+            'url': url,
+            'depth': depth,
+            'status': response.status_code if response is not None else 'error',
+            'title': None,
+            'links': 0,
+        }
+
+        content_type = response.headers.get('Content-Type', '') if response is not None else ''
+        if success and (not content_type or 'html' in content_type):
+            # links are relative to the final URL after redirects
+            final_url = normalize_url(response.url) or url
+            self.frontier.mark_seen(final_url)
+            links = [normalize_url(href, final_url) for href in scraper.get_links()]
+            links = [link for link in links if link]
+            record['title'] = scraper.get_title()
+            record['links'] = len(links)
+            if depth < self.max_depth:
+                for link in links:
+                    if self._follow(link):
+                        self._queue(link, depth + 1)
+
+        with self._lock:
+            self.pages += 1
+            self.failed += not success
+            for phase in self.timings:
+                self.timings[phase] += scraper.timings[phase]
+        if self.on_page:
+            self.on_page(record)
+
+    def _work(self):
+        while True:
+            item = self.frontier.get()
+            if item is None:
+                return
+            url, depth = item
+            try:
+                self._crawl_one(url, depth)
+            except Exception as e:
+                print(f"❌ Crawl error on {url}: {e}")
+                with self._lock:
+                    self.pages += 1
+                    self.failed += 1
+            finally:
+                self.frontier.done(url)
+
+    def stats(self) -> Dict[str, any]:
+        """
+        Progress of the crawl
+
+        Returns:
+            Dictionary with pages, failures, pages/s and the frontier counters
+        """
+        elapsed = time.monotonic() - self.started if self.started else 0.0
+        with self._lock:
+            stats = {
+                'pages': self.pages,
+                'failed': self.failed,
+                'blocked': self.blocked,
+                'pages_per_second': round(self.pages / elapsed, 2) if elapsed else 0.0,
+                'elapsed': round(elapsed, 2),
+            }
+        stats.update(self.frontier.stats())
+        return stats
+
+    def _report(self, interval: float, stop: threading.Event):
+        while not stop.wait(interval):
+            stats = self.stats()
+            print(f"📈 {stats['pages']} pages, {stats['pages_per_second']:.1f} pages/s, "
+                  f"frontier: {stats['queued']} queued, {stats['in_flight']} in flight, "
+                  f"{stats['seen']} seen")
+
+    def crawl(self, progress_interval: float = 5.0) -> Dict[str, any]:
+        """
+        Run the crawl until the frontier is empty or max_pages is reached
+
+        Args:
+            progress_interval: Seconds between progress lines
+
+        Returns:
+            Final statistics
+        """
+        print(f"\n{'='*70}")
+        print(f"🕷️  Crawling {len(self.seeds)} seed(s) with {self.workers} workers, "
+              f"max depth {self.max_depth}")
+        print(f"{'='*70}\n")
+
+        self.started = time.monotonic()
+        for url in self.seeds:
+            self._queue(url, 0)
+        METRICS.gauges('crawl', self.stats)
+        if self.cache is not None:
+            # registered once per crawl, not by every WebScraper sharing the cache
+            METRICS.gauges('http_cache', self.cache.stats)
+
+        stop = threading.Event()
+        reporter = threading.Thread(target=self._report, args=(progress_interval, stop), daemon=True)
+        reporter.start()
+        threads = [threading.Thread(target=self._work, daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                # join with a timeout so Ctrl+C reaches the main thread
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            print("\n⚠️  Interrupted, waiting for pages in flight...")
+            self.frontier.close()
+            for thread in threads:
+                thread.join()
+        finally:
+            stop.set()
+
+        stats = self.stats()
+        stats['timings'] = {phase: round(seconds, 3) for phase, seconds in self.timings.items()}
+        stats['connections'] = self.transport.stats()
+        if self.cache is not None:
+            stats['cache'] = self.cache.stats()
+
+        print(f"\n{'='*70}")
+        print("📊 Crawl statistics:")
+        print(f"   📄 Pages: {stats['pages']} ({stats['failed']} failed, {stats['blocked']} blocked by robots.txt)")
+        print(f"   ⚡ Throughput: {stats['pages_per_second']:.2f} pages/s in {stats['elapsed']:.1f}s")
+        print(f"   🗂️  Frontier: {stats['seen']} URLs seen, {stats['queued']} left in queue")
+        print(f"   🔌 New connections: {stats['connections']['new_connections']}, "
+              f"reused: {stats['connections']['reused_connections']}")
+        print(f"   ⏱️  Fetch: {stats['timings']['fetch']:.2f}s, parse: {stats['timings']['parse']:.2f}s (all workers)")
+        if 'cache' in stats:
+            print(f"   💾 Cache: {stats['cache']['hits']} hits, {stats['cache']['revalidated']} revalidated, "
+                  f"{stats['cache']['misses']} misses")
+        print(f"{'='*70}\n")
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="crawl one or more sites with a pool of WebScraper workers")
+    parser.add_argument('seeds', nargs='+', help="start URLs")
+    parser.add_argument('--workers', type=int, default=4, help="worker threads")
+    parser.add_argument('--max-depth', type=int, default=2, help="links followed from the seeds")
+    parser.add_argument('--max-pages', type=int, default=None, help="stop after this many pages")
+    parser.add_argument('--delay', type=float, default=1.0, help="seconds between requests to the same host")
+    parser.add_argument('--per-host', type=int, default=1, help="concurrent requests per host")
+    parser.add_argument('--any-host', action='store_true', help="also follow links to other hosts")
+    parser.add_argument('--ignore-robots', action='store_true', help="do not check robots.txt")
+    parser.add_argument('--parser', default=None, help="html.parser (default), bs4-lxml, lxml or selectolax")
+    parser.add_argument('--cache', nargs='?', const=CACHE_PATH, default=None,
+                        help=f"keep responses in an HTTP cache (default file: {CACHE_PATH})")
+    parser.add_argument('--out', default=None, help="write one JSON line per crawled page")
+    parser.add_argument('--progress', type=float, default=5.0, help="seconds between progress lines")
+    parser.add_argument('--metrics-port', type=int, default=None, help="serve Prometheus metrics on this port")
+    args = parser.parse_args()
+
+    out, out_lock = None, threading.Lock()
+    if args.out:
+        out = open(args.out, 'w', encoding='utf-8')
+
+    def write_page(record):
+        with out_lock:
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    if args.metrics_port is not None:
+        serve(METRICS, args.metrics_port)
+
+    crawler = SiteCrawler(
+        args.seeds,
+        workers=args.workers,
+        max_depth=args.max_depth,
+        max_pages=args.max_pages,
+        delay=args.delay,
+        per_host=args.per_host,
+        same_host=not args.any_host,
+        obey_robots=not args.ignore_robots,
+        parser=args.parser,
+        cache=HTTPCache(args.cache) if args.cache else None,
+        on_page=write_page if out else None,
+    )
+    try:
+        crawler.crawl(args.progress)
+    finally:
+        if out:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
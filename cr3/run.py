@@ -1,32 +1,16 @@
-from crawler.client import search
-from crawler.config import load_coordinates
+"""
+Main runner for the snappexpress crawler.
+The crawler itself is the shared package in ../crawler (cr2 and cr3 differ
+only by their platform profile in crawler/config.py).
+"""
 
+import os
+import sys
 
-def main():
-    print("Starting crawler...")
-
-    # Load coordinates from .env
-    coordinates = load_coordinates()
-
-    if not coordinates:
-        print("No coordinates found in .env file. Exiting.")
-        return
-
-    print(f"Loaded {len(coordinates)} coordinates from .env\n")
-
-    # Process each coordinate
-    for idx, (lat, lng) in enumerate(coordinates, 1):
-        
-        print(f"\n{'=' * 60}")
-        print(f"Processing coordinate {idx}/{len(coordinates)}: ({lat}, {lng})")
-        print(f"{'=' * 60}")
-
-        search(lat, lng)
-
-    print("\n" + "=" * 60)
-    print("Crawler finished successfully!")
-    print("=" * 60)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+os.environ["CRAWLER_PLATFORM"] = "snappexpress"
 
+from crawler.runner import main
 
 
 if __name__ == "__main__":
@@ -0,0 +1,170 @@
+"""
+throughput benchmark against the offline mock API
+  - runs every crawl mode over the same planner coverage of the mock area
+  - rate limiting waits run on a VirtualClock, so a crawl that would take
+    hours live finishes in seconds; "crawl time" is what it would have taken
+  - reports pages/s, requests per unique vendor, coverage and time to completion
+  - the rate controller paces every host on its own, so against the single
+    mock host async is no faster than sequential; --hosts serves the mock on
+    several hosts (ports) and spreads the coordinates over them, which is
+    where the async engine gains (raise --rpm so the global budget allows it)
+
+usage:
+  py -m crawler.bench
+  py -m crawler.bench --modes async async+dedup --vendors 20000 --rate-limit 0.05
+  py -m crawler.bench --hosts 4 --rpm 240
+  py -m crawler.bench --json outputs/bench.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+from .client import CrawlContext, search
+from .clock import SystemClock, VirtualClock
+from .config import ASYNC_CONCURRENCY, REQUESTS_PER_MINUTE, RATE_CONTROLLER, WRITER_ENABLED
+from .dedup import ExactIndex
+from .engine import interleave, run_async, run_platforms
+from .mockapi import add_arguments, api_from_args, start_server
+from .planner import bbox_polygon, cover
+from .ratelimit import CONTROLLERS
+from .sinks import SINKS
+from .writer import BackgroundWriter
+
+MODES = ("sequential", "async", "sequential+dedup", "async+dedup")
+
+
+def run_mode(mode, coordinates, base_urls, args, workdir):
+    """
+    One crawl of `coordinates` in `mode`, dealt round-robin to the mock
+    hosts at `base_urls`.
+    Returns:
+      - dict: crawl_seconds (on the crawl clock), wall_seconds, dead_letters, breaker_opened
+    """
+    clock = SystemClock() if args.real_time else VirtualClock()
+    controller = CONTROLLERS[args.controller](clock=clock)
+    index = ExactIndex(os.path.join(workdir, "vendor_ids.txt")) if mode.endswith("+dedup") else None
+
+    sink_dir = os.path.join(workdir, "outputs" if args.sink == "files" else "stream")
+    sink = SINKS[args.sink](sink_dir)
+    if WRITER_ENABLED:
+        sink = BackgroundWriter(sink, index=index, spill_dir=os.path.join(workdir, "unwritten"))
+    contexts = [
+        CrawlContext(controller=controller, index=index, sink=sink, clock=clock, base_url=url) for url in base_urls
+    ]
+    jobs = [(coordinates[i::len(contexts)], context) for i, context in enumerate(contexts)]
+
+    started_clock, started_wall = clock.now(), time.perf_counter()
+    if mode.startswith("async") and len(jobs) == 1:
+        run_async(coordinates, args.concurrency, args.rpm, contexts[0])
+    elif mode.startswith("async"):
+        run_platforms(jobs, args.concurrency, args.rpm)
+    else:
+        for lat, lng, context in interleave(jobs):
+            search(lat, lng, context)
+    sink.close()
+    if index is not None:
+        index.close()
+
+    return {
+        "crawl_seconds": clock.now() - started_clock,
+        "wall_seconds": time.perf_counter() - started_wall,
+        "dead_letters": sum(len(context.dead_letters) for context in contexts),
+        "breaker_opened": sum(context.breaker.opened for context in contexts),
+    }
+
+
+def benchmark(args):
+    api = api_from_args(args)
+    servers = [start_server(api) for _ in range(args.hosts)]
+    base_urls = [base_url for _, base_url in servers]
+    coordinates = [(c["lat"], c["lng"]) for c in cover(bbox_polygon(*args.bbox), args.radius)]
+    reachable = set()
+    for lat, lng in coordinates:
+        reachable.update(vendor["id"] for vendor in api.nearby(lat, lng))
+
+    print(f"Mock API: {len(api.vendors)} vendors, {len(reachable)} reachable from "
+          f"{len(coordinates)} coordinates (radius {args.radius} km), {args.hosts} host(s)")
+
+    results = []
+    try:
+        for mode in args.modes:
+            api.reset_stats()
+            with tempfile.TemporaryDirectory() as workdir:
+                output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+                with output:
+                    timing = run_mode(mode, coordinates, base_urls, args, workdir)
+
+            stats = api.stats()
+            crawl_seconds = max(timing["crawl_seconds"], 1e-9)
+            unique = stats["unique_vendors"]
+            results.append({
+                "mode": mode,
+                "requests": stats["requests"],
+                "statuses": stats["statuses"],
+                "vendor_pages": stats["vendor_pages"],
+                "unique_vendors": unique,
+                "coverage": unique / len(reachable) if reachable else 0.0,
+                "requests_per_vendor": stats["requests"] / unique if unique else None,
+                "pages_per_second": stats["vendor_pages"] / crawl_seconds,
+                "crawl_seconds": timing["crawl_seconds"],
+                "wall_seconds": timing["wall_seconds"],
+                "dead_letters": timing["dead_letters"],
+                "breaker_opened": timing["breaker_opened"],
+            })
+    finally:
+        for server, _ in servers:
+            server.shutdown()
+    return results
+
+
+def print_table(results):
+    header = f"{'mode':<18}{'requests':>9}{'pages':>7}{'vendors':>9}{'cover':>7}" \
+             f"{'req/vendor':>11}{'pages/s':>9}{'dead':>6}{'crawl time':>12}{'wall':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        per_vendor = f"{r['requests_per_vendor']:.3f}" if r["requests_per_vendor"] else "-"
+        print(f"{r['mode']:<18}{r['requests']:>9}{r['vendor_pages']:>7}{r['unique_vendors']:>9}"
+              f"{r['coverage']:>7.1%}{per_vendor:>11}{r['pages_per_second']:>9.3f}{r['dead_letters']:>6}"
+              f"{format_duration(r['crawl_seconds']):>12}{r['wall_seconds']:>7.1f}s")
+
+
+def format_duration(seconds):
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="crawler throughput benchmark (offline)")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--radius", type=float, default=3.0, help="coverage cell radius in km")
+    parser.add_argument("--concurrency", type=int, default=ASYNC_CONCURRENCY)
+    parser.add_argument("--hosts", type=int, default=1,
+                        help="serve the mock on this many hosts (ports), coordinates spread over them")
+    parser.add_argument("--rpm", type=int, default=REQUESTS_PER_MINUTE)
+    parser.add_argument("--controller", choices=sorted(CONTROLLERS), default=RATE_CONTROLLER)
+    parser.add_argument("--sink", choices=sorted(SINKS), default="files")
+    parser.add_argument("--real-time", action="store_true", help="really sleep instead of using a virtual clock")
+    parser.add_argument("--verbose", action="store_true", help="show crawler output")
+    parser.add_argument("--json", default=None, help="also write results to this file")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    results = benchmark(args)
+    print()
+    print_table(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
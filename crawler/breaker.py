@@ -0,0 +1,106 @@
+"""
+per-host circuit breaker
+  - after `threshold` failures in a row (5xx or no response) the host is
+    "open": every worker pauses instead of each coordinate finding out alone
+  - after the cooldown one trial request is let through (half-open);
+    success closes the circuit, failure opens it again with a longer cooldown
+"""
+
+import threading
+
+from .clock import SYSTEM_CLOCK
+from .config import BREAKER_THRESHOLD, BREAKER_COOLDOWN, BREAKER_MAX_COOLDOWN
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# how often waiters look again while a trial request is running
+HALF_OPEN_POLL = 5.0
+
+
+def is_failure(status):
+    """
+    True when the API looks down: exceptions (status None) and 5xx.
+    429 is rate limiting and is left to the rate controller.
+    """
+    return status is None or status >= 500
+
+
+class CircuitBreaker:
+    """
+    Shared by all workers of a crawl; state is kept per host.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN,
+                 max_cooldown=BREAKER_MAX_COOLDOWN, clock=None):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock or SYSTEM_CLOCK
+        self.opened = 0
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _host(self, host):
+        return self._hosts.setdefault(
+            host, {"state": CLOSED, "failures": 0, "open_until": 0.0, "cooldown": self.cooldown}
+        )
+
+    def state(self, host):
+        with self._lock:
+            return self._host(host)["state"]
+
+    def before_request(self, host):
+        """
+        Returns:
+          - 0 if a request may be sent now, otherwise seconds to wait and ask again
+        """
+        with self._lock:
+            circuit = self._host(host)
+            if circuit["state"] == CLOSED:
+                return 0.0
+            if circuit["state"] == HALF_OPEN:
+                return HALF_OPEN_POLL
+            remaining = circuit["open_until"] - self.clock.now()
+            if remaining > 0:
+                return remaining
+            # cooldown over: this caller sends the trial request
+            circuit["state"] = HALF_OPEN
+            return 0.0
+
+    def cancel_trial(self, host):
+        """
+        Hand back a slot from before_request() that will not be used, so a
+        half-open circuit gives its trial request to the next caller instead
+        of waiting forever for a result.
+        """
+        with self._lock:
+            circuit = self._host(host)
+            if circuit["state"] == HALF_OPEN:
+                circuit.update(state=OPEN, open_until=self.clock.now())
+
+    def record(self, host, status):
+        """
+        Feed back the outcome of a request (status None if it raised).
+        Returns:
+          - True if this outcome opened the circuit
+        """
+        with self._lock:
+            circuit = self._host(host)
+            if not is_failure(status):
+                circuit.update(state=CLOSED, failures=0, cooldown=self.cooldown)
+                return False
+
+            circuit["failures"] += 1
+            if circuit["state"] == HALF_OPEN:
+                circuit["cooldown"] = min(circuit["cooldown"] * 2, self.max_cooldown)
+            elif circuit["state"] == OPEN or circuit["failures"] < self.threshold:
+                return False
+
+            circuit["state"] = OPEN
+            circuit["open_until"] = self.clock.now() + circuit["cooldown"]
+            self.opened += 1
+            print(f"Circuit open for {host} after {circuit['failures']} failures: "
+                  f"pausing all requests for {circuit['cooldown']:.0f} seconds")
+            return True
@@ -0,0 +1,429 @@
+import random
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+from .breaker import CircuitBreaker
+from .clock import SYSTEM_CLOCK
+from .config import (
+    RATE_CONTROLLER, HTTP2, DNS_CACHE_TTL, ASYNC_CONCURRENCY, DEDUP_STOP_FRACTION,
+    RETRY_LIMIT, RETRY_BASE_DELAY, RETRY_MAX_DELAY, USE_RESULT_COUNT,
+)
+from .frontier import IN_FLIGHT, DONE, FAILED, END_EMPTY, END_SATURATED, END_COUNT, END_COVERED
+from .metrics import Metrics, COUNT_BUCKETS, LATENCY_BUCKETS, PHASE_BUCKETS
+from .profiles import get_profile
+from .ratelimit import CONTROLLERS, get_controller
+from .sinks import FileSink
+from .transport import get_transport
+from .vendors import iter_vendors, vendor_id
+
+# process-wide crawl metrics (exported by run.py)
+METRICS = Metrics("crawler")
+METRICS.counter("requests_total", "Vendors-list requests by HTTP status (error = no response)")
+METRICS.counter("response_bytes_total", "Response body bytes received")
+METRICS.counter("pages_total", "Pages by outcome")
+METRICS.counter("dead_letters_total", "Pages moved to the dead-letter queue after RETRY_LIMIT attempts")
+METRICS.histogram("request_seconds", "Request latency", LATENCY_BUCKETS)
+METRICS.histogram("phase_seconds", "Time spent per phase: sleep, budget, schedule, backoff, breaker, fetch, parse, write, store", PHASE_BUCKETS)
+METRICS.histogram("vendors_per_page", "Vendors in finalResult of non-empty pages", COUNT_BUCKETS)
+METRICS.histogram("pages_per_coordinate", "Pages fetched before a coordinate finished", COUNT_BUCKETS)
+
+
+def build_params(lat, long, page, profile=None, page_size=None):
+    """
+    Build query params for one page of the vendors list.
+    """
+    return (profile or get_profile()).build_params(lat, long, page, page_size)
+
+
+def fetch_page(lat, long, page, base_url=None, headers=None, profile=None, page_size=None):
+    """
+    Request a single page of the platform's vendors list through the
+    shared keep-alive transport (extra `headers`, e.g. conditional ones,
+    are added to the platform's headers; `page_size` overrides the platform's).
+    Returns:
+      - requests.Response
+    """
+    profile = profile or get_profile()
+    transport = get_transport(http2=HTTP2, pool_maxsize=ASYNC_CONCURRENCY, dns_ttl=DNS_CACHE_TTL)
+    return transport.get(
+        base_url or profile.base_url, params=profile.build_params(lat, long, page, page_size),
+        headers={**profile.headers, **(headers or {})}, timeout=30,
+    )
+
+
+def extract_final_result(data, profile=None):
+    """
+    Return the finalResult list of a vendors-list response (empty list if missing).
+    """
+    return (profile or get_profile()).extract(data)
+
+
+def breaker_pause(context):
+    """
+    Seconds to pause because the host's circuit is open (0 if requests may go).
+    """
+    pause = context.breaker.before_request(context.host)
+    if pause > 0:
+        print(f"API at {context.host} looks down (circuit open), pausing {pause:.0f} seconds...")
+        METRICS.observe("phase_seconds", pause, phase="breaker")
+    return pause
+
+
+def wait_for_slot(context):
+    """
+    Sleep while the host's circuit is open, then until the rate controller
+    allows the next request to the context's host.
+    """
+    while (pause := breaker_pause(context)) > 0:
+        context.clock.sleep(pause)
+
+    waited = 0.0
+    while (delay := context.controller.reserve(context.host)) > 0:
+        if not waited and context.log_waits:
+            print(f"Waiting {delay:.1f} seconds before next request...")
+        context.clock.sleep(delay)
+        waited += delay
+    if waited > 0:
+        METRICS.observe("phase_seconds", waited, phase="sleep")
+
+
+class CrawlContext:
+    """
+    Shared state of one crawl run of one platform, passed to search() and
+    the async engine.
+      - profile: platform profile (config.PLATFORM by default)
+      - controller: rate controller (process-wide one by default)
+      - frontier: resume state (optional)
+      - index: vendor dedup index for the early pagination cutoff (optional)
+      - sink: where pages are written (per-page JSON files by default)
+      - clock: time source for all waits (a VirtualClock skips them)
+      - base_url: vendors-list endpoint if not the profile's (e.g. a local crawler.mockapi server)
+      - breaker: per-host circuit breaker shared by all workers
+      - incremental: vendor snapshot for conditional requests (optional)
+      - page_size: page size of the pagination if not the profile's (see crawler.pagesize)
+      - spatial: spatial index fed with vendor locations and crawled coordinates (optional)
+    Without a frontier, dead-lettered pages are kept in `dead_letters`.
+    Vendors fetched per coordinate are counted in `vendors_fetched`, pages
+    answered per coordinate (retries left out) in `pages_fetched`,
+    data.count of coordinates being crawled is kept in `totals`, requests
+    the async engine has on the wire in `in_flight`. With `log_waits`
+    off, rate-limit waits are only measured, not printed.
+    """
+
+    def __init__(self, controller=None, frontier=None, index=None, sink=None,
+                 clock=None, base_url=None, breaker=None, incremental=None, profile=None, page_size=None,
+                 spatial=None):
+        self.profile = profile or get_profile()
+        self.clock = clock or SYSTEM_CLOCK
+        if controller is None:
+            # a custom clock needs its own controller; the shared one runs on real time
+            controller = get_controller() if clock is None else CONTROLLERS[RATE_CONTROLLER](clock=clock)
+        self.controller = controller
+        self.base_url = base_url or self.profile.base_url
+        self.host = urlparse(self.base_url).netloc
+        self.frontier = frontier
+        self.index = index
+        self.sink = sink or FileSink()
+        self.breaker = breaker or CircuitBreaker(clock=self.clock)
+        self.incremental = incremental
+        self.page_size = page_size
+        self.spatial = spatial
+        self.dead_letters = []
+        self.vendors_fetched = Counter()
+        self.pages_fetched = Counter()
+        self.log_waits = True
+        self.totals = {}
+        self.in_flight = set()
+
+    def mark(self, lat, long, page, state, error=None):
+        if self.frontier:
+            self.frontier.mark(lat, long, page, state, error)
+
+    def finish(self, lat, long, reason=END_EMPTY):
+        if self.frontier:
+            self.frontier.finish_coordinate(lat, long, reason)
+        if self.incremental and reason in (END_EMPTY, END_COUNT):
+            # crawled to the last page: vendors missing here can be removed
+            self.incremental.finish_coordinate(lat, long)
+        if self.spatial is not None and reason != END_COVERED:
+            self.spatial.add_crawled(lat, long, self.totals.get((lat, long)))
+
+    def dead_letter(self, lat, long, page):
+        METRICS.inc("dead_letters_total", platform=self.profile.name)
+        if self.frontier:
+            self.frontier.dead_letter(lat, long, page)
+        else:
+            self.dead_letters.append((lat, long, page))
+
+
+def backoff_delay(attempt, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    """
+    Exponential backoff with jitter: half of base * 2^(attempt - 1) (capped)
+    plus a random part up to the other half.
+    """
+    delay = min(cap, base * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def retry_delay(lat, long, page, attempts, context):
+    """
+    Decide what happens after the `attempts`-th failed attempt of a page.
+    Returns:
+      - seconds to back off before the next attempt, or None when the
+        retry budget is used up and the page went to the dead-letter queue
+    """
+    if attempts >= RETRY_LIMIT:
+        print(f"Page {page} ({lat}, {long}) failed {attempts} times, moved to the dead-letter queue.")
+        context.dead_letter(lat, long, page)
+        return None
+
+    delay = backoff_delay(attempts)
+    print(f"Retrying page {page} ({lat}, {long}) in {delay:.1f} seconds (attempt {attempts + 1}/{RETRY_LIMIT})...")
+    METRICS.observe("phase_seconds", delay, phase="backoff")
+    return delay
+
+
+# outcomes of crawl_page()
+SAVED = "saved"
+EMPTY = "empty"
+SATURATED = "saturated"
+LAST = "last"
+FAILED_PAGE = "failed"
+
+# why a coordinate is finished, by the outcome that ended its pagination
+END_REASONS = {EMPTY: END_EMPTY, SATURATED: END_SATURATED, LAST: END_COUNT}
+
+
+def known_fraction(index, key, final_result):
+    """
+    Check the page's vendor ids against the index; they are held under
+    `key` until the page is done (VendorIndex.commit).
+    Returns:
+      - fraction of the page's vendors that were already known
+    """
+    ids = [vendor_id(v) for v in iter_vendors(final_result)]
+    ids = [i for i in ids if i is not None]
+    if not ids:
+        return 0.0
+    return index.check(key, ids) / len(ids)
+
+
+def effective_page_size(context):
+    return context.page_size or context.profile.page_size
+
+
+def is_last_page(page, vendors, total, context):
+    """
+    True when the page's vendors end exactly at data.count. Any other
+    combination (count changed, API capped the page size) falls back to
+    paginating until an empty page.
+    """
+    size = effective_page_size(context)
+    if not size or vendors > size:
+        return False
+    return (page - context.profile.first_page) * size + vendors == total
+
+
+def crawl_page(lat, long, page, context, finish=True):
+    """
+    Fetch, check and save one page; shared by search() and the async engine.
+    The caller is responsible for waiting for a rate controller slot.
+    With finish=False, a page that ends the pagination neither finishes the
+    coordinate nor, when empty, is marked done: the async engine does both
+    once, for the first such page, since several pages may end it at once.
+    Returns:
+      - SAVED: page had vendors and was written (or, in incremental mode,
+        was not modified since the last run)
+      - EMPTY: finalResult is empty, pagination is over
+      - SATURATED: page was written, but most of its vendors were already
+        known from other coordinates, pagination is over
+      - LAST: page was written and data.count says it was the last one
+      - FAILED_PAGE: request or save failed, the same page should be retried
+    """
+    controller = context.controller
+    platform = context.profile.name
+    context.mark(lat, long, page, IN_FLIGHT)
+
+    incremental = context.incremental
+    headers = incremental.request_headers(lat, long, page) if incremental else None
+
+    # latency is real time even on a virtual clock
+    started = time.monotonic()
+    try:
+        response = fetch_page(
+            lat, long, page, context.base_url, headers, context.profile, context.page_size
+        )
+        latency = time.monotonic() - started
+        controller.record(
+            context.host, response.status_code, latency,
+            response.headers.get("Retry-After"),
+        )
+        context.breaker.record(context.host, response.status_code)
+        METRICS.inc("requests_total", status=response.status_code, platform=platform)
+        METRICS.inc("response_bytes_total", len(response.content), platform=platform)
+        METRICS.observe("request_seconds", latency, platform=platform)
+        METRICS.observe("phase_seconds", latency, phase="fetch")
+
+        print(f"Status: {response.status_code}")
+
+        if response.status_code == 304 and incremental:
+            print(f"Page {page} not modified ({lat}, {long})")
+            vendors, total = incremental.touch_page(lat, long, page)
+            context.mark(lat, long, page, DONE)
+            METRICS.inc("pages_total", outcome="not_modified", platform=platform)
+            # the stored data.count still tells whether this was the last page
+            if USE_RESULT_COUNT and vendors and total is not None:
+                context.totals[(lat, long)] = total
+                if is_last_page(page, vendors, total, context):
+                    print(f"Page {page} is the last of {total} vendors ({lat}, {long}). Stopping pagination.")
+                    if finish:
+                        context.finish(lat, long, END_COUNT)
+                    return LAST
+            return SAVED
+
+        if response.status_code != 200:
+            print(f"Request failed with status code: {response.status_code}")
+            context.mark(lat, long, page, FAILED, f"status {response.status_code}")
+            METRICS.inc("pages_total", outcome=FAILED_PAGE, platform=platform)
+            return FAILED_PAGE
+
+        with METRICS.timer("phase_seconds", phase="parse"):
+            data = response.json()
+
+    except Exception as e:
+        controller.record(context.host, None, time.monotonic() - started)
+        context.breaker.record(context.host, None)
+        METRICS.inc("requests_total", status="error", platform=platform)
+        METRICS.inc("pages_total", outcome=FAILED_PAGE, platform=platform)
+        print(f"An error occurred: {e}")
+        context.mark(lat, long, page, FAILED, str(e))
+        return FAILED_PAGE
+
+    return save_page(lat, long, page, data, response.headers, context, finish)
+
+
+def save_page(lat, long, page, data, headers, context, finish=True):
+    """
+    Check and save one fetched page (the part of crawl_page() after the
+    request); also used for the page a page_size probe already fetched.
+    Returns:
+      - outcome, as crawl_page()
+    """
+    platform = context.profile.name
+    incremental = context.incremental
+
+    # Check if finalResult exists and has data
+    final_result = extract_final_result(data, context.profile)
+    if not final_result:
+        print(f"finalResult is empty on page {page} ({lat}, {long}). Stopping pagination.")
+        if finish:
+            context.mark(lat, long, page, DONE)
+            context.finish(lat, long)
+        METRICS.inc("pages_total", outcome=EMPTY, platform=platform)
+        return EMPTY
+
+    METRICS.observe("vendors_per_page", len(final_result), platform=platform)
+    context.vendors_fetched[(lat, long)] += len(final_result)
+    if context.spatial is not None:
+        context.spatial.add_vendors(final_result)
+    total = context.profile.total(data) if USE_RESULT_COUNT else None
+    if incremental:
+        incremental.remember_page(lat, long, page, headers, final_result, total)
+
+    # checked before the write: a background writer may commit the ids
+    # to the index as soon as the page is on disk
+    index = context.index
+    fraction = known_fraction(index, (lat, long, page), final_result) if index is not None else 0.0
+
+    # finalResult has data, so save it to the output sink
+    try:
+        with METRICS.timer("phase_seconds", phase="write"):
+            filename = context.sink.write_page(data, lat, long, page)
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        context.mark(lat, long, page, FAILED, str(e))
+        if index is not None:
+            index.discard((lat, long, page))
+        METRICS.inc("pages_total", outcome=FAILED_PAGE, platform=platform)
+        return FAILED_PAGE
+
+    print(f"Response saved to {filename}")
+    if not getattr(context.sink, "deferred", False):
+        # a background writer marks the page done once it is on disk
+        context.mark(lat, long, page, DONE)
+        if index is not None:
+            index.commit((lat, long, page))
+
+    # Stop early when neighbouring coordinates already returned these vendors
+    if index is not None:
+        if fraction >= DEDUP_STOP_FRACTION:
+            print(f"{fraction:.0%} of page {page} vendors already known ({lat}, {long}). Stopping pagination.")
+            if finish:
+                context.finish(lat, long, END_SATURATED)
+            METRICS.inc("pages_total", outcome=SATURATED, platform=platform)
+            return SATURATED
+
+    # data.count tells where the list ends: skip the closing empty page
+    if total is not None:
+        context.totals[(lat, long)] = total
+        if is_last_page(page, len(final_result), total, context):
+            print(f"Page {page} is the last of {total} vendors ({lat}, {long}). Stopping pagination.")
+            if finish:
+                context.finish(lat, long, END_COUNT)
+            METRICS.inc("pages_total", outcome=LAST, platform=platform)
+            return LAST
+
+    METRICS.inc("pages_total", outcome=SAVED, platform=platform)
+    return SAVED
+
+
+def search(lat, long, context=None, lease=None):
+    """
+    Search for vendors at the given latitude and longitude.
+    Fetches all pages until finalResult is empty (or data.count says
+    the last page was reached).
+    Saves each page response to a separate JSON file.
+    With a frontier, continues from the first page that is not done.
+    With a dedup index, stops once a page is mostly known vendors.
+    A failing page is retried with exponential backoff; after RETRY_LIMIT
+    attempts it goes to the dead-letter queue and the coordinate is left.
+    With a lease (workqueue.Heartbeat), the coordinate is left as soon as
+    the lease is lost to another worker.
+    """
+    context = context or CrawlContext()
+    frontier = context.frontier
+    first_page = context.profile.first_page
+    page = frontier.next_page(lat, long, first_page) if frontier else first_page
+    attempts = 0
+
+    while True:
+        print(f"\n--- Fetching page {page} ---")
+        print(f"Requesting data -> Lat: {lat}, Long: {long}, Page: {page}")
+        wait_for_slot(context)
+        if lease is not None and lease.lost:
+            print(f"Lease on ({lat}, {long}) lost, leaving the coordinate to its new worker")
+            # the breaker's slot (maybe the half-open trial) goes unused
+            context.breaker.cancel_trial(context.host)
+            break
+
+        outcome = crawl_page(lat, long, page, context)
+        if outcome == FAILED_PAGE:
+            attempts += 1
+            delay = retry_delay(lat, long, page, attempts, context)
+            if delay is None:
+                break
+            context.clock.sleep(delay)
+            continue
+
+        attempts = 0
+        context.pages_fetched[(lat, long)] += 1
+        if outcome in (SAVED, SATURATED, LAST):
+            page += 1
+        if outcome in (EMPTY, SATURATED, LAST):
+            break
+
+    context.totals.pop((lat, long), None)
+    processed_pages = page - first_page
+    METRICS.observe("pages_per_coordinate", processed_pages, platform=context.profile.name)
+    print(f"Finished processing coordinates ({lat}, {long}). Total pages: {processed_pages}")
@@ -0,0 +1,71 @@
+"""
+clocks used for pacing
+  - SystemClock: real monotonic time and real sleeps (default)
+  - VirtualClock: sleeps return at once and move the clock forward instead,
+    so hours of rate limiting run in seconds (benchmarks, tests)
+"""
+
+import asyncio
+import threading
+import time
+
+
+class SystemClock:
+    """
+    Real time. now() is time.monotonic(), time() is wall-clock time
+    (for timestamps that are stored across restarts).
+    """
+
+    def now(self):
+        return time.monotonic()
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    async def sleep_async(self, seconds):
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+
+class VirtualClock(SystemClock):
+    """
+    Real time plus everything that was slept so far.
+    Request latencies are still measured for real; only waits are skipped.
+    Concurrent sleepers move the clock to the latest wake-up time, which
+    matches a crawl paced by one shared budget.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._offset = 0.0
+        self.slept = 0.0
+
+    def now(self):
+        return time.monotonic() + self._offset
+
+    def time(self):
+        return time.time() + self._offset
+
+    def _advance_to(self, target):
+        with self._lock:
+            ahead = target - self.now()
+            if ahead > 0:
+                self._offset += ahead
+                self.slept += ahead
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self._advance_to(self.now() + seconds)
+
+    async def sleep_async(self, seconds):
+        if seconds > 0:
+            self._advance_to(self.now() + seconds)
+        # still give other tasks a turn
+        await asyncio.sleep(0)
+
+
+SYSTEM_CLOCK = SystemClock()
@@ -0,0 +1,276 @@
+"""
+configs for crawler
+  - urls
+  - headers & coockies
+  - filters & parametrs
+"""
+
+import os
+
+# platform profiles: vendors-list endpoint, headers, query params, first
+# page index and the path of the vendor list in a response
+PLATFORMS = {
+    "snappfood": {
+        "base_url": "https://snappfood.ir/search/api/v1/desktop/vendors-list",
+        "headers": {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+            "(KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36",
+            "Accept": "application/json, text/plain, */*",
+            "Referer": "https://snappfood.ir/",
+            "Accept-Language": "en-US,en;q=0.9,fa;q=0.8",
+            "Accept-Encoding": "gzip, deflate, br",
+        },
+        "params": {
+            "lat": 0,
+            "long": 0,
+            "optionalClient": "WEBSITE",
+            "client": "WEBSITE",
+            "deviceType": "WEBSITE",
+            "appVersion": "8.1.1",
+            "UDID": "c47cb3c1-c45a-413f-bd8f-f08af89dbc4b",
+            "page": 0,
+            "page_size": 20,
+            "filters": "{}",
+            "query": "",
+            "sp_alias": "restaurant",
+            "superType": "[1]",
+            "vendor_title": "",
+            "extra-filter": "",
+            "locale": "fa",
+        },
+        "first_page": 1,
+        "result_path": ("data", "finalResult"),
+    },
+    "snappexpress": {
+        "base_url": "https://api.snapp.express/express-vendor/general/vendors-list",
+        "headers": {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+            "(KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36",
+            "Accept": "application/json, text/plain, */*",
+            "Referer": "https://express.snapp.market/",
+            "Accept-Language": "fa-IR, fa;q=0.9,en;q=0.8,*;q=0.1",
+            "Accept-Encoding": "gzip, deflate, br, zstd",
+        },
+        "params": {
+            "lat": 0,
+            "long": 0,
+            "page": 0,
+            "page_size": 18,
+            "appVersion": "1.346.8",
+            "UDID": "535df17f-d686-497d-98d2-b5ae67829fe7",
+            "deviceType": "PWA",
+            "client": "PWA",
+            "service": "all",
+            "extra-filter[vendor_collection]": "-1",
+            "page_type": "vendor_list",
+            "is_home": "false",
+        },
+        "first_page": 0,
+        "result_path": ("data", "finalResult"),
+    },
+}
+
+# platform crawled by default; it also keys crawl state (run.py --platforms crawls several).
+# cr2/run.py and cr3/run.py set CRAWLER_PLATFORM; set it for `py -m crawler.*` in cr3
+PLATFORM = os.environ.get("CRAWLER_PLATFORM", "snappfood")
+
+# settings of the default platform
+BASE_URL = PLATFORMS[PLATFORM]["base_url"]
+DEAFAULT_HEADERS = PLATFORMS[PLATFORM]["headers"]
+DEFAULT_PARAMS = PLATFORMS[PLATFORM]["params"]
+FIRST_PAGE = PLATFORMS[PLATFORM]["first_page"]
+
+# directory for page responses
+OUTPUT_DIR = "outputs"
+
+# where pages go: "files" (one JSON per page) or "ndjson" (compressed streaming segments)
+OUTPUT_SINK = "files"
+
+# ndjson sink: segment directory, one record per "page" or per "vendor"
+STREAM_DIR = "outputs/stream"
+STREAM_RECORD = "page"
+
+# ndjson sink: "gzip", "zstd" (needs zstandard) or "none"
+STREAM_COMPRESSION = "gzip"
+
+# ndjson sink: rotate segments by size, flush by size or time
+STREAM_SEGMENT_BYTES = 256 * 1024 * 1024
+STREAM_FLUSH_BYTES = 1024 * 1024
+STREAM_FLUSH_SECONDS = 30
+
+# background writer: persist pages on a separate thread (fetching never waits on disk
+# unless the queue is full)
+WRITER_ENABLED = True
+WRITER_QUEUE_SIZE = 1000
+WRITER_BATCH_SIZE = 50
+WRITER_BATCH_SECONDS = 1.0
+
+# background writer: fsync "batch" (after every batch), "interval" or "never"
+WRITER_FSYNC = "batch"
+WRITER_FSYNC_SECONDS = 10
+
+# background writer: attempts per page before it is spilled to outputs/unwritten/
+WRITER_RETRIES = 3
+
+# incremental mode (run.py --incremental): vendor snapshot and delta stream directory
+INCREMENTAL_PATH = "outputs/snapshot.db"
+DELTA_DIR = "outputs/delta"
+
+# incremental mode: vendor fields left out of the change hash (they vary with
+# the request location / time of day, not with the vendor)
+INCREMENTAL_IGNORE_FIELDS = ("distance", "deliveryFee", "deliveryTime", "eta", "isOpen")
+
+# incremental mode: send If-None-Match / If-Modified-Since when the API gave validators
+CONDITIONAL_REQUESTS = True
+
+# recrawl scheduler (py -m crawler.scheduler): state file, request budget per hour
+SCHEDULE_PATH = "outputs/schedule.db"
+SCHEDULER_REQUESTS_PER_HOUR = 600
+
+# recrawl scheduler: bounds of the revisit interval of one coordinate (seconds)
+SCHEDULER_MIN_REVISIT = 3600
+SCHEDULER_MAX_REVISIT = 7 * 24 * 3600
+
+# recrawl scheduler: weight of the latest visit in the change rate / cost averages
+SCHEDULER_SMOOTHING = 0.3
+
+# recrawl scheduler: changed vendors per hour assumed before anything was measured
+SCHEDULER_PRIOR_RATE = 0.01
+
+# columnar export (py -m crawler.export): output directory, rows per parquet/arrow file
+EXPORT_DIR = "outputs/export"
+EXPORT_ROWS_PER_FILE = 100_000
+
+# sqlite frontier used to resume interrupted runs
+FRONTIER_PATH = "outputs/frontier.db"
+
+# vendor dedup index shared across coordinates: "exact", "bloom" or None
+DEDUP_INDEX = "exact"
+DEDUP_PATH = "outputs/vendor_ids.txt"
+BLOOM_PATH = "outputs/vendor_ids.bloom"
+BLOOM_CAPACITY = 10_000_000
+BLOOM_ERROR_RATE = 0.001
+
+# stop paginating a coordinate once this fraction of a page is already known
+DEDUP_STOP_FRACTION = 0.9
+
+# coordinate sources (crawler.coordinates): decimals points are snapped to before
+# duplicates are dropped (4 merges points about 10 m apart)
+COORDINATE_PRECISION = 6
+
+# spatial index of collected vendors (crawler.spatial): file, grid cell size (km)
+SPATIAL_PATH = "outputs/spatial.json"
+SPATIAL_CELL_KM = 1.0
+
+# a coordinate's service area is saturated when the known vendors within
+# SPATIAL_RADIUS_KM reach SPATIAL_SATURATION of what the nearest crawled
+# coordinate returned
+SPATIAL_RADIUS_KM = 3.0
+SPATIAL_SATURATION = 0.95
+
+# spatial index: saved at most every this many seconds while coordinates finish
+# (and at the end of a run), so an interrupted run keeps what it learned
+SPATIAL_SAVE_SECONDS = 60
+
+# saturated coordinates: "defer" (crawl them last), "skip" or None (no check)
+SPATIAL_ACTION = "defer"
+
+# files local workers merge into (spatial index, Bloom filter): seconds to wait for
+# the lock, age after which a lock left by a crashed process is taken over
+LOCK_TIMEOUT = 60
+LOCK_STALE = 300
+
+# end pagination at the page data.count says is the last one (no closing empty request)
+USE_RESULT_COUNT = True
+
+# async engine: pages of one coordinate fetched at once when the response has no count
+PREFETCH_PAGES = 3
+
+# coverage planner: plan file, pages that make a cell "deep", smallest cell radius (km)
+PLAN_PATH = "outputs/plan.json"
+PLAN_DEEP_PAGES = 5
+PLAN_MIN_RADIUS = 0.5
+
+# page_size probing (crawler.pagesize): largest page_size tried, coordinates tried
+# until one is conclusive, where probed sizes are cached and for how long (seconds)
+PAGE_SIZE_PROBE = True
+PAGE_SIZE_MAX = 200
+PAGE_SIZE_PROBE_COORDINATES = 3
+PAGE_SIZE_CACHE = "outputs/page_size.json"
+PAGE_SIZE_TTL = 7 * 24 * 3600
+
+# worker mode (run.py --worker / --queue): seconds a leased coordinate stays
+# reserved without a heartbeat, seconds between attempts while all are leased
+LEASE_SECONDS = 600
+LEASE_POLL_SECONDS = 30
+
+# work queue server for workers on other machines (py -m crawler.workqueue)
+QUEUE_HOST = "127.0.0.1"
+QUEUE_PORT = 8765
+
+# async engine: coordinates crawled at the same time
+ASYNC_CONCURRENCY = 8
+
+# async engine: global request budget shared by all coordinates
+REQUESTS_PER_MINUTE = 30
+
+# transport: HTTP/2 through httpx (optional dependency)
+HTTP2 = False
+
+# transport: seconds to cache DNS lookups (0 disables the cache)
+DNS_CACHE_TTL = 300
+
+# rate controller between requests: "aimd" (adaptive) or "fixed" (random delay)
+RATE_CONTROLLER = "aimd"
+
+# fixed controller: random delay range (seconds)
+FIXED_MIN_DELAY = 60
+FIXED_MAX_DELAY = 120
+
+# aimd controller: delay bounds per host (seconds)
+AIMD_INITIAL_DELAY = 60
+AIMD_MIN_DELAY = 2
+AIMD_MAX_DELAY = 300
+
+# aimd controller: +requests/minute per healthy response, rate multiplier on 429/5xx/errors
+AIMD_INCREASE = 1.0
+AIMD_DECREASE = 0.5
+
+# aimd controller: back off when latency exceeds baseline * factor
+AIMD_LATENCY_FACTOR = 2.0
+
+# aimd controller: random +/- fraction applied to every delay
+AIMD_JITTER = 0.1
+
+# retries: attempts per page before it goes to the dead-letter queue
+RETRY_LIMIT = 5
+
+# retries: exponential backoff between attempts (seconds, with jitter)
+RETRY_BASE_DELAY = 30
+RETRY_MAX_DELAY = 900
+
+# circuit breaker: failures in a row that pause every worker, pause length (seconds)
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 300
+BREAKER_MAX_COOLDOWN = 3600
+
+# metrics: Prometheus endpoint port (None disables it, run.py --metrics-port overrides)
+METRICS_PORT = None
+
+# metrics: JSON snapshot written every METRICS_SNAPSHOT_SECONDS
+METRICS_SNAPSHOT_PATH = "outputs/metrics.json"
+METRICS_SNAPSHOT_SECONDS = 60
+
+
+def load_coordinates(env_path=None):
+    """
+    Load coordinates from .env file (or another coordinates file: .env
+    lines, CSV, NDJSON or GeoJSON, see crawler.coordinates), snapped to
+    COORDINATE_PRECISION and without duplicates.
+    Returns:
+      - list of tuples: [(lat, long), ...]
+    """
+    # imported here: crawler.coordinates reads its settings from this module
+    from .coordinates import open_coordinates
+
+    return list(open_coordinates(env_path))
@@ -0,0 +1,269 @@
+"""
+coordinate sources
+  - read coordinates lazily from .env lines, CSV, NDJSON and GeoJSON files
+    (also gzip compressed, e.g. points.csv.gz); nothing is loaded whole
+  - snap points to COORDINATE_PRECISION decimals, so near-duplicates
+    become one coordinate (6 decimals keeps planner output as it is,
+    4 merges points about 10 m apart)
+  - drop duplicates on the fly
+  - a source can be iterated again: every pass re-reads the file, which is
+    how run.py streams it into the frontier of each platform
+
+formats (by file extension):
+  - .env / .ndjson / .jsonl (and any other name): one JSON value per line:
+    {"lat", "lng"} (also lon / long / latitude / longitude), [lat, lng] or
+    a GeoJSON Feature
+  - .csv: lat / lng columns by header name, else the first two columns
+  - .geojson / .json: Point and MultiPoint features of a FeatureCollection
+    (streamed with ijson when installed)
+
+usage:
+  py -m crawler.coordinates points.csv.gz --precision 3 --out .env
+"""
+
+import argparse
+import csv
+import gzip
+import itertools
+import json
+import os
+
+from .config import COORDINATE_PRECISION
+
+try:
+    import ijson
+except ImportError:  # large FeatureCollections are then parsed in one go
+    ijson = None
+
+LAT_KEYS = ("lat", "latitude")
+LNG_KEYS = ("lng", "lon", "long", "longitude")
+
+GEOJSON_FORMATS = (".geojson", ".json")
+
+
+def default_path():
+    return os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env")
+
+
+def open_text(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def file_format(path):
+    name = path[:-3] if path.endswith(".gz") else path
+    extension = os.path.splitext(name)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in GEOJSON_FORMATS:
+        return "geojson"
+    # .env, NDJSON and any other name: the .env line format
+    return "lines"
+
+
+def _pick(mapping, keys):
+    return next((mapping[k] for k in keys if mapping.get(k) not in (None, "")), None)
+
+
+def points_of(value):
+    """
+    Points of one parsed value: {"lat", "lng"} dict, [lat, lng] pair or a
+    GeoJSON Feature / geometry (Point, MultiPoint; GeoJSON order is lng, lat).
+    Returns:
+      - list of (lat, lng) as floats
+    Raises:
+      - ValueError if nothing usable is in it
+    """
+    if isinstance(value, (list, tuple)) and len(value) >= 2:
+        return [(float(value[0]), float(value[1]))]
+    if not isinstance(value, dict):
+        raise ValueError("not a coordinate")
+
+    if value.get("type") == "Feature":
+        value = value.get("geometry") or {}
+    kind = value.get("type")
+    if kind == "Point":
+        lng, lat = value["coordinates"][:2]
+        return [(float(lat), float(lng))]
+    if kind == "MultiPoint":
+        return [(float(lat), float(lng)) for lng, lat, *_ in value["coordinates"]]
+
+    lat, lng = _pick(value, LAT_KEYS), _pick(value, LNG_KEYS)
+    if lat is None or lng is None:
+        raise ValueError("no lat / lng")
+    return [(float(lat), float(lng))]
+
+
+def read_lines(path):
+    """
+    .env and NDJSON lines; empty lines and # comments are skipped, a
+    trailing comma (the .env format) is allowed.
+    """
+    with open_text(path) as f:
+        for line in f:
+            line = line.strip().lstrip("\x1e").rstrip(",")
+            if not line or line.startswith("#"):
+                continue
+            try:
+                yield from points_of(json.loads(line))
+            except (ValueError, TypeError, KeyError):
+                print(f"Warning: Could not parse line: {line}")
+
+
+def read_csv(path):
+    with open_text(path) as f:
+        rows = csv.reader(f)
+        header = next(rows, None)
+        if header is None:
+            return
+        names = [name.strip().lower() for name in header]
+        lat_col = next((names.index(k) for k in LAT_KEYS if k in names), None)
+        lng_col = next((names.index(k) for k in LNG_KEYS if k in names), None)
+        if lat_col is None or lng_col is None:
+            # no header: the first row is a coordinate too
+            lat_col, lng_col = 0, 1
+            rows = itertools.chain([header], rows)
+
+        for row in rows:
+            if not row or row[0].startswith("#"):
+                continue
+            try:
+                yield float(row[lat_col]), float(row[lng_col])
+            except (ValueError, IndexError):
+                print(f"Warning: Could not parse row: {','.join(row)}")
+
+
+def read_geojson(path):
+    """
+    Point features of a FeatureCollection (or a single Feature / geometry,
+    or a JSON array of coordinates).
+    """
+    if ijson is not None:
+        with (gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")) as f:
+            features = ijson.items(f, "features.item", use_float=True)
+            for feature in features:
+                yield from _feature_points(feature)
+            return
+
+    with open_text(path) as f:
+        geojson = json.load(f)
+    features = geojson if isinstance(geojson, list) else geojson.get("features", [geojson])
+    for feature in features:
+        yield from _feature_points(feature)
+
+
+def _feature_points(feature):
+    try:
+        return points_of(feature)
+    except (ValueError, TypeError, KeyError):
+        # polygons and other geometries are areas, not coordinates (see crawler.planner)
+        return []
+
+
+READERS = {
+    "lines": read_lines,
+    "csv": read_csv,
+    "geojson": read_geojson,
+}
+
+
+def snap(lat, lng, precision=COORDINATE_PRECISION):
+    """
+    Round a point to `precision` decimals (4 decimals is about 11 m).
+    """
+    return round(lat, precision), round(lng, precision)
+
+
+class CoordinateSource:
+    """
+    Lazily read, snapped and deduplicated coordinates of a file.
+    Iterating it again re-reads the file; `stats` counts the last pass.
+    """
+
+    def __init__(self, path=None, precision=COORDINATE_PRECISION, dedup=True):
+        self.path = path or default_path()
+        self.format = file_format(self.path)
+        self.precision = precision
+        self.dedup = dedup
+        self.stats = {"read": 0, "out_of_range": 0, "duplicates": 0, "coordinates": 0}
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def _key(self, lat, lng):
+        # one int per coordinate keeps the seen set small for huge inputs
+        scale = 10 ** self.precision
+        return (round(lat * scale) + 90 * scale) * (361 * scale) + round(lng * scale) + 180 * scale
+
+    def __iter__(self):
+        stats = self.stats = {"read": 0, "out_of_range": 0, "duplicates": 0, "coordinates": 0}
+        if not self.exists():
+            print(f"Warning: coordinates file not found at {self.path}")
+            return
+
+        seen = set()
+        for lat, lng in READERS[self.format](self.path):
+            stats["read"] += 1
+            if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+                stats["out_of_range"] += 1
+                continue
+            lat, lng = snap(lat, lng, self.precision)
+            if self.dedup:
+                key = self._key(lat, lng)
+                if key in seen:
+                    stats["duplicates"] += 1
+                    continue
+                seen.add(key)
+            stats["coordinates"] += 1
+            yield lat, lng
+
+    def first(self):
+        """
+        Returns:
+          - the first coordinate, None for an empty source
+        """
+        return next(iter(self), None)
+
+
+def open_coordinates(path=None, precision=COORDINATE_PRECISION, dedup=True):
+    """
+    Returns:
+      - CoordinateSource of `path` (the .env next to run.py by default)
+    """
+    return CoordinateSource(path, precision, dedup)
+
+
+def write_env(coordinates, out):
+    """
+    Write coordinates in the .env line format.
+    Returns:
+      - number of coordinates written
+    """
+    written = 0
+    with open(out, "w", encoding="utf-8") as f:
+        for lat, lng in coordinates:
+            f.write(json.dumps({"lat": lat, "lng": lng}) + ",\n")
+            written += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="read, snap and deduplicate a coordinates file")
+    parser.add_argument("path", help=".env, .csv, .ndjson or .geojson file (optionally .gz)")
+    parser.add_argument("--precision", type=int, default=COORDINATE_PRECISION,
+                        help="decimals kept (near-duplicates closer than that collapse)")
+    parser.add_argument("--out", default=None, help="write the result in .env format")
+    args = parser.parse_args()
+
+    source = open_coordinates(args.path, args.precision)
+    if args.out:
+        print(f"Wrote {write_env(source, args.out)} coordinates to {args.out}")
+    else:
+        for _ in source:
+            pass
+    print(f"Coordinates: {source.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+vendor dedup index shared across coordinates and runs
+  - ExactIndex: set of ids, appended to a text file as they are seen
+  - BloomIndex: fixed-size Bloom filter for very large runs; saves are
+    merged with the file under a lock, so local workers sharing it keep
+    each other's ids
+"""
+
+import hashlib
+import json
+import math
+import os
+import threading
+
+from .config import (
+    DEDUP_INDEX,
+    DEDUP_PATH,
+    BLOOM_PATH,
+    BLOOM_CAPACITY,
+    BLOOM_ERROR_RATE,
+)
+from .filelock import file_lock
+
+
+class VendorIndex:
+    """
+    Base class. check() returns how many of a page's ids were already known
+    and keeps counters for the dedup ratio; the ids only join the index on
+    commit(), once their page is done, so a page fetched again after a crash
+    or a lost lease does not count its own vendors as known.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.seen = 0
+        self.duplicates = 0
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+    def _contains(self, vendor_id):
+        raise NotImplementedError
+
+    def _add(self, vendor_id):
+        raise NotImplementedError
+
+    def check(self, key, vendor_ids):
+        """
+        Count the ids already in the index and hold them back under `key`
+        (lat, long, page) until commit(key).
+        """
+        with self._lock:
+            known = sum(1 for vendor_id in vendor_ids if self._contains(vendor_id))
+            self._pending[key] = vendor_ids
+            self.seen += len(vendor_ids)
+            self.duplicates += known
+        return known
+
+    def commit(self, key):
+        """
+        Add the ids held under `key`; called when the page is marked done.
+        """
+        with self._lock:
+            for vendor_id in self._pending.pop(key, ()):
+                if not self._contains(vendor_id):
+                    self._add(vendor_id)
+
+    def discard(self, key):
+        """
+        Drop the ids held under `key`; the page was not saved.
+        """
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def stats(self):
+        ratio = self.duplicates / self.seen if self.seen else 0.0
+        return {
+            "seen": self.seen,
+            "duplicates": self.duplicates,
+            "dedup_ratio": round(ratio, 4),
+        }
+
+    def _clear(self):
+        raise NotImplementedError
+
+    def bind(self, crawl_pass):
+        """
+        Tie the index to one pass of the frontier (Frontier.crawl_pass()):
+        ids from another pass, e.g. before --fresh, are dropped so they do
+        not cut the pagination of this one short.
+        Returns:
+          - True if the index was cleared
+        """
+        marker = self.path + ".pass"
+        previous = None
+        if os.path.exists(marker):
+            with open(marker, "r", encoding="utf-8") as f:
+                previous = f.read().strip()
+        if previous == crawl_pass:
+            return False
+        with self._lock:
+            self._clear()
+        self.save(merge=False)
+        with open(marker, "w", encoding="utf-8") as f:
+            f.write(crawl_pass)
+        return True
+
+    def save(self, merge=True):
+        pass
+
+    def close(self):
+        self.save()
+
+
+class ExactIndex(VendorIndex):
+    """
+    Exact set of vendor ids; new ids are appended to `path` one per line.
+    """
+
+    def __init__(self, path=DEDUP_PATH):
+        super().__init__(path)
+        self.ids = set()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.ids.update(line.strip() for line in f if line.strip())
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _contains(self, vendor_id):
+        return vendor_id in self.ids
+
+    def _add(self, vendor_id):
+        self.ids.add(vendor_id)
+        self._file.write(vendor_id + "\n")
+
+    def _clear(self):
+        self.ids.clear()
+        self._file.close()
+        self._file = open(self.path, "w", encoding="utf-8")
+
+    def save(self, merge=True):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        self.save()
+        self._file.close()
+
+
+class BloomIndex(VendorIndex):
+    """
+    Bloom filter sized for `capacity` ids at `error_rate` false positives.
+    A false positive only means a vendor is treated as already known.
+    """
+
+    def __init__(self, path=BLOOM_PATH, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE):
+        super().__init__(path)
+        self.size = int(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self.bits = bytearray((self.size + 7) // 8)
+        self._load()
+
+    def _read(self):
+        """
+        Returns:
+          - (count, bits) saved at `path`, None if there is no file or it
+            has different parameters
+        """
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "rb") as f:
+            header = json.loads(f.readline())
+            if header["size"] != self.size or header["hashes"] != self.hashes:
+                return None
+            return header["count"], bytearray(f.read())
+
+    def _load(self):
+        saved = self._read()
+        if saved is None:
+            if os.path.exists(self.path):
+                print(f"Warning: bloom filter at {self.path} has different parameters, starting empty")
+            return
+        self.count, self.bits = saved
+
+    def __len__(self):
+        return self.count
+
+    def _positions(self, vendor_id):
+        # double hashing: h1 + i * h2
+        digest = hashlib.blake2b(vendor_id.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def _contains(self, vendor_id):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(vendor_id))
+
+    def _add(self, vendor_id):
+        for p in self._positions(vendor_id):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def _clear(self):
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _merge(self, bits):
+        # the union of two filters is the OR of their bits; the id count is
+        # estimated from the bits that are set
+        merged = int.from_bytes(self.bits, "little") | int.from_bytes(bits, "little")
+        self.bits = bytearray(merged.to_bytes(len(self.bits), "little"))
+        filled = bin(merged).count("1") / self.size
+        if filled < 1:
+            self.count = max(self.count, round(-self.size / self.hashes * math.log(1 - filled)))
+
+    def save(self, merge=True):
+        """
+        Write the filter; with `merge`, ids another worker saved meanwhile
+        are kept (OR of both filters).
+        """
+        with file_lock(self.path), self._lock:
+            saved = self._read() if merge else None
+            if saved is not None:
+                self._merge(saved[1])
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                header = {"size": self.size, "hashes": self.hashes, "count": self.count}
+                f.write(json.dumps(header).encode("utf-8") + b"\n")
+                f.write(self.bits)
+            os.replace(tmp_path, self.path)
+
+
+INDEXES = {
+    "exact": ExactIndex,
+    "bloom": BloomIndex,
+}
+
+
+def open_index(kind=DEDUP_INDEX, directory=None):
+    """
+    `directory` keeps the index file elsewhere (one index per platform).
+    Returns:
+      - VendorIndex, or None when dedup is disabled (kind is None)
+    """
+    if not kind:
+        return None
+    if directory is None:
+        return INDEXES[kind]()
+    default = DEDUP_PATH if kind == "exact" else BLOOM_PATH
+    return INDEXES[kind](os.path.join(directory, os.path.basename(default)))
@@ -0,0 +1,261 @@
+"""
+async crawl engine
+  - runs many coordinates at once on a single event loop
+  - every request goes through one global budget (requests per minute)
+    and the per-host rate controller
+  - several platforms can share the loop: their coordinates are
+    interleaved and each platform gets its own budget
+  - the rate controller still paces every host on its own, so against a
+    single host the engine is no faster than search(): the concurrency
+    pays off across hosts (several platforms or endpoints) and when the
+    host allows a higher rate (see py -m crawler.bench --hosts)
+  - after the first page of a coordinate its other pages are fetched
+    concurrently: all of them when data.count is known, a few
+    speculative ones otherwise
+  - writes the same outputs/result_{lat}_{long}_p{page}.json files as search()
+"""
+
+import asyncio
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from .client import (
+    METRICS, EMPTY, SATURATED, LAST, FAILED_PAGE, END_REASONS, CrawlContext, breaker_pause, crawl_page,
+    effective_page_size, retry_delay,
+)
+from .clock import SYSTEM_CLOCK
+from .config import ASYNC_CONCURRENCY, REQUESTS_PER_MINUTE, PREFETCH_PAGES
+from .frontier import DONE
+
+
+class RequestBudget:
+    """
+    Global request budget shared by all coordinate tasks.
+    Spaces requests evenly so the whole crawl never exceeds
+    `requests_per_minute`, no matter how many coordinates run at once.
+    The next slot is worked out from the last request actually sent, so
+    tasks that are still waiting on the rate controller do not use up slots.
+    """
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, clock=SYSTEM_CLOCK):
+        self.clock = clock
+        self.interval = 60.0 / requests_per_minute
+        self._last_sent = None
+        self.used = 0
+
+    def wait(self):
+        """
+        Returns:
+          - seconds until the budget allows the next request (0 if it does now)
+        """
+        if self._last_sent is None:
+            return 0.0
+        return max(self._last_sent + self.interval - self.clock.now(), 0.0)
+
+    def take(self):
+        self._last_sent = self.clock.now()
+        self.used += 1
+
+
+async def fetch_with_retries(lat, long, page, budget, executor, context, skip=None):
+    """
+    Crawl one page through the shared budget and the rate controller,
+    retrying failures with backoff. The page is given up before it is
+    sent once skip() is true (an earlier page ended the pagination).
+    Returns:
+      - crawl_page() outcome; FAILED_PAGE once the page was dead-lettered,
+        None if it was skipped
+    """
+    loop = asyncio.get_running_loop()
+    attempts = 0
+    while True:
+        # an open circuit pauses every worker until the trial request succeeds
+        while True:
+            if skip is not None and skip():
+                return None
+            pause = breaker_pause(context)
+            if pause <= 0:
+                break
+            await context.clock.sleep_async(pause)
+        waited = 0.0
+        while True:
+            if skip is not None and skip():
+                # the breaker's slot (maybe the half-open trial) goes unused
+                context.breaker.cancel_trial(context.host)
+                return None
+            # the budget is only taken with the host slot, both when the request goes out
+            delay = budget.wait() or context.controller.reserve(context.host)
+            if delay <= 0:
+                break
+            pending = [future for future in context.in_flight if not future.done()]
+            if pending:
+                # a response on its way changes the rate: check again after it
+                # instead of sleeping out a delay worked out at the old rate
+                await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                continue
+            await context.clock.sleep_async(delay)
+            waited += delay
+        budget.take()
+        if waited > 0:
+            METRICS.observe("phase_seconds", waited, phase="sleep")
+        print(f"Requesting data -> Lat: {lat}, Long: {long}, Page: {page}")
+
+        request = loop.run_in_executor(executor, crawl_page, lat, long, page, context, False)
+        context.in_flight.add(request)
+        try:
+            outcome = await request
+        finally:
+            context.in_flight.discard(request)
+        if outcome != FAILED_PAGE:
+            context.pages_fetched[(lat, long)] += 1
+            return outcome
+        attempts += 1
+        delay = retry_delay(lat, long, page, attempts, context)
+        if delay is None:
+            return FAILED_PAGE
+        await context.clock.sleep_async(delay)
+
+
+def next_pages(lat, long, page, context, prefetch=PREFETCH_PAGES):
+    """
+    Pages to fetch at once after the first one of a coordinate: all pages
+    up to the last one data.count announces, else `prefetch` speculative
+    pages (those past the end come back empty).
+    """
+    total = context.totals.get((lat, long))
+    size = effective_page_size(context)
+    if total is not None and size:
+        last = context.profile.first_page + math.ceil(total / size) - 1
+        # a count that no longer matches falls back to one page at a time
+        return list(range(page, last + 1)) or [page]
+    return list(range(page, page + max(1, prefetch)))
+
+
+async def search_async(lat, long, budget, executor, context, prefetch=PREFETCH_PAGES):
+    """
+    Async version of client.search() for one coordinate.
+    Pacing comes from the shared budget and the rate controller
+    instead of a per-coordinate sleep. After the first page, the
+    remaining pages are requested concurrently (see next_pages());
+    pages not sent yet are dropped once an earlier one ends the list.
+    Returns:
+      - number of saved pages
+    """
+    frontier = context.frontier
+    first_page = context.profile.first_page
+    page = frontier.next_page(lat, long, first_page) if frontier else first_page
+    pages = [page]
+    ended = []
+
+    async def fetch(p):
+        outcome = await fetch_with_retries(
+            lat, long, p, budget, executor, context, lambda: any(e < p for e in ended)
+        )
+        if outcome in (EMPTY, SATURATED, LAST, FAILED_PAGE):
+            ended.append(p)
+        return outcome
+
+    while pages:
+        outcomes = await asyncio.gather(*(fetch(p) for p in pages))
+        # pagination ends at the first page that ends it, in page order
+        stop = None
+        for page, outcome in zip(pages, outcomes):
+            if outcome in (EMPTY, SATURATED, LAST, FAILED_PAGE):
+                stop = outcome
+                break
+        if stop is not None:
+            # finish once, and keep only the closing empty page
+            if stop in END_REASONS:
+                if stop == EMPTY:
+                    context.mark(lat, long, page, DONE)
+                context.finish(lat, long, END_REASONS[stop])
+            if frontier:
+                for later, outcome in zip(pages, outcomes):
+                    if later > page and outcome == EMPTY:
+                        frontier.forget_page(lat, long, later)
+            if stop != EMPTY and stop != FAILED_PAGE:
+                page += 1
+            break
+        page = pages[-1] + 1
+        pages = next_pages(lat, long, page, context, prefetch)
+
+    context.totals.pop((lat, long), None)
+    processed_pages = page - first_page
+    METRICS.observe("pages_per_coordinate", processed_pages, platform=context.profile.name)
+    print(f"Finished processing coordinates ({lat}, {long}). Total pages: {processed_pages}")
+    return processed_pages
+
+
+async def crawl(coordinates, concurrency=ASYNC_CONCURRENCY, requests_per_minute=REQUESTS_PER_MINUTE,
+                context=None):
+    """
+    Crawl all coordinates with `concurrency` workers sharing one request budget.
+    Coordinates are pulled lazily, so any iterable works.
+    Returns:
+      - dict: {(lat, long): pages}
+    """
+    context = context or CrawlContext()
+    results = await crawl_platforms([(coordinates, context)], concurrency, requests_per_minute)
+    return {(lat, lng): pages for (_, lat, lng), pages in results.items()}
+
+
+def interleave(jobs):
+    """
+    Round-robin over the coordinates of several platforms.
+    Yields:
+      - (lat, long, context)
+    """
+    iterators = [(iter(coordinates), context) for coordinates, context in jobs]
+    while iterators:
+        for entry in list(iterators):
+            coordinates, context = entry
+            coordinate = next(coordinates, None)
+            if coordinate is None:
+                iterators.remove(entry)
+                continue
+            yield coordinate[0], coordinate[1], context
+
+
+async def crawl_platforms(jobs, concurrency=ASYNC_CONCURRENCY, requests_per_minute=REQUESTS_PER_MINUTE):
+    """
+    Crawl [(coordinates, context), ...] of several platforms together:
+    `concurrency` workers take interleaved coordinates, every platform has
+    its own `requests_per_minute` budget (and its host its own rate controller).
+    Returns:
+      - dict: {(platform, lat, long): pages}
+    """
+    budgets = {}
+    results = {}
+    tasks = interleave(jobs)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+
+        async def worker():
+            for lat, lng, context in tasks:
+                name = context.profile.name
+                if name not in budgets:
+                    budgets[name] = RequestBudget(requests_per_minute, context.clock)
+                results[(name, lat, lng)] = await search_async(
+                    lat, lng, budgets[name], executor, context
+                )
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    used = ", ".join(f"{name} {budget.used}" for name, budget in budgets.items())
+    print(f"Async crawl finished. Requests used: {used or 0}")
+    return results
+
+
+def run_async(coordinates, concurrency=ASYNC_CONCURRENCY, requests_per_minute=REQUESTS_PER_MINUTE,
+              context=None):
+    """
+    Blocking entry point for run.py
+    """
+    return asyncio.run(crawl(coordinates, concurrency, requests_per_minute, context))
+
+
+def run_platforms(jobs, concurrency=ASYNC_CONCURRENCY, requests_per_minute=REQUESTS_PER_MINUTE):
+    """
+    Blocking entry point for run.py --platforms
+    """
+    return asyncio.run(crawl_platforms(jobs, concurrency, requests_per_minute))
@@ -0,0 +1,388 @@
+"""
+columnar export of vendor records
+  - flattens finalResult entries into typed rows (one row per vendor, with the
+    crawl coordinate and page it came from)
+  - reads per-page JSON files in outputs/, NDJSON segments in outputs/stream/
+    and pages spilled to outputs/unwritten/
+  - writes Parquet (or Arrow IPC) files partitioned by platform and crawl date
+  - incremental: a manifest remembers which source files were exported and
+    the files their rows went to; a source that changed (a page re-crawled)
+    has its old rows removed before it is exported again. The manifest is
+    saved after every output file, so an interrupted export resumes
+
+usage:
+  py -m crawler.export
+  py -m crawler.export --format arrow --out outputs/export
+
+needs pyarrow (pip install pyarrow)
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+import zlib
+from collections import Counter
+
+from .config import PLATFORM, PLATFORMS, OUTPUT_DIR, STREAM_DIR, EXPORT_DIR, EXPORT_ROWS_PER_FILE
+from .profiles import get_profile
+from .vendors import iter_vendors, vendor_id
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    import pyarrow.feather as feather
+except ImportError:  # export is optional
+    pa = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+PAGE_FILE = re.compile(r"result_(?P<lat>-?[\d.]+)_(?P<long>-?[\d.]+)_p(?P<page>\d+)\.json$")
+MANIFEST = "_manifest.json"
+
+# column -> (arrow type name, candidate keys in the vendor dict)
+VENDOR_COLUMNS = {
+    "vendor_code": ("string", ("vendorCode", "code")),
+    "title": ("string", ("title", "name")),
+    "vendor_type": ("string", ("vendorType", "childType", "type")),
+    "lat": ("float64", ("lat", "latitude")),
+    "lon": ("float64", ("lon", "lng", "long", "longitude")),
+    "rating": ("float64", ("rating", "rate")),
+    "comment_count": ("int64", ("commentCount", "comment_count")),
+    "delivery_fee": ("int64", ("deliveryFee", "delivery_fee")),
+    "is_open": ("bool", ("isOpen", "is_open")),
+    "address": ("string", ("address",)),
+}
+
+
+def schema():
+    fields = [
+        ("platform", pa.string()),
+        ("crawl_lat", pa.float64()),
+        ("crawl_long", pa.float64()),
+        ("page", pa.int32()),
+        ("position", pa.int32()),
+        ("fetched_at", pa.timestamp("s")),
+        ("vendor_id", pa.string()),
+    ]
+    fields += [(name, pa.type_for_alias(kind)) for name, (kind, _) in VENDOR_COLUMNS.items()]
+    fields.append(("raw", pa.string()))
+    # source file the row was exported from (see remove_rows())
+    fields.append(("source", pa.string()))
+    return pa.schema(fields)
+
+
+def _coerce(value, kind):
+    if value is None or value == "":
+        return None
+    try:
+        if kind == "float64":
+            return float(value)
+        if kind == "int64":
+            return int(float(value))
+        if kind == "bool":
+            return value if isinstance(value, bool) else str(value).lower() in ("1", "true", "yes")
+        return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return None
+
+
+def vendor_row(vendor, platform, lat, long, page, position, fetched_at):
+    """
+    One flat, typed row for a vendor dict.
+    """
+    row = {
+        "platform": platform,
+        "crawl_lat": float(lat),
+        "crawl_long": float(long),
+        "page": int(page),
+        "position": position,
+        "fetched_at": int(fetched_at),
+        "vendor_id": vendor_id(vendor),
+    }
+    for name, (kind, keys) in VENDOR_COLUMNS.items():
+        value = next((vendor[k] for k in keys if vendor.get(k) not in (None, "")), None)
+        row[name] = _coerce(value, kind)
+    row["raw"] = json.dumps(vendor, ensure_ascii=False)
+    return row
+
+
+def page_rows(data, platform, lat, long, page, fetched_at):
+    final_result = get_profile(platform).extract(data)
+    for position, vendor in enumerate(iter_vendors(final_result)):
+        yield vendor_row(vendor, platform, lat, long, page, position, fetched_at)
+
+
+def read_page_file(path, platform):
+    match = PAGE_FILE.search(os.path.basename(path))
+    if not match:
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    yield from page_rows(
+        data, platform, match["lat"], match["long"], match["page"], os.path.getmtime(path)
+    )
+
+
+def iter_chunks(path, chunk_size=1 << 20):
+    """
+    Decompressed chunks of a segment. A gzip segment cut short by a crash
+    still yields everything up to its last sync flush.
+    """
+    with open(path, "rb") as raw:
+        if path.endswith(".zst"):
+            if zstandard is None:
+                raise RuntimeError("zstandard is needed to read .zst segments")
+            yield from zstandard.ZstdDecompressor().read_to_iter(raw, read_size=chunk_size)
+            return
+        if not path.endswith(".gz"):
+            yield from iter(lambda: raw.read(chunk_size), b"")
+            return
+
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        for chunk in iter(lambda: raw.read(chunk_size), b""):
+            while chunk:
+                yield decompressor.decompress(chunk)
+                # concatenated gzip members
+                chunk = decompressor.unused_data if decompressor.eof else b""
+                if chunk:
+                    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        if not decompressor.eof:
+            print(f"Warning: {path} is truncated, exported up to the last complete record")
+
+
+def read_segment(path):
+    """
+    Rows of an NDJSON segment; an incomplete last line is skipped.
+    """
+    buffer = b""
+    try:
+        for chunk in iter_chunks(path):
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                yield from segment_rows(line)
+    except (EOFError, zlib.error) as e:
+        print(f"Warning: {path} is damaged ({e}), exported up to the last complete record")
+
+
+def segment_rows(line):
+    if not line.strip():
+        return
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return
+    meta = (record["platform"], record["lat"], record["long"], record["page"])
+    if "vendor" in record:
+        # per-vendor records do not keep their position on the page
+        yield vendor_row(record["vendor"], *meta, None, record["fetched_at"])
+    else:
+        yield from page_rows(record["data"], *meta, record["fetched_at"])
+
+
+def discover_sources(output_dir=OUTPUT_DIR, stream_dir=STREAM_DIR, platform=PLATFORM):
+    """
+    All finished source files: page JSON files, spilled pages and closed
+    segments, also in the per-platform subdirectories of multi-platform runs.
+    Returns:
+      - sorted list of (path, platform)
+    """
+    sources = []
+    layouts = [(output_dir, stream_dir, platform)] + [
+        (os.path.join(output_dir, name), os.path.join(stream_dir, name), name) for name in PLATFORMS
+    ]
+    for pages_dir, segments_dir, owner in layouts:
+        for directory in (pages_dir, os.path.join(pages_dir, "unwritten")):
+            if os.path.isdir(directory):
+                sources += [(os.path.join(directory, n), owner) for n in os.listdir(directory) if PAGE_FILE.search(n)]
+        if os.path.isdir(segments_dir):
+            sources += [
+                (os.path.join(segments_dir, n), owner) for n in os.listdir(segments_dir)
+                if ".ndjson" in n and not n.endswith(".part")
+            ]
+    return sorted(sources)
+
+
+class PartitionWriter:
+    """
+    Buffers rows per (platform, date) partition and writes a file every
+    `rows_per_file` rows; on_file(path, rows) is called after each file.
+    """
+
+    def __init__(self, export_dir, fmt, rows_per_file=EXPORT_ROWS_PER_FILE, on_file=None):
+        self.export_dir = export_dir
+        self.fmt = fmt
+        self.rows_per_file = rows_per_file
+        self.on_file = on_file
+        self.schema = schema()
+        self.buffers = {}
+        self.files = 0
+        self.rows = 0
+        self._prefix = f"part-{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}"
+        self._sequence = 0
+
+    def add(self, row):
+        date = time.strftime("%Y-%m-%d", time.gmtime(row["fetched_at"]))
+        key = (row["platform"], date)
+        buffer = self.buffers.setdefault(key, [])
+        buffer.append(row)
+        if len(buffer) >= self.rows_per_file:
+            self._write(key)
+
+    def _write(self, key):
+        rows = self.buffers.pop(key, [])
+        if not rows:
+            return
+        platform, date = key
+        directory = os.path.join(self.export_dir, f"platform={platform}", f"date={date}")
+        os.makedirs(directory, exist_ok=True)
+
+        table = pa.Table.from_pylist(rows, schema=self.schema)
+        extension = "parquet" if self.fmt == "parquet" else "arrow"
+        while True:
+            # another export in the same second (and process) may have used the name
+            path = os.path.join(directory, f"{self._prefix}-{self._sequence:05d}.{extension}")
+            self._sequence += 1
+            if not os.path.exists(path):
+                break
+        if self.fmt == "parquet":
+            pq.write_table(table, path, compression="zstd")
+        else:
+            feather.write_feather(table, path, compression="zstd")
+        self.files += 1
+        self.rows += len(rows)
+        if self.on_file:
+            self.on_file(path, rows)
+
+    def close(self):
+        for key in list(self.buffers):
+            self._write(key)
+
+
+def load_manifest(export_dir):
+    path = os.path.join(export_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(export_dir, manifest):
+    path = os.path.join(export_dir, MANIFEST)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(path + ".tmp", path)
+
+
+def remove_rows(export_dir, manifest, sources):
+    """
+    Drop the rows of `sources` from the files they were exported to, so a
+    source exported again does not duplicate them. Manifests of older
+    exports (a bare [size, mtime] per source) do not list files; their
+    rows stay.
+    Returns:
+      - number of rows removed
+    """
+    files = {}
+    for source in sources:
+        entry = manifest.get(source)
+        for name in entry["files"] if isinstance(entry, dict) else ():
+            files.setdefault(name, set()).add(source)
+
+    removed = 0
+    for name, stale in files.items():
+        path = os.path.join(export_dir, name)
+        if not os.path.exists(path):
+            continue
+        parquet = path.endswith(".parquet")
+        table = pq.read_table(path) if parquet else feather.read_table(path)
+        kept = table.filter(pc.invert(pc.is_in(table["source"], value_set=pa.array(sorted(stale)))))
+        removed += table.num_rows - kept.num_rows
+        if not kept.num_rows:
+            os.remove(path)
+            continue
+        temp = path + ".tmp"
+        if parquet:
+            pq.write_table(kept, temp, compression="zstd")
+        else:
+            feather.write_feather(kept, temp, compression="zstd")
+        os.replace(temp, path)
+
+    for source in sources:
+        manifest[source] = {"signature": None, "files": []}
+    save_manifest(export_dir, manifest)
+    return removed
+
+
+def export(export_dir=EXPORT_DIR, fmt="parquet", platform=PLATFORM,
+           output_dir=OUTPUT_DIR, stream_dir=STREAM_DIR):
+    """
+    Export every source file that changed since the last export (replacing
+    the rows it had exported before).
+    Returns:
+      - dict: sources, rows, files, replaced (old rows removed)
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow is required for export (pip install pyarrow)")
+
+    os.makedirs(export_dir, exist_ok=True)
+    manifest = load_manifest(export_dir)
+
+    changed = []
+    for path, owner in discover_sources(output_dir, stream_dir, platform):
+        stat = os.stat(path)
+        signature = [stat.st_size, stat.st_mtime]
+        entry = manifest.get(path)
+        if (entry["signature"] if isinstance(entry, dict) else entry) != signature:
+            changed.append((path, owner, signature))
+    replaced = remove_rows(export_dir, manifest, [path for path, _, _ in changed])
+
+    # rows of each source still buffered, signatures of sources read to the end
+    pending, read = Counter(), {}
+
+    def on_file(path, rows):
+        name = os.path.relpath(path, export_dir)
+        for source in Counter(row["source"] for row in rows):
+            manifest[source]["files"].append(name)
+        pending.subtract(row["source"] for row in rows)
+        for source in [s for s in read if not pending[s]]:
+            # every row of the source is in a file now
+            manifest[source]["signature"] = read.pop(source)
+        save_manifest(export_dir, manifest)
+
+    writer = PartitionWriter(export_dir, fmt, on_file=on_file)
+    for path, owner, signature in changed:
+        rows = read_segment(path) if ".ndjson" in path else read_page_file(path, owner)
+        for row in rows:
+            row["source"] = path
+            pending[path] += 1
+            writer.add(row)
+        if pending[path]:
+            read[path] = signature
+        else:
+            manifest[path]["signature"] = signature
+
+    writer.close()
+    save_manifest(export_dir, manifest)
+    return {"sources": len(changed), "rows": writer.rows, "files": writer.files, "replaced": replaced}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="export vendor records to Parquet / Arrow")
+    parser.add_argument("--format", choices=("parquet", "arrow"), default="parquet")
+    parser.add_argument("--out", default=EXPORT_DIR)
+    args = parser.parse_args()
+
+    result = export(args.out, args.format)
+    print(f"Exported {result['rows']} vendor rows from {result['sources']} new sources "
+          f"into {result['files']} files under {args.out} ({result['replaced']} old rows replaced)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+lock shared by processes on the same machine
+  - local workers share outputs/ (spatial.json, the Bloom filter) and merge
+    their state into those files under this lock instead of overwriting
+  - a lock file created with O_EXCL, so it works on every OS
+  - a lock file older than `stale` seconds was left by a crashed process
+    and is taken over
+"""
+
+import contextlib
+import os
+import time
+
+from .config import LOCK_TIMEOUT, LOCK_STALE
+
+
+@contextlib.contextmanager
+def file_lock(path, timeout=LOCK_TIMEOUT, stale=LOCK_STALE):
+    """
+    Hold `path` + ".lock" for the duration of the with block.
+    Raises:
+      - TimeoutError if the lock is not free within `timeout` seconds
+    """
+    lock_path = path + ".lock"
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > stale:
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                # released (or taken over) meanwhile
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"could not lock {path} within {timeout} s")
+            time.sleep(0.05)
+    try:
+        os.write(fd, str(os.getpid()).encode("ascii"))
+        yield
+    finally:
+        os.close(fd)
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
@@ -0,0 +1,465 @@
+"""
+persistent crawl frontier (SQLite, WAL mode)
+  - every (platform, lat, long, page) is pending, in_flight, done, failed
+    or dead (retries exhausted, waiting in the dead-letter queue)
+  - coordinates remember whether their last page was reached
+  - run.py resumes from exactly where a killed process stopped
+  - workers lease coordinates with a timeout; leases of dead workers
+    expire and their coordinates go back to the queue
+  - settings the page numbers depend on (page_size) are kept with the
+    progress, so a resumed crawl keeps paginating the same way
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from .config import FRONTIER_PATH, PLATFORM
+
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+FAILED = "failed"
+DEAD = "dead"
+
+# why a coordinate stopped paginating
+END_EMPTY = 1
+END_SATURATED = 2
+END_COUNT = 3
+END_COVERED = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS coordinates (
+    platform TEXT NOT NULL,
+    lat REAL NOT NULL,
+    long REAL NOT NULL,
+    position INTEGER NOT NULL,
+    finished INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (platform, lat, long)
+);
+CREATE TABLE IF NOT EXISTS pages (
+    platform TEXT NOT NULL,
+    lat REAL NOT NULL,
+    long REAL NOT NULL,
+    page INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (platform, lat, long, page)
+);
+CREATE INDEX IF NOT EXISTS pages_state ON pages (platform, state);
+CREATE INDEX IF NOT EXISTS coordinates_position ON coordinates (platform, position);
+CREATE TABLE IF NOT EXISTS leases (
+    platform TEXT NOT NULL,
+    lat REAL NOT NULL,
+    long REAL NOT NULL,
+    worker TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (platform, lat, long)
+);
+CREATE TABLE IF NOT EXISTS settings (
+    platform TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (platform, key)
+);
+"""
+
+# coordinates (alias c) that still have work: see Frontier.pending_coordinates()
+PENDING_WHERE = f"""
+    c.platform = ? AND (
+        c.finished = 0 OR EXISTS (
+            SELECT 1 FROM pages p
+            WHERE p.platform = c.platform AND p.lat = c.lat AND p.long = c.long
+              AND p.state != '{DONE}'
+        )
+    ) AND NOT EXISTS (
+        SELECT 1 FROM pages p
+        WHERE p.platform = c.platform AND p.lat = c.lat AND p.long = c.long
+          AND p.state = '{DEAD}'
+    )
+"""
+
+
+class Frontier:
+    """
+    Durable record of crawl progress. Safe to share between threads.
+    """
+
+    def __init__(self, path=FRONTIER_PATH, platform=PLATFORM):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.platform = platform
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def _execute(self, sql, args=()):
+        with self._lock:
+            cursor = self.conn.execute(sql, args)
+            self.conn.commit()
+            return cursor.fetchall()
+
+    def add_coordinates(self, coordinates, batch=10_000):
+        """
+        Register coordinates (already known ones keep their progress).
+        Any iterable works (e.g. a crawler.coordinates source); rows are
+        written `batch` at a time.
+        Returns:
+          - number of new coordinates
+        """
+        added = 0
+        with self._lock:
+            position = self.conn.execute(
+                "SELECT COALESCE(MAX(position), -1) + 1 FROM coordinates WHERE platform = ?",
+                (self.platform,),
+            ).fetchone()[0]
+            rows = []
+            for lat, lng in coordinates:
+                rows.append((self.platform, lat, lng, position))
+                position += 1
+                if len(rows) >= batch:
+                    added += self._insert_coordinates(rows)
+                    rows = []
+            added += self._insert_coordinates(rows)
+        return added
+
+    def _insert_coordinates(self, rows):
+        cursor = self.conn.executemany(
+            "INSERT OR IGNORE INTO coordinates (platform, lat, long, position) VALUES (?, ?, ?, ?)", rows
+        )
+        self.conn.commit()
+        return cursor.rowcount if rows else 0
+
+    def recover(self):
+        """
+        Pages left in_flight by a killed process go back to pending
+        (pages of coordinates leased by a live worker are left alone).
+        Returns:
+          - number of recovered pages
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self.conn.execute(
+                """
+                UPDATE pages SET state = ?, updated_at = ? WHERE platform = ? AND state = ? AND NOT EXISTS (
+                    SELECT 1 FROM leases l
+                    WHERE l.platform = pages.platform AND l.lat = pages.lat AND l.long = pages.long
+                      AND l.expires >= ?
+                )
+                """,
+                (PENDING, now, self.platform, IN_FLIGHT, now),
+            )
+            self.conn.commit()
+            return cursor.rowcount
+
+    def pending_coordinates(self, limit=None):
+        """
+        Coordinates whose last page has not been reached yet, or that still
+        have pages which are not done (e.g. queued for writing when the
+        process died), in .env order (the first `limit` only). Coordinates
+        with a dead page wait for replay_dead().
+        """
+        rows = self._execute(
+            f"SELECT c.lat, c.long FROM coordinates c WHERE {PENDING_WHERE} ORDER BY c.position LIMIT ?",
+            (self.platform, -1 if limit is None else limit),
+        )
+        return [(lat, lng) for lat, lng in rows]
+
+    def iter_pending(self, batch=1000):
+        """
+        Pending coordinates in .env order, read `batch` at a time, so huge
+        coordinate lists are never held in memory. Coordinates finished
+        meanwhile are left out.
+        """
+        position = -1
+        while True:
+            rows = self._execute(
+                f"SELECT c.position, c.lat, c.long FROM coordinates c WHERE {PENDING_WHERE} "
+                "AND c.position > ? ORDER BY c.position LIMIT ?",
+                (self.platform, position, batch),
+            )
+            if not rows:
+                return
+            for position, lat, lng in rows:
+                yield lat, lng
+
+    def count_pending(self):
+        return self._execute(
+            f"SELECT COUNT(*) FROM coordinates c WHERE {PENDING_WHERE}", (self.platform,)
+        )[0][0]
+
+    def lease(self, worker, seconds):
+        """
+        Reserve the first pending coordinate nobody holds for `seconds`.
+        Expired leases are dropped first and their in_flight pages re-queued.
+        The transaction is IMMEDIATE, so processes sharing the database
+        never lease the same coordinate.
+        Returns:
+          - (lat, long), or None when no coordinate is free
+        """
+        now = time.time()
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute(
+                    """
+                    UPDATE pages SET state = ?, updated_at = ? WHERE platform = ? AND state = ? AND EXISTS (
+                        SELECT 1 FROM leases l
+                        WHERE l.platform = pages.platform AND l.lat = pages.lat AND l.long = pages.long
+                          AND l.expires < ?
+                    )
+                    """,
+                    (PENDING, now, self.platform, IN_FLIGHT, now),
+                )
+                self.conn.execute("DELETE FROM leases WHERE platform = ? AND expires < ?", (self.platform, now))
+                row = self.conn.execute(
+                    f"""
+                    SELECT c.lat, c.long FROM coordinates c WHERE {PENDING_WHERE} AND NOT EXISTS (
+                        SELECT 1 FROM leases l WHERE l.platform = c.platform AND l.lat = c.lat AND l.long = c.long
+                    )
+                    ORDER BY c.position LIMIT 1
+                    """,
+                    (self.platform,),
+                ).fetchone()
+                if row:
+                    self.conn.execute(
+                        "INSERT INTO leases VALUES (?, ?, ?, ?, ?)", (self.platform, *row, worker, now + seconds)
+                    )
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+        return tuple(row) if row else None
+
+    def renew(self, lat, long, worker, seconds):
+        """
+        Extend a lease (heartbeat).
+        Returns:
+          - False if the lease expired and was taken over
+        """
+        with self._lock:
+            cursor = self.conn.execute(
+                "UPDATE leases SET expires = ? WHERE platform = ? AND lat = ? AND long = ? AND worker = ?",
+                (time.time() + seconds, self.platform, lat, long, worker),
+            )
+            self.conn.commit()
+            return cursor.rowcount > 0
+
+    def release(self, lat, long, worker):
+        self._execute(
+            "DELETE FROM leases WHERE platform = ? AND lat = ? AND long = ? AND worker = ?",
+            (self.platform, lat, long, worker),
+        )
+
+    def leases(self):
+        """
+        Returns:
+          - list of dicts: lat, long, worker, expires (live leases only)
+        """
+        rows = self._execute(
+            "SELECT lat, long, worker, expires FROM leases WHERE platform = ? AND expires >= ? ORDER BY expires",
+            (self.platform, time.time()),
+        )
+        return [{"lat": lat, "long": lng, "worker": worker, "expires": expires}
+                for lat, lng, worker, expires in rows]
+
+    def next_page(self, lat, long, first_page):
+        """
+        Page to continue from: the first page that is not done,
+        otherwise the page after the last done one.
+        """
+        rows = self._execute(
+            "SELECT MIN(page) FROM pages WHERE platform = ? AND lat = ? AND long = ? AND state != ?",
+            (self.platform, lat, long, DONE),
+        )
+        if rows[0][0] is not None:
+            return rows[0][0]
+
+        rows = self._execute(
+            "SELECT MAX(page) FROM pages WHERE platform = ? AND lat = ? AND long = ? AND state = ?",
+            (self.platform, lat, long, DONE),
+        )
+        return first_page if rows[0][0] is None else rows[0][0] + 1
+
+    def mark(self, lat, long, page, state, error=None):
+        """
+        Record the state of one page. Moving to in_flight counts an attempt.
+        """
+        attempt = 1 if state == IN_FLIGHT else 0
+        self._execute(
+            """
+            INSERT INTO pages (platform, lat, long, page, state, attempts, error, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (platform, lat, long, page) DO UPDATE SET
+                state = excluded.state,
+                attempts = attempts + excluded.attempts,
+                error = excluded.error,
+                updated_at = excluded.updated_at
+            """,
+            (self.platform, lat, long, page, state, attempt, error, time.time()),
+        )
+
+    def forget_page(self, lat, long, page):
+        """
+        Drop a page that turned out to lie past the end of the list (a
+        speculative prefetch), so only the closing empty page is kept.
+        """
+        self._execute(
+            "DELETE FROM pages WHERE platform = ? AND lat = ? AND long = ? AND page = ?",
+            (self.platform, lat, long, page),
+        )
+
+    def dead_letter(self, lat, long, page):
+        """
+        Retries exhausted: park the page (with its last error) in the
+        dead-letter queue; its coordinate is skipped until replay_dead().
+        """
+        self._execute(
+            "UPDATE pages SET state = ?, updated_at = ? WHERE platform = ? AND lat = ? AND long = ? AND page = ?",
+            (DEAD, time.time(), self.platform, lat, long, page),
+        )
+
+    def dead_letters(self):
+        """
+        Returns:
+          - list of dicts: lat, long, page, attempts, error
+        """
+        rows = self._execute(
+            "SELECT lat, long, page, attempts, error FROM pages WHERE platform = ? AND state = ? ORDER BY updated_at",
+            (self.platform, DEAD),
+        )
+        return [
+            {"lat": lat, "long": lng, "page": page, "attempts": attempts, "error": error}
+            for lat, lng, page, attempts, error in rows
+        ]
+
+    def replay_dead(self):
+        """
+        Move dead pages back to pending so the next run retries them.
+        Returns:
+          - number of replayed pages
+        """
+        with self._lock:
+            cursor = self.conn.execute(
+                "UPDATE pages SET state = ?, updated_at = ? WHERE platform = ? AND state = ?",
+                (PENDING, time.time(), self.platform, DEAD),
+            )
+            self.conn.commit()
+            return cursor.rowcount
+
+    def finish_coordinate(self, lat, long, reason=END_EMPTY):
+        """
+        Last page reached (END_EMPTY, or END_COUNT when data.count said so
+        without the closing empty page), the rest is known vendors
+        (END_SATURATED) or its whole service area already was (END_COVERED,
+        see crawler.spatial); the coordinate is skipped on the next run.
+        """
+        self._execute(
+            "UPDATE coordinates SET finished = ? WHERE platform = ? AND lat = ? AND long = ?",
+            (reason, self.platform, lat, long),
+        )
+
+    def coordinate_stats(self):
+        """
+        Per-coordinate depth, used by the coverage planner.
+        Returns:
+          - list of dicts: lat, long, finished, vendor_pages
+        """
+        rows = self._execute(
+            """
+            SELECT c.lat, c.long, c.finished,
+                   (SELECT COUNT(*) FROM pages p
+                    WHERE p.platform = c.platform AND p.lat = c.lat AND p.long = c.long
+                      AND p.state = ?)
+            FROM coordinates c WHERE c.platform = ? ORDER BY c.position
+            """,
+            (DONE, self.platform),
+        )
+        return [
+            {
+                "lat": lat,
+                "long": lng,
+                "finished": finished,
+                # the closing empty page is stored as done but holds no vendors
+                "vendor_pages": done - 1 if finished == END_EMPTY else done,
+            }
+            for lat, lng, finished, done in rows
+        ]
+
+    def get_setting(self, key, default=None):
+        rows = self._execute(
+            "SELECT value FROM settings WHERE platform = ? AND key = ?", (self.platform, key)
+        )
+        return json.loads(rows[0][0]) if rows else default
+
+    def set_setting(self, key, value):
+        self._execute(
+            "INSERT OR REPLACE INTO settings (platform, key, value) VALUES (?, ?, ?)",
+            (self.platform, key, json.dumps(value)),
+        )
+
+    def setdefault_setting(self, key, value):
+        """
+        Store `value` unless the setting exists (first worker wins).
+        Returns:
+          - the stored value
+        """
+        self._execute(
+            "INSERT OR IGNORE INTO settings (platform, key, value) VALUES (?, ?, ?)",
+            (self.platform, key, json.dumps(value)),
+        )
+        return self.get_setting(key, value)
+
+    def crawl_pass(self):
+        """
+        Id of the current pass over the coordinates; reset() starts a new one.
+        Indexes built while crawling (vendor ids, spatial) belong to one pass.
+        Returns:
+          - the pass id
+        """
+        return self.setdefault_setting("pass", uuid.uuid4().hex)
+
+    def reset(self):
+        """
+        Forget all progress (and settings) of this platform.
+        """
+        self._execute("DELETE FROM pages WHERE platform = ?", (self.platform,))
+        self._execute("DELETE FROM coordinates WHERE platform = ?", (self.platform,))
+        self._execute("DELETE FROM leases WHERE platform = ?", (self.platform,))
+        self._execute("DELETE FROM settings WHERE platform = ?", (self.platform,))
+
+    def summary(self):
+        """
+        Returns:
+          - dict with page counts per state and finished/total coordinates
+        """
+        result = {state: 0 for state in (PENDING, IN_FLIGHT, DONE, FAILED, DEAD)}
+        for state, count in self._execute(
+            "SELECT state, COUNT(*) FROM pages WHERE platform = ? GROUP BY state", (self.platform,)
+        ):
+            result[state] = count
+        finished, total = self._execute(
+            "SELECT COALESCE(SUM(finished > 0), 0), COUNT(*) FROM coordinates WHERE platform = ?",
+            (self.platform,),
+        )[0]
+        result["coordinates_finished"] = finished
+        result["coordinates_total"] = total
+        result["leased"] = self._execute(
+            "SELECT COUNT(*) FROM leases WHERE platform = ? AND expires >= ?", (self.platform, time.time())
+        )[0][0]
+        return result
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,361 @@
+"""
+incremental recrawl
+  - a compact snapshot (SQLite) keeps one content hash per vendor
+  - DeltaSink stores only what changed: insert / update / remove records
+    in compressed NDJSON segments (outputs/delta/) instead of every page
+  - ETag / Last-Modified of each page are kept for conditional requests;
+    a 304 marks the page's vendors as still present without downloading them
+  - a vendor is removed when the coordinate it was last seen at was crawled
+    to its last page in this run without returning it
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .config import (
+    PLATFORM,
+    INCREMENTAL_PATH,
+    INCREMENTAL_IGNORE_FIELDS,
+    DELTA_DIR,
+    CONDITIONAL_REQUESTS,
+)
+from .profiles import get_profile
+from .sinks import Sink, NDJSONSink
+from .vendors import iter_vendors, vendor_id
+
+INSERT = "insert"
+UPDATE = "update"
+REMOVE = "remove"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS vendors (
+    platform TEXT NOT NULL,
+    vendor_id TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    lat REAL NOT NULL,
+    long REAL NOT NULL,
+    last_run INTEGER NOT NULL,
+    removed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (platform, vendor_id)
+);
+CREATE TABLE IF NOT EXISTS validators (
+    platform TEXT NOT NULL,
+    lat REAL NOT NULL,
+    long REAL NOT NULL,
+    page INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    vendor_ids TEXT NOT NULL,
+    vendors INTEGER,
+    total INTEGER,
+    PRIMARY KEY (platform, lat, long, page)
+);
+CREATE TABLE IF NOT EXISTS runs (
+    platform TEXT NOT NULL,
+    run INTEGER NOT NULL,
+    closed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (platform, run)
+);
+CREATE TABLE IF NOT EXISTS finished (
+    platform TEXT NOT NULL,
+    run INTEGER NOT NULL,
+    lat REAL NOT NULL,
+    long REAL NOT NULL,
+    PRIMARY KEY (platform, run, lat, long)
+);
+CREATE INDEX IF NOT EXISTS vendors_location ON vendors (platform, lat, long);
+"""
+
+
+def vendor_hash(vendor, ignore=INCREMENTAL_IGNORE_FIELDS):
+    """
+    Content hash of a vendor record, without fields that change with the
+    request location or time of day.
+    """
+    content = {k: v for k, v in vendor.items() if k not in ignore}
+    encoded = json.dumps(content, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=12).hexdigest()
+
+
+class Incremental:
+    """
+    Snapshot of the last known state of every vendor plus page validators.
+    A run stays open across restarts (resumed crawls) until finish_run().
+    Safe to share between threads.
+    """
+
+    def __init__(self, path=INCREMENTAL_PATH, platform=PLATFORM, conditional=CONDITIONAL_REQUESTS):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        self.platform = platform
+        self.conditional = conditional
+        self.counts = {INSERT: 0, UPDATE: 0, REMOVE: 0, "unchanged": 0, "not_modified": 0}
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+        self.run = self._open_run()
+
+    def _migrate(self):
+        # snapshots written before pages kept their vendor count and data.count
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(validators)")}
+        for column in ("vendors", "total"):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE validators ADD COLUMN {column} INTEGER")
+        self.conn.commit()
+
+    def _open_run(self):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT run FROM runs WHERE platform = ? AND closed = 0", (self.platform,)
+            ).fetchone()
+            if row:
+                return row[0]
+            last = self.conn.execute("SELECT MAX(run) FROM runs WHERE platform = ?", (self.platform,)).fetchone()[0]
+            run = max(int(time.time()), (last or 0) + 1)
+            self.conn.execute("INSERT INTO runs (platform, run) VALUES (?, ?)", (self.platform, run))
+            self.conn.commit()
+            return run
+
+    # conditional requests
+
+    def request_headers(self, lat, long, page):
+        """
+        If-None-Match / If-Modified-Since for a page fetched before (empty dict otherwise).
+        """
+        if not self.conditional:
+            return {}
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified FROM validators WHERE platform = ? AND lat = ? AND long = ? AND page = ?",
+                (self.platform, lat, long, page),
+            ).fetchone()
+        headers = {}
+        if row and row[0]:
+            headers["If-None-Match"] = row[0]
+        if row and row[1]:
+            headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def remember_page(self, lat, long, page, response_headers, final_result, total=None):
+        """
+        Keep the page's validators (if the API sent any), its vendor ids,
+        its vendor count and data.count (`total`, None if not sent).
+        """
+        etag = response_headers.get("ETag")
+        last_modified = response_headers.get("Last-Modified")
+        if not self.conditional or not (etag or last_modified):
+            return
+        ids = [vendor_id(v) for v in iter_vendors(final_result)]
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO validators VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.platform, lat, long, page, etag, last_modified, json.dumps([i for i in ids if i]),
+                 len(final_result), total),
+            )
+            self.conn.commit()
+
+    def touch_page(self, lat, long, page):
+        """
+        A 304 page: its vendors are still there and unchanged.
+        Returns:
+          - (vendor count, data.count) stored with the page, None if unknown
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT vendor_ids, vendors, total FROM validators "
+                "WHERE platform = ? AND lat = ? AND long = ? AND page = ?",
+                (self.platform, lat, long, page),
+            ).fetchone()
+            ids = json.loads(row[0]) if row else []
+            self.conn.executemany(
+                "UPDATE vendors SET last_run = ?, lat = ?, long = ? WHERE platform = ? AND vendor_id = ?",
+                [(self.run, lat, long, self.platform, i) for i in ids],
+            )
+            self.conn.commit()
+            self.counts["not_modified"] += 1
+        return (row[1], row[2]) if row else (None, None)
+
+    # change detection
+
+    def diff_page(self, data, lat, long, page):
+        """
+        Compare a page with the snapshot and update the snapshot.
+        Returns:
+          - list of (op, vendor id, hash, vendor) for inserted / updated vendors
+        """
+        vendors = {}
+        for vendor in iter_vendors(get_profile(self.platform).extract(data)):
+            key = vendor_id(vendor)
+            if key is not None:
+                vendors[key] = vendor
+        if not vendors:
+            return []
+
+        changes, rows = [], []
+        with self._lock:
+            known = {}
+            ids = list(vendors)
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                known.update(
+                    (key, (digest, removed)) for key, digest, removed in self.conn.execute(
+                        f"SELECT vendor_id, hash, removed FROM vendors WHERE platform = ? "
+                        f"AND vendor_id IN ({','.join('?' * len(chunk))})",
+                        (self.platform, *chunk),
+                    )
+                )
+
+            for key, vendor in vendors.items():
+                digest = vendor_hash(vendor)
+                previous = known.get(key)
+                if previous is None or previous[1]:
+                    changes.append((INSERT, key, digest, vendor))
+                elif previous[0] != digest:
+                    changes.append((UPDATE, key, digest, vendor))
+                else:
+                    self.counts["unchanged"] += 1
+                rows.append((self.platform, key, digest, lat, long, self.run))
+
+            self.conn.executemany(
+                """
+                INSERT INTO vendors (platform, vendor_id, hash, lat, long, last_run, removed)
+                VALUES (?, ?, ?, ?, ?, ?, 0)
+                ON CONFLICT (platform, vendor_id) DO UPDATE SET
+                    hash = excluded.hash, lat = excluded.lat, long = excluded.long,
+                    last_run = excluded.last_run, removed = 0
+                """,
+                rows,
+            )
+            self.conn.commit()
+            for op, *_ in changes:
+                self.counts[op] += 1
+        return changes
+
+    def finish_coordinate(self, lat, long):
+        """
+        The coordinate was crawled to its last page in this run.
+        """
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO finished VALUES (?, ?, ?, ?)", (self.platform, self.run, lat, long)
+            )
+            self.conn.commit()
+
+    def finish_run(self):
+        """
+        Close the run: vendors last seen at a fully crawled coordinate that
+        did not show up again are removed.
+        Returns:
+          - list of (vendor id, lat, long) removed in this run
+        """
+        with self._lock:
+            removed = self.conn.execute(
+                """
+                SELECT v.vendor_id, v.lat, v.long FROM vendors v
+                JOIN finished f ON f.platform = v.platform AND f.run = ? AND f.lat = v.lat AND f.long = v.long
+                WHERE v.platform = ? AND v.removed = 0 AND v.last_run < ?
+                """,
+                (self.run, self.platform, self.run),
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE vendors SET removed = 1 WHERE platform = ? AND vendor_id = ?",
+                [(self.platform, key) for key, _, _ in removed],
+            )
+            self.conn.execute("UPDATE runs SET closed = 1 WHERE platform = ? AND run = ?", (self.platform, self.run))
+            self.conn.execute("DELETE FROM finished WHERE platform = ? AND run = ?", (self.platform, self.run))
+            self.conn.commit()
+            self.counts[REMOVE] += len(removed)
+        return removed
+
+    def start_run(self):
+        """
+        Open the next run after finish_run() (the scheduler opens one per pass).
+        """
+        self.run = self._open_run()
+
+    def finished_coordinates(self):
+        """
+        Coordinates crawled to their last page in the open run.
+        """
+        with self._lock:
+            return {
+                (lat, long) for lat, long in self.conn.execute(
+                    "SELECT lat, long FROM finished WHERE platform = ? AND run = ?", (self.platform, self.run)
+                )
+            }
+
+    def stats(self):
+        with self._lock:
+            active = self.conn.execute(
+                "SELECT COUNT(*) FROM vendors WHERE platform = ? AND removed = 0", (self.platform,)
+            ).fetchone()[0]
+        return {"run": self.run, "vendors": active, **self.counts}
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class DeltaSink(Sink):
+    """
+    Sink of the incremental mode: pages are diffed against the snapshot and
+    only changed vendors are appended to the delta stream.
+    """
+
+    def __init__(self, incremental, delta_dir=DELTA_DIR):
+        self.incremental = incremental
+        self.stream = NDJSONSink(delta_dir)
+
+    def _lines(self, records):
+        return [json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n" for record in records]
+
+    def write_page(self, data, lat, long, page):
+        changes = self.incremental.diff_page(data, lat, long, page)
+        if not changes:
+            return "snapshot (no changes)"
+        now = time.time()
+        records = (
+            {"op": op, "platform": self.incremental.platform, "vendor_id": key, "hash": digest,
+             "lat": lat, "long": long, "page": page, "at": now, "vendor": vendor}
+            for op, key, digest, vendor in changes
+        )
+        path = self.stream.write_lines(self._lines(records))
+        return f"{path} ({len(changes)} changed vendors)"
+
+    def finish_run(self):
+        """
+        Emit removals and close the run (call once the whole pass is done).
+        Returns:
+          - list of (vendor id, lat, long) removed in this run
+        """
+        removed = self.incremental.finish_run()
+        now = time.time()
+        records = (
+            {"op": REMOVE, "platform": self.incremental.platform, "vendor_id": key,
+             "lat": lat, "long": long, "at": now}
+            for key, lat, long in removed
+        )
+        if removed:
+            self.stream.write_lines(self._lines(records))
+        return removed
+
+    def flush(self):
+        self.stream.flush()
+
+    def enable_sync(self):
+        self.stream.enable_sync()
+
+    def sync(self):
+        self.stream.sync()
+
+    def close(self):
+        self.stream.close()
@@ -0,0 +1,281 @@
+"""
+metrics for long-running crawls
+  - counters and histograms with labels, kept in memory
+  - Prometheus text format on a local HTTP endpoint (/metrics, /metrics.json)
+  - periodic JSON snapshot file
+  - gauges read from other components (transport, writer) on every export
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+PHASE_BUCKETS = (0.001, 0.01, 0.1, 0.5, 1, 5, 10, 30, 60, 120, 300)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 15, 20, 30, 50, 100)
+
+
+class Histogram:
+    """
+    Cumulative buckets (Prometheus "le" semantics), sum and count.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q):
+        """
+        Upper bound of the bucket holding the q-quantile (None if empty).
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound if bound != float("inf") else self.buckets[-1]
+        return None
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+        }
+
+
+def _key(name, labels):
+    # label values are exported as text; str() keeps keys sortable (200 vs "error")
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Metrics:
+    """
+    Registry of counters, histograms and gauge callbacks.
+    Metric names get the `namespace` prefix on export. Safe to use from
+    several threads.
+    """
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._help = {}
+        self._buckets = {}
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+
+    def counter(self, name, help_text):
+        self._help[name] = ("counter", help_text)
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self._help[name] = ("histogram", help_text)
+        self._buckets[name] = buckets
+
+    def gauges(self, name, collect):
+        """
+        Export every number of the dict returned by collect() as a gauge
+        `{name}_{key}`.
+        """
+        self._gauges[name] = collect
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self._buckets.get(name, LATENCY_BUCKETS))
+            histogram.observe(value)
+
+    def timer(self, name, **labels):
+        """
+        Context manager observing the elapsed seconds of the block.
+        """
+        return _Timer(self, name, labels)
+
+    def _collect_gauges(self):
+        values = {}
+        for name, collect in self._gauges.items():
+            try:
+                data = collect()
+            except Exception:
+                continue
+            for key, value in data.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    values[f"{name}_{key}"] = value
+        return values
+
+    def render(self):
+        """
+        Prometheus text exposition format.
+        """
+        ns = self.namespace
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+
+        described = set()
+
+        def describe(name, kind):
+            if name not in described:
+                help_text = self._help.get(name, (kind, name))[1]
+                lines.append(f"# HELP {ns}_{name} {help_text}")
+                lines.append(f"# TYPE {ns}_{name} {kind}")
+                described.add(name)
+
+        for (name, labels), value in counters:
+            describe(name, "counter")
+            lines.append(f"{ns}_{name}{_label_text(labels)} {value}")
+
+        for (name, labels), histogram in histograms:
+            describe(name, "histogram")
+            for bound, total in histogram.cumulative():
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{ns}_{name}_bucket{_label_text(labels + (('le', le),))} {total}")
+            lines.append(f"{ns}_{name}_sum{_label_text(labels)} {histogram.sum}")
+            lines.append(f"{ns}_{name}_count{_label_text(labels)} {histogram.count}")
+
+        for name, value in sorted(self._collect_gauges().items()):
+            lines.append(f"# TYPE {ns}_{name} gauge")
+            lines.append(f"{ns}_{name} {value}")
+
+        lines.append(f"# TYPE {ns}_uptime_seconds gauge")
+        lines.append(f"{ns}_uptime_seconds {time.time() - self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """
+        Returns:
+          - dict: counters, histogram summaries and gauges, keyed "name{labels}"
+        """
+        with self._lock:
+            counters = {f"{name}{_label_text(labels)}": value for (name, labels), value in self._counters.items()}
+            histograms = {
+                f"{name}{_label_text(labels)}": histogram.summary()
+                for (name, labels), histogram in self._histograms.items()
+            }
+        return {
+            "time": time.time(),
+            "uptime_seconds": round(time.time() - self.started, 3),
+            "counters": counters,
+            "histograms": histograms,
+            "gauges": self._collect_gauges(),
+        }
+
+
+class _Timer:
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.started
+        self.metrics.observe(self.name, self.elapsed, **self.labels)
+        return False
+
+
+def serve(metrics, port, host="127.0.0.1"):
+    """
+    Serve /metrics (Prometheus text) and /metrics.json on a background thread.
+    Returns:
+      - the HTTP server (call shutdown() to stop it)
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.startswith("/metrics.json"):
+                body = json.dumps(metrics.snapshot()).encode("utf-8")
+                content_type = "application/json"
+            elif self.path.startswith("/metrics"):
+                body = metrics.render().encode("utf-8")
+                content_type = "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"Metrics at http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+class SnapshotWriter:
+    """
+    Writes metrics.snapshot() to `path` every `interval` seconds
+    (atomically, so readers never see a half-written file).
+    """
+
+    def __init__(self, metrics, path, interval=60):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+        self._thread.start()
+
+    def write(self):
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.metrics.snapshot(), f, ensure_ascii=False, indent=4)
+        os.replace(self.path + ".tmp", self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                print(f"Could not write metrics snapshot: {e}")
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.write()
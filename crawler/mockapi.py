@@ -0,0 +1,294 @@
+"""
+offline stand-in for the vendors-list API
+  - same pagination contract: lat, long, page, page_size -> data.finalResult
+    (plus data.count), an empty finalResult after the last page
+  - synthetic vendors scattered over an area, each visible within a
+    service radius, so neighbouring coordinates overlap like the real API
+  - configurable latency, 5xx error rate and 429 rate (with Retry-After)
+  - page_size above max_page_size is capped, like real APIs do
+  - optional ETag / If-None-Match (304) support and vendor churn for
+    incremental recrawl tests
+  - counts requests, statuses and the vendors it served
+
+usage:
+  py -m crawler.mockapi --port 8000 --vendors 5000 --latency 0.05 --rate-limit 0.02
+  py run.py --base-url http://127.0.0.1:8000/vendors-list
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from .config import FIRST_PAGE, DEFAULT_PARAMS, PLATFORM, PLATFORMS
+
+# area around Tehran, same order as planner --bbox
+DEFAULT_BBOX = (35.56, 51.20, 35.83, 51.60)
+KM_PER_DEGREE = 111.32
+
+
+class MockAPI:
+    """
+    Dataset, fault injection and request counters of the mock server.
+    """
+
+    def __init__(
+        self,
+        vendors=5000,
+        bbox=DEFAULT_BBOX,
+        service_radius=3.0,
+        latency=0.02,
+        latency_jitter=0.5,
+        error_rate=0.0,
+        rate_limit=0.0,
+        retry_after=5,
+        first_page=FIRST_PAGE,
+        max_page_size=50,
+        etag=False,
+        seed=1,
+    ):
+        self.service_radius = service_radius
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.first_page = first_page
+        self.max_page_size = max_page_size
+        self.etag = etag
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        min_lat, min_lng, max_lat, max_lng = bbox
+        self.vendors = []
+        for i in range(vendors):
+            self.vendors.append({
+                "id": 100000 + i,
+                "vendorCode": f"v{i:06d}",
+                "title": f"vendor {i}",
+                "vendorType": self.random.choice(("RESTAURANT", "CAFE", "SUPERMARKET", "CONFECTIONERY")),
+                "lat": round(self.random.uniform(min_lat, max_lat), 6),
+                "lon": round(self.random.uniform(min_lng, max_lng), 6),
+                "rating": round(self.random.uniform(2.5, 5.0), 1),
+                "commentCount": self.random.randint(0, 5000),
+                "deliveryFee": self.random.choice((0, 5000, 9000, 15000)),
+                "isOpen": self.random.random() < 0.8,
+            })
+
+        # grid buckets of one service radius, so a lookup only scans 3x3 cells
+        self.cell = service_radius / KM_PER_DEGREE
+        self._index()
+        self.reset_stats()
+
+    def _index(self):
+        self.grid = {}
+        for vendor in self.vendors:
+            self.grid.setdefault(self._cell_of(vendor["lat"], vendor["lon"]), []).append(vendor)
+
+    def churn(self, update=0.0, remove=0.0):
+        """
+        Change the rating of a fraction of vendors and drop another fraction.
+        Returns:
+          - (updated ids, removed ids)
+        """
+        updated, removed, kept = [], [], []
+        for vendor in self.vendors:
+            roll = self.random.random()
+            if roll < remove:
+                removed.append(vendor["id"])
+                continue
+            if roll < remove + update:
+                vendor["rating"] = round(min(5.0, vendor["rating"] + 0.1), 1)
+                vendor["commentCount"] += 1
+                updated.append(vendor["id"])
+            kept.append(vendor)
+        self.vendors = kept
+        self._index()
+        return updated, removed
+
+    def _cell_of(self, lat, lng):
+        return int(lat // self.cell), int(lng // self.cell)
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = 0
+            self.statuses = Counter()
+            self.pages = 0
+            self.served = set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "statuses": dict(self.statuses),
+                "vendor_pages": self.pages,
+                "unique_vendors": len(self.served),
+            }
+
+    def nearby(self, lat, lng):
+        """
+        Vendors serving (lat, lng), nearest first.
+        """
+        row, col = self._cell_of(lat, lng)
+        scale = math.cos(math.radians(lat))
+        found = []
+        for d_row in (-1, 0, 1):
+            for d_col in (-1, 0, 1):
+                for vendor in self.grid.get((row + d_row, col + d_col), ()):
+                    d_lat = (vendor["lat"] - lat) * KM_PER_DEGREE
+                    d_lng = (vendor["lon"] - lng) * KM_PER_DEGREE * scale
+                    distance = math.hypot(d_lat, d_lng)
+                    if distance <= self.service_radius:
+                        found.append((distance, vendor["id"], vendor))
+        found.sort(key=lambda item: item[:2])
+        return [vendor for _, _, vendor in found]
+
+    def respond(self, query, if_none_match=None):
+        """
+        Returns:
+          - (status, headers, body dict or None for 304)
+        """
+        if self.latency:
+            time.sleep(self.latency * self.random.uniform(1 - self.latency_jitter, 1 + self.latency_jitter))
+
+        roll = self.random.random()
+        if roll < self.rate_limit:
+            return self._count(429, {"Retry-After": str(self.retry_after)}, {"error": "too many requests"})
+        if roll < self.rate_limit + self.error_rate:
+            return self._count(500, {}, {"error": "internal error"})
+
+        try:
+            lat = float(query["lat"])
+            lng = float(query["long"])
+            page = int(query.get("page", self.first_page))
+            page_size = int(query.get("page_size", DEFAULT_PARAMS.get("page_size", 20)))
+        except (KeyError, ValueError):
+            return self._count(400, {}, {"error": "bad query"})
+        page_size = min(page_size, self.max_page_size)
+
+        vendors = self.nearby(lat, lng)
+        start = (page - self.first_page) * page_size
+        chunk = vendors[start:start + page_size] if start >= 0 else []
+        body = {
+            "status": True,
+            "data": {
+                "count": len(vendors),
+                "finalResult": [{"type": "VENDOR", "data": vendor} for vendor in chunk],
+            },
+        }
+        if not self.etag:
+            return self._count(200, {}, body, chunk)
+
+        digest = hashlib.blake2b(json.dumps(body, sort_keys=True).encode("utf-8"), digest_size=8).hexdigest()
+        etag = f'"{digest}"'
+        if if_none_match == etag:
+            return self._count(304, {"ETag": etag}, None)
+        return self._count(200, {"ETag": etag}, body, chunk)
+
+    def _count(self, status, headers, body, vendors=()):
+        with self._lock:
+            self.requests += 1
+            self.statuses[status] += 1
+            if vendors:
+                self.pages += 1
+                self.served.update(vendor["id"] for vendor in vendors)
+        return status, headers, body
+
+
+def make_handler(api):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # headers and body go out in separate writes; avoid the delayed-ACK stall
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+            status, headers, body = api.respond(query, self.headers.get("If-None-Match"))
+            payload = b"" if body is None else json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            if body is not None:
+                self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_server(api, host="127.0.0.1", port=0):
+    """
+    Serve `api` on a background thread.
+    Returns:
+      - (server, base_url); call server.shutdown() when done
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(api))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="mock-api", daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}/vendors-list"
+
+
+def add_arguments(parser):
+    parser.add_argument("--vendors", type=int, default=5000, help="dataset size")
+    parser.add_argument("--bbox", nargs=4, type=float, default=DEFAULT_BBOX,
+                        metavar=("MIN_LAT", "MIN_LNG", "MAX_LAT", "MAX_LNG"))
+    parser.add_argument("--service-radius", type=float, default=3.0, help="vendor delivery radius in km")
+    parser.add_argument("--latency", type=float, default=0.02, help="mean response latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 500 responses")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fraction of 429 responses")
+    parser.add_argument("--retry-after", type=int, default=5, help="Retry-After of 429 responses")
+    parser.add_argument("--max-page-size", type=int, default=50, help="largest page_size served")
+    parser.add_argument("--etag", action="store_true", help="send ETags and answer If-None-Match with 304")
+    parser.add_argument("--platform", choices=sorted(PLATFORMS), default=PLATFORM,
+                        help="page numbering of this platform")
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def api_from_args(args):
+    return MockAPI(
+        vendors=args.vendors,
+        bbox=tuple(args.bbox),
+        service_radius=args.service_radius,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        retry_after=args.retry_after,
+        max_page_size=args.max_page_size,
+        etag=args.etag,
+        first_page=PLATFORMS[args.platform]["first_page"],
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="offline vendors-list API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    api = api_from_args(args)
+    server, base_url = start_server(api, args.host, args.port)
+    print(f"Mock vendors-list API with {len(api.vendors)} vendors at {base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"Mock API: {api.stats()}")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
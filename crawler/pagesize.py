@@ -0,0 +1,276 @@
+"""
+page_size probing
+  - the page_size of config.PLATFORMS is small; bigger pages mean fewer
+    requests per coordinate (and fewer rate-limit waits)
+  - probe() asks for the first page of one coordinate with growing page
+    sizes and keeps the largest the API returns in full: no error and no
+    truncation (checked against data.count when the response has it)
+  - without data.count a short page may just be a location with few
+    vendors, so the next coordinate is probed (PAGE_SIZE_PROBE_COORDINATES)
+  - only a size the API was seen to return in full counts: a location
+    with fewer vendors than the next candidate leaves the probe at the
+    last confirmed size and inconclusive (not cached)
+  - the first page the probe fetched with the size the crawl then uses is
+    saved as that coordinate's first page instead of being requested again
+  - conclusive sizes are cached per platform and endpoint for PAGE_SIZE_TTL
+  - the frontier keeps the page size of a crawl in progress, so resumed
+    coordinates are paginated with the size their pages were numbered with
+
+usage:
+  py -m crawler.pagesize
+  py -m crawler.pagesize --platform snappexpress --base-url http://127.0.0.1:8000/vendors-list
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import time
+
+from .client import METRICS, CrawlContext, fetch_page, save_page, wait_for_slot
+from .config import (
+    PLATFORM, PLATFORMS, PAGE_SIZE_MAX, PAGE_SIZE_PROBE_COORDINATES, PAGE_SIZE_CACHE, PAGE_SIZE_TTL,
+)
+from .coordinates import open_coordinates
+from .frontier import IN_FLIGHT
+from .profiles import get_profile
+
+METRICS.counter("probe_requests_total", "page_size probe requests by HTTP status (error = no response)")
+
+
+def candidate_sizes(start, maximum=PAGE_SIZE_MAX):
+    """
+    Page sizes tried by probe(): `start`, doubled until `maximum`.
+    """
+    size = start
+    while size < maximum:
+        yield size
+        size *= 2
+    yield maximum
+
+
+def probe(lat, long, context, maximum=PAGE_SIZE_MAX):
+    """
+    Find the largest page size the API honours at (lat, long).
+    Every attempt waits for a rate controller slot like a crawl request.
+    Returns:
+      - (page size, requests used, conclusive, page): the size is the
+        largest one confirmed; not conclusive when the probe stopped on a
+        429 / 5xx / network error, the location has too few vendors to
+        test bigger pages or, without data.count, a page came back short;
+        page is (data, headers) of the first page fetched with that size,
+        or None
+    """
+    profile = context.profile
+    best = profile.page_size
+    page = None
+    requests = 0
+    for size in candidate_sizes(best, maximum):
+        wait_for_slot(context)
+        requests += 1
+        started = time.monotonic()
+        response = None
+        try:
+            response = fetch_page(lat, long, profile.first_page, context.base_url, profile=profile, page_size=size)
+            data = response.json() if response.status_code == 200 else None
+        except Exception as e:
+            print(f"page_size probe {size}: {e}")
+            data = None
+
+        status = response.status_code if response is not None else None
+        context.controller.record(
+            context.host, status, time.monotonic() - started,
+            response.headers.get("Retry-After") if response is not None else None,
+        )
+        context.breaker.record(context.host, status)
+        METRICS.inc("probe_requests_total", status=status or "error", platform=profile.name)
+
+        if status is None or status == 429 or status >= 500:
+            # says nothing about the page size
+            return best, requests, False, page
+        if data is None:
+            # 4xx: the API rejects this page size
+            print(f"page_size {size} rejected (status {status})")
+            return best, requests, True, page
+
+        if size == best:
+            # the platform's own page size: a regular first page whatever comes back
+            page = (data, response.headers)
+        vendors = len(profile.extract(data))
+        total = profile.total(data)
+        if not vendors:
+            return best, requests, False, page
+        if vendors >= (size if total is None else min(size, total)):
+            if total is not None and total <= size:
+                # every vendor fit: bigger pages cannot be told apart here
+                return best, requests, False, page
+            best, page = size, (data, response.headers)
+            continue
+
+        if total is None:
+            # a server cap or just the last vendors here: cannot tell
+            print(f"page_size {size} returned {vendors} vendors, no data.count to tell why")
+            return best, requests, False, page
+        print(f"page_size {size} truncated to {vendors} vendors")
+        # the API caps page_size at what it returned
+        if vendors > best:
+            best, page = vendors, (data, response.headers)
+        break
+
+    return best, requests, True, page
+
+
+def probe_coordinates(coordinates, context, maximum=PAGE_SIZE_MAX, limit=PAGE_SIZE_PROBE_COORDINATES):
+    """
+    probe() the first `limit` coordinates until one is conclusive.
+    Returns:
+      - (largest page size found or None, requests used, conclusive,
+        dict (lat, long) -> (page size, data, headers) of the probe pages)
+    """
+    best, requests, pages = None, 0, {}
+    for lat, lng in coordinates[:limit]:
+        size, used, conclusive, page = probe(lat, lng, context, maximum)
+        best, requests = max(best or 0, size), requests + used
+        if page is not None:
+            pages[(lat, lng)] = (size, *page)
+        if conclusive:
+            return best, requests, True, pages
+        print(f"page_size probe at ({lat}, {lng}) was not conclusive")
+    return best, requests, False, pages
+
+
+class PageSizeCache:
+    """
+    Probed page sizes per platform and endpoint, trusted for `ttl` seconds.
+    """
+
+    def __init__(self, path=PAGE_SIZE_CACHE, ttl=PAGE_SIZE_TTL):
+        self.path = path
+        self.ttl = ttl
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, platform, base_url):
+        """
+        Returns:
+          - cached page size, None if missing or expired
+        """
+        entry = self._load().get(f"{platform} {base_url}")
+        if entry is None or time.time() - entry["probed_at"] > self.ttl:
+            return None
+        return entry["page_size"]
+
+    def put(self, platform, base_url, page_size):
+        entries = self._load()
+        entries[f"{platform} {base_url}"] = {"page_size": page_size, "probed_at": time.time()}
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp = self.path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2)
+        os.replace(temp, self.path)
+
+
+def page_size_for(context, coordinates, frontier=None, cache=None):
+    """
+    Page size of this crawl: the frontier's while a crawl is in progress,
+    else the cached one, else a new probe at the first of `coordinates`
+    that gives a conclusive answer (an inconclusive one still gives the
+    largest size confirmed, which is used but not cached).
+    Sets context.page_size and saves the probe pages of that size.
+    Returns:
+      - (page size, probe requests used)
+    """
+    profile = context.profile
+    if not profile.page_size:
+        # the platform's API has no page_size parameter
+        return None, 0
+    pinned = frontier.get_setting("page_size") if frontier else None
+    if pinned:
+        return pinned, 0
+
+    cache = cache or PageSizeCache()
+    size = cache.get(profile.name, context.base_url)
+    requests, pages = 0, {}
+    if size is None and coordinates:
+        size, requests, conclusive, pages = probe_coordinates(coordinates, context)
+        print(f"[{profile.name}] Probed page_size: {size} (default {profile.page_size}, {requests} requests)")
+        if conclusive:
+            cache.put(profile.name, context.base_url, size)
+    size = size or profile.page_size
+    if frontier:
+        size = frontier.setdefault_setting("page_size", size)
+    context.page_size = size
+    save_probe_pages(context, pages, size)
+    return size, requests
+
+
+def save_probe_pages(context, pages, size):
+    """
+    Save the probe pages fetched with `size` as the first page of their
+    coordinate, unless the crawl already has that page.
+    """
+    first_page = context.profile.first_page
+    frontier = context.frontier
+    saved = 0
+    for (lat, lng), (page_size, data, headers) in pages.items():
+        if page_size != size:
+            continue
+        if frontier and frontier.next_page(lat, lng, first_page) != first_page:
+            continue
+        context.mark(lat, lng, first_page, IN_FLIGHT)
+        save_page(lat, lng, first_page, data, headers, context)
+        saved += 1
+    if saved:
+        # a background writer marks the pages done once they are written
+        context.sink.flush()
+        print(f"[{context.profile.name}] Kept {saved} probe pages as first pages")
+
+
+def requests_saved(vendors_fetched, page_size, default):
+    """
+    Estimate of the requests saved by paginating with `page_size` instead
+    of `default`: pages the fetched vendors of every coordinate take at
+    each size.
+    """
+    if not page_size or not default or page_size <= default:
+        return 0
+    return sum(math.ceil(n / default) - math.ceil(n / page_size) for n in vendors_fetched.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="find the largest page_size the vendors-list API honours")
+    parser.add_argument("--platform", choices=sorted(PLATFORMS), default=PLATFORM)
+    parser.add_argument("--base-url", default=None,
+                        help="vendors-list endpoint (e.g. a local crawler.mockapi server)")
+    parser.add_argument("--coordinates", default=None,
+                        help="coordinates file (.env, .csv, .ndjson, .geojson); its first coordinates are probed")
+    parser.add_argument("--max", type=int, default=PAGE_SIZE_MAX, help="largest page_size tried")
+    args = parser.parse_args()
+
+    coordinates = list(itertools.islice(open_coordinates(args.coordinates), PAGE_SIZE_PROBE_COORDINATES))
+    if not coordinates:
+        print("No coordinates found in .env file. Exiting.")
+        return
+
+    context = CrawlContext(base_url=args.base_url, profile=get_profile(args.platform))
+    size, requests, conclusive, _ = probe_coordinates(coordinates, context, args.max)
+    print(f"page_size {size} (default {context.profile.page_size}), {requests} requests")
+    if conclusive:
+        PageSizeCache().put(context.profile.name, context.base_url, size)
+        print(f"Cached in {PAGE_SIZE_CACHE}")
+    else:
+        print("Probe was not conclusive, nothing cached")
+
+
+if __name__ == "__main__":
+    main()
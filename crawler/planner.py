@@ -0,0 +1,226 @@
+"""
+coverage planner
+  - builds a hex (or square grid) cover of a bounding box / polygon for a
+    given service radius, instead of typing coordinates into .env by hand
+  - refines a plan from frontier results: cells whose pagination runs deep
+    are split into smaller cells, cells that returned nothing are dropped
+  - writes the .env line format read by load_coordinates(), plus a plan
+    file that keeps each cell's radius for the next refinement
+
+usage:
+  py -m crawler.planner --bbox 35.56 51.20 35.83 51.60 --radius 3 --out .env
+  py -m crawler.planner --polygon tehran.geojson --radius 3 --out .env
+  py -m crawler.planner --refine --out .env
+"""
+
+import argparse
+import json
+import math
+import os
+
+from .config import PLAN_PATH, PLAN_DEEP_PAGES, PLAN_MIN_RADIUS
+from .frontier import Frontier, END_EMPTY
+
+KM_PER_DEGREE = 111.32
+
+
+def km_to_degrees(lat, km):
+    """
+    Returns:
+      - (dlat, dlng) in degrees for `km` at latitude `lat`
+    """
+    dlat = km / KM_PER_DEGREE
+    dlng = km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+    return dlat, dlng
+
+
+def distance_km(lat1, lng1, lat2, lng2):
+    """
+    Equirectangular distance, accurate enough at city scale.
+    """
+    x = math.radians(lng2 - lng1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return math.hypot(x, y) * 6371.0
+
+
+def point_in_polygon(lat, lng, polygon):
+    """
+    Ray casting test; polygon is a list of (lat, lng).
+    """
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        lat_i, lng_i = polygon[i]
+        lat_j, lng_j = polygon[j]
+        if (lng_i > lng) != (lng_j > lng):
+            crossing = (lat_j - lat_i) * (lng - lng_i) / (lng_j - lng_i) + lat_i
+            if lat < crossing:
+                inside = not inside
+        j = i
+    return inside
+
+
+def bbox_polygon(min_lat, min_lng, max_lat, max_lng):
+    return [(min_lat, min_lng), (min_lat, max_lng), (max_lat, max_lng), (max_lat, min_lng)]
+
+
+def load_polygon(path):
+    """
+    Read the first Polygon of a GeoJSON file (Feature, FeatureCollection or geometry).
+    Returns:
+      - list of (lat, lng)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        geojson = json.load(f)
+
+    if geojson.get("type") == "FeatureCollection":
+        geojson = geojson["features"][0]
+    if geojson.get("type") == "Feature":
+        geojson = geojson["geometry"]
+    rings = geojson["coordinates"]
+    if geojson["type"] == "MultiPolygon":
+        rings = rings[0]
+    # GeoJSON order is [lng, lat]
+    return [(lat, lng) for lng, lat in rings[0]]
+
+
+def cell_vertices(lat, lng, radius_km, shape):
+    dlat, dlng = km_to_degrees(lat, radius_km)
+    if shape == "grid":
+        angles = (45, 135, 225, 315)
+    else:
+        angles = (30, 90, 150, 210, 270, 330)
+    return [
+        (lat + dlat * math.sin(math.radians(a)), lng + dlng * math.cos(math.radians(a)))
+        for a in angles
+    ]
+
+
+def cover(polygon, radius_km, shape="hex"):
+    """
+    Cells of `radius_km` whose circles cover the polygon.
+      - hex: pointy-top hexagons inscribed in the service circle (fewest cells)
+      - grid: squares inscribed in the service circle
+    Returns:
+      - list of dicts: lat, lng, radius
+    """
+    min_lat = min(p[0] for p in polygon)
+    max_lat = max(p[0] for p in polygon)
+    min_lng = min(p[1] for p in polygon)
+    max_lng = max(p[1] for p in polygon)
+
+    if shape == "grid":
+        row_km = col_km = radius_km * math.sqrt(2)
+    else:
+        row_km, col_km = radius_km * 1.5, radius_km * math.sqrt(3)
+
+    cells = []
+    row_step, _ = km_to_degrees(min_lat, row_km)
+    lat = min_lat
+    row = 0
+    while lat <= max_lat + row_step:
+        _, col_step = km_to_degrees(lat, col_km)
+        # odd hex rows are shifted by half a column
+        lng = min_lng - (col_step / 2 if shape == "hex" and row % 2 else 0)
+        while lng <= max_lng + col_step:
+            points = [(lat, lng)] + cell_vertices(lat, lng, radius_km, shape)
+            if any(point_in_polygon(p_lat, p_lng, polygon) for p_lat, p_lng in points) or any(
+                distance_km(lat, lng, p_lat, p_lng) <= radius_km for p_lat, p_lng in polygon
+            ):
+                cells.append({"lat": round(lat, 6), "lng": round(lng, 6), "radius": radius_km})
+            lng += col_step
+        lat += row_step
+        row += 1
+    return cells
+
+
+def split_cell(cell, shape="hex"):
+    """
+    Replace a cell by a cover of the same area with half the radius.
+    """
+    radius = cell["radius"] / 2
+    polygon = cell_vertices(cell["lat"], cell["lng"], cell["radius"], shape)
+    return cover(polygon, radius, shape)
+
+
+def refine(cells, stats, deep_pages=PLAN_DEEP_PAGES, min_radius=PLAN_MIN_RADIUS, shape="hex"):
+    """
+    Adapt a plan to crawl results (see Frontier.coordinate_stats()).
+      - finished on an empty first page: dropped
+      - `deep_pages` or more pages of vendors: split into smaller cells
+      - everything else, and cells never crawled, are kept
+    Returns:
+      - (new cells, dict with kept/dropped/split counts)
+    """
+    by_coordinate = {(round(s["lat"], 6), round(s["long"], 6)): s for s in stats}
+    result, counts = [], {"kept": 0, "dropped": 0, "split": 0}
+
+    for cell in cells:
+        stat = by_coordinate.get((cell["lat"], cell["lng"]))
+        if stat and stat["finished"] == END_EMPTY and stat["vendor_pages"] == 0:
+            counts["dropped"] += 1
+        elif stat and stat["vendor_pages"] >= deep_pages and cell["radius"] / 2 >= min_radius:
+            counts["split"] += 1
+            result.extend(split_cell(cell, shape))
+        else:
+            counts["kept"] += 1
+            result.append(cell)
+
+    # children of neighbouring cells can land on the same point
+    unique = {(c["lat"], c["lng"]): c for c in result}
+    return list(unique.values()), counts
+
+
+def write_env(cells, path):
+    """
+    Write cells in the .env format read by config.load_coordinates().
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        for cell in cells:
+            f.write(json.dumps({"lat": cell["lat"], "lng": cell["lng"]}) + ",\n")
+
+
+def save_plan(cells, shape, path=PLAN_PATH):
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"shape": shape, "cells": cells}, f, ensure_ascii=False, indent=4)
+
+
+def load_plan(path=PLAN_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        plan = json.load(f)
+    return plan["cells"], plan.get("shape", "hex")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="coordinate coverage planner")
+    area = parser.add_mutually_exclusive_group(required=True)
+    area.add_argument("--bbox", nargs=4, type=float, metavar=("MIN_LAT", "MIN_LNG", "MAX_LAT", "MAX_LNG"))
+    area.add_argument("--polygon", help="GeoJSON file with the area polygon")
+    area.add_argument("--refine", action="store_true", help="refine the saved plan from frontier results")
+    parser.add_argument("--radius", type=float, default=3.0, help="service radius in km")
+    parser.add_argument("--shape", choices=("hex", "grid"), default="hex")
+    parser.add_argument("--plan", default=PLAN_PATH, help="plan file (cells with radius)")
+    parser.add_argument("--out", default=".env", help="coordinates file for run.py")
+    args = parser.parse_args()
+
+    if args.refine:
+        cells, shape = load_plan(args.plan)
+        frontier = Frontier()
+        cells, counts = refine(cells, frontier.coordinate_stats(), shape=shape)
+        frontier.close()
+        print(f"Refined plan: {counts}")
+    else:
+        shape = args.shape
+        polygon = load_polygon(args.polygon) if args.polygon else bbox_polygon(*args.bbox)
+        cells = cover(polygon, args.radius, shape)
+
+    save_plan(cells, shape, args.plan)
+    write_env(cells, args.out)
+    print(f"{len(cells)} coordinates written to {args.out} (plan: {args.plan})")
+
+
+if __name__ == "__main__":
+    main()
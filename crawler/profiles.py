@@ -0,0 +1,82 @@
+"""
+platform profiles
+  - everything that differs between vendors-list APIs (config.PLATFORMS):
+    endpoint, headers, query params, first page index and where the
+    vendor list sits in a response
+  - the crawl engine is the same for every platform; run.py --platforms
+    crawls several of them in one process
+"""
+
+from urllib.parse import urlparse
+
+from .config import PLATFORM, PLATFORMS
+
+
+class Profile:
+    """
+    One platform's vendors-list API.
+    """
+
+    def __init__(self, name, base_url, headers, params, first_page, result_path=("data", "finalResult")):
+        self.name = name
+        self.base_url = base_url
+        self.headers = headers
+        self.params = params
+        self.first_page = first_page
+        self.result_path = tuple(result_path)
+
+    @property
+    def host(self):
+        return urlparse(self.base_url).netloc
+
+    @property
+    def page_size(self):
+        return self.params.get("page_size")
+
+    def build_params(self, lat, long, page, page_size=None):
+        """
+        Query params for one page of the vendors list
+        (`page_size` instead of the profile's, e.g. a probed one).
+        """
+        params = self.params.copy()
+        params.update({"lat": lat, "long": long, "page": page})
+        if page_size:
+            params["page_size"] = page_size
+        return params
+
+    def extract(self, data):
+        """
+        The vendor list (finalResult) of a response (empty list if missing).
+        """
+        for key in self.result_path:
+            if not isinstance(data, dict):
+                return []
+            data = data.get(key)
+        return data if isinstance(data, list) else []
+
+    def total(self, data):
+        """
+        Number of vendors at the location (the count next to finalResult), None if missing.
+        """
+        for key in self.result_path[:-1]:
+            if not isinstance(data, dict):
+                return None
+            data = data.get(key)
+        count = data.get("count") if isinstance(data, dict) else None
+        return count if isinstance(count, int) else None
+
+
+PROFILES = {name: Profile(name, **settings) for name, settings in PLATFORMS.items()}
+
+
+def get_profile(name=PLATFORM):
+    """
+    Returns:
+      - Profile of a platform in config.PLATFORMS
+    Raises:
+      - ValueError for unknown platforms
+    """
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown platform {name!r}, expected one of {', '.join(PROFILES)}") from None
@@ -0,0 +1,211 @@
+"""
+rate controllers
+  - decide how long to wait before the next request to a host
+  - FixedDelayController: the old random 60-120 s delay
+  - AIMDController: additive increase / multiplicative decrease per host
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from .clock import SYSTEM_CLOCK
+from .config import (
+    RATE_CONTROLLER,
+    FIXED_MIN_DELAY,
+    FIXED_MAX_DELAY,
+    AIMD_INITIAL_DELAY,
+    AIMD_MIN_DELAY,
+    AIMD_MAX_DELAY,
+    AIMD_INCREASE,
+    AIMD_DECREASE,
+    AIMD_LATENCY_FACTOR,
+    AIMD_JITTER,
+)
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header (seconds or HTTP date).
+    Returns:
+      - seconds to wait, or None
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_congestion(status):
+    """
+    True for responses that mean "slow down": errors, 429 and 5xx.
+    """
+    return status is None or status == 429 or status >= 500
+
+
+class RateController:
+    """
+    Base class: per-host request pacing.
+    reserve(host) takes the host's slot when it is due, else says how long
+    to wait before asking again, so it works the same for sequential
+    search() and the async engine. The gap after the last request is
+    worked out from the current delay each time, so requests that are
+    already waiting pick up a rate change instead of keeping a slot booked
+    at the old rate.
+    Times are measured on `clock` (real time unless a VirtualClock is given).
+    """
+
+    def __init__(self, clock=None):
+        self.clock = clock or SYSTEM_CLOCK
+        self._lock = threading.Lock()
+        self._last_sent = {}
+        self._not_before = {}
+        # jitter of the gap after the last request, drawn once per request
+        self._draw = {}
+
+    def current_delay(self, host, draw=0.5):
+        """
+        Returns:
+          - seconds between two requests to host; draw (0..1) picks the jitter
+        """
+        raise NotImplementedError
+
+    def reserve(self, host):
+        """
+        Take the next request slot for host if it is due.
+        Returns:
+          - 0 when the request may be sent now, else seconds to wait before
+            calling reserve() again
+        """
+        with self._lock:
+            now = self.clock.now()
+            due = self._not_before.get(host, 0.0)
+            last = self._last_sent.get(host)
+            if last is not None:
+                due = max(due, last + self.current_delay(host, self._draw[host]))
+            if due > now:
+                return due - now
+            self._last_sent[host] = now
+            self._draw[host] = random.random()
+            return 0.0
+
+    def record(self, host, status, latency, retry_after=None):
+        """
+        Feed back the outcome of a request.
+          - status: HTTP status code, None if the request raised
+          - latency: seconds the request took
+          - retry_after: raw Retry-After header value
+        """
+
+    def _push_back(self, host, seconds):
+        # nobody sends before `seconds` from now
+        with self._lock:
+            self._not_before[host] = max(self._not_before.get(host, 0.0), self.clock.now() + seconds)
+
+
+class FixedDelayController(RateController):
+    """
+    Random delay between FIXED_MIN_DELAY and FIXED_MAX_DELAY after every request
+    (the original crawler behaviour).
+    """
+
+    def __init__(self, min_delay=FIXED_MIN_DELAY, max_delay=FIXED_MAX_DELAY, clock=None):
+        super().__init__(clock)
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+
+    def current_delay(self, host, draw=0.5):
+        return self.min_delay + draw * (self.max_delay - self.min_delay)
+
+    def record(self, host, status, latency, retry_after=None):
+        seconds = parse_retry_after(retry_after)
+        if seconds:
+            self._push_back(host, seconds)
+
+
+class AIMDController(RateController):
+    """
+    Adaptive per-host rate.
+      - healthy response: rate += increase (requests/minute)
+      - 429 / 5xx / exception / latency above baseline * latency_factor:
+        rate *= decrease
+      - Retry-After: no request to the host before it expires
+    """
+
+    # latencies below this are treated as noise, not congestion
+    MIN_BASELINE_LATENCY = 0.1
+
+    def __init__(
+        self,
+        initial_delay=AIMD_INITIAL_DELAY,
+        min_delay=AIMD_MIN_DELAY,
+        max_delay=AIMD_MAX_DELAY,
+        increase=AIMD_INCREASE,
+        decrease=AIMD_DECREASE,
+        latency_factor=AIMD_LATENCY_FACTOR,
+        jitter=AIMD_JITTER,
+        clock=None,
+    ):
+        super().__init__(clock)
+        self.initial_rate = 60.0 / initial_delay
+        self.min_rate = 60.0 / max_delay
+        self.max_rate = 60.0 / min_delay
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.jitter = jitter
+        self.rates = {}
+        self._latency = {}
+        self._baseline = {}
+
+    def current_delay(self, host, draw=0.5):
+        delay = 60.0 / self.rates.get(host, self.initial_rate)
+        return delay * (1 - self.jitter + 2 * self.jitter * draw)
+
+    def _latency_spike(self, host, latency):
+        # exponentially weighted latency vs. the best average seen so far
+        if latency is None:
+            return False
+        average = self._latency.get(host, latency) * 0.8 + latency * 0.2
+        self._latency[host] = average
+        baseline = min(self._baseline.get(host, average) * 1.01, average)
+        self._baseline[host] = baseline
+        return average > max(baseline, self.MIN_BASELINE_LATENCY) * self.latency_factor
+
+    def record(self, host, status, latency, retry_after=None):
+        with self._lock:
+            rate = self.rates.get(host, self.initial_rate)
+            if is_congestion(status) or self._latency_spike(host, latency):
+                rate = max(self.min_rate, rate * self.decrease)
+            elif status < 400:
+                rate = min(self.max_rate, rate + self.increase)
+            self.rates[host] = rate
+
+        seconds = parse_retry_after(retry_after)
+        if seconds:
+            self._push_back(host, seconds)
+
+
+CONTROLLERS = {
+    "fixed": FixedDelayController,
+    "aimd": AIMDController,
+}
+
+_default_controller = None
+
+
+def get_controller(name=RATE_CONTROLLER):
+    """
+    Process-wide controller, so per-host state survives across coordinates.
+    """
+    global _default_controller
+    if _default_controller is None:
+        _default_controller = CONTROLLERS[name]()
+    return _default_controller
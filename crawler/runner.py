@@ -0,0 +1,339 @@
+"""
+Main runner for the crawler.
+Loads coordinates from .env and processes each location page by page.
+cr2/run.py (snappfood) and cr3/run.py (snappexpress) start it with their
+platform as config.PLATFORM.
+"""
+
+import argparse
+import os
+
+from .client import METRICS, CrawlContext, search
+from .coordinates import open_coordinates
+from .config import (
+    PLATFORM, PLATFORMS, OUTPUT_DIR, DELTA_DIR, ASYNC_CONCURRENCY, REQUESTS_PER_MINUTE,
+    WRITER_ENABLED, PAGE_SIZE_PROBE, PAGE_SIZE_PROBE_COORDINATES, SPATIAL_PATH, SPATIAL_ACTION, METRICS_PORT, METRICS_SNAPSHOT_PATH, METRICS_SNAPSHOT_SECONDS,
+)
+from .dedup import open_index
+from .engine import interleave, run_platforms
+from .frontier import Frontier, END_COVERED
+from .incremental import DeltaSink, Incremental
+from .metrics import SnapshotWriter, serve
+from .pagesize import page_size_for, requests_saved
+from .profiles import get_profile
+from .sinks import open_sink
+from .spatial import SpatialIndex, prioritize
+from .transport import STATS
+from .workqueue import RemoteFrontier, default_worker_id, run_worker
+from .writer import BackgroundWriter
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="vendors-list crawler")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="crawl many coordinates at once on one event loop")
+    parser.add_argument("--concurrency", type=int, default=ASYNC_CONCURRENCY,
+                        help="coordinates crawled at the same time (async mode)")
+    parser.add_argument("--rpm", type=int, default=REQUESTS_PER_MINUTE,
+                        help="global requests per minute budget (async mode)")
+    parser.add_argument("--coordinates", default=None,
+                        help="coordinates file: .env lines (e.g. from crawler.planner), .csv, .ndjson or .geojson")
+    parser.add_argument("--fresh", action="store_true",
+                        help="forget saved progress and start from the first coordinate")
+    parser.add_argument("--replay-dead", action="store_true",
+                        help="retry the pages in the dead-letter queue")
+    parser.add_argument("--incremental", action="store_true",
+                        help="store only inserted / updated / removed vendors (delta stream) "
+                             "and use conditional requests")
+    parser.add_argument("--worker", action="store_true",
+                        help="lease coordinates from the shared frontier (run several processes)")
+    parser.add_argument("--queue", default=None,
+                        help="work queue server URL (crawler.workqueue) for workers on other machines")
+    parser.add_argument("--worker-id", default=None,
+                        help="name of this worker in the queue (default: host-pid)")
+    parser.add_argument("--platforms", nargs="+", choices=sorted(PLATFORMS), default=[PLATFORM],
+                        help="platforms crawled together in this process (outputs per platform)")
+    parser.add_argument("--base-url", action="append", default=[],
+                        help="vendors-list endpoint instead of the platform's (e.g. a local crawler.mockapi "
+                             "server); PLATFORM=URL for one platform only")
+    parser.add_argument("--page-size", type=int, default=None,
+                        help="page_size of the pagination (default: probed, see crawler.pagesize)")
+    parser.add_argument("--spatial", choices=("defer", "skip", "off"), default=SPATIAL_ACTION or "off",
+                        help="coordinates whose service area is already covered by known vendors: "
+                             "crawl them last, skip them or do not check")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="serve Prometheus metrics on this local port")
+    return parser.parse_args()
+
+
+def base_urls(values):
+    """
+    --base-url values: "URL" for every platform or "PLATFORM=URL".
+    Returns:
+      - dict platform -> URL (key None for every platform)
+    """
+    urls = {}
+    for value in values:
+        name, sep, url = value.partition("=")
+        if sep and name in PLATFORMS:
+            urls[name] = url
+        else:
+            urls[None] = value
+    return urls
+
+
+class PlatformRun:
+    """
+    Frontier, outputs and crawl context of one platform in this run.
+    With several platforms, outputs go to per-platform subdirectories.
+    """
+
+    def __init__(self, name, args, coordinates, many):
+        self.name = name
+        self.args = args
+        self.many = many
+        self.label = label = f"[{name}] " if many else ""
+
+        if args.queue:
+            # coordinates and progress live on the queue server
+            frontier = RemoteFrontier(args.queue)
+        else:
+            frontier = Frontier(platform=name)
+
+        # Resume from the saved frontier
+        if args.fresh:
+            frontier.reset()
+        # the coordinates file is streamed into the frontier, which then hands
+        # out pending coordinates in file order
+        added = frontier.add_coordinates(coordinates)
+        recovered = frontier.recover()
+        if args.replay_dead:
+            print(f"{label}Replaying {frontier.replay_dead()} dead-lettered pages")
+        pending = frontier.count_pending()
+        if args.incremental and not pending:
+            # the previous pass is complete: every run is a new pass over all coordinates
+            print(f"{label}Previous pass complete, starting a new incremental pass")
+            frontier.reset()
+            added = frontier.add_coordinates(coordinates)
+            pending = frontier.count_pending()
+        self.frontier = frontier
+        self.pending = pending
+        summary = frontier.summary()
+        if added:
+            print(f"{label}{added} new coordinates added to the frontier")
+        print(f"{label}Frontier: {summary['coordinates_finished']}/{summary['coordinates_total']} "
+              f"coordinates finished, {summary['done']} pages done, {recovered} interrupted pages recovered, "
+              f"{summary['dead']} dead-lettered pages")
+
+        # Vendor ids seen in previous runs and other coordinates; the incremental
+        # mode paginates every coordinate to its end instead (removal detection)
+        directory = os.path.join(OUTPUT_DIR, name) if many else None
+        self.index = None if args.incremental else open_index(directory=directory)
+        crawl_pass = frontier.crawl_pass()
+        if self.index is not None and self.index.bind(crawl_pass):
+            print(f"{label}Vendor index cleared for a new crawl pass")
+        self.incremental = Incremental(platform=name) if args.incremental else None
+        # a covered area is no reason to leave out a coordinate of an incremental pass
+        self.spatial = None
+        if args.spatial != "off" and not args.incremental:
+            path = os.path.join(directory, os.path.basename(SPATIAL_PATH)) if many else SPATIAL_PATH
+            self.spatial = SpatialIndex(path)
+            if self.spatial.bind(crawl_pass):
+                print(f"{label}Spatial index cleared for a new crawl pass")
+        self.delta_sink = None
+        if self.incremental:
+            delta_dir = os.path.join(DELTA_DIR, name) if many else DELTA_DIR
+            self.delta_sink = DeltaSink(self.incremental, delta_dir)
+        sink = self.delta_sink or open_sink(platform=name, per_platform=many)
+        if WRITER_ENABLED:
+            sink = BackgroundWriter(sink, frontier, self.index, spill_dir=os.path.join(directory or OUTPUT_DIR, "unwritten"))
+        self.sink = sink
+
+        urls = base_urls(args.base_url)
+        self.context = CrawlContext(
+            frontier=frontier, index=self.index, sink=sink, base_url=urls.get(name, urls.get(None)),
+            incremental=self.incremental, profile=get_profile(name), spatial=self.spatial,
+        )
+        self.context.page_size, self.probe_requests = self.choose_page_size()
+        print(f"{label}Page size: {self.context.page_size} (platform default {self.context.profile.page_size})")
+
+    def choose_page_size(self):
+        """
+        --page-size, else the size of the crawl in progress, the cached or a
+        newly probed one (PAGE_SIZE_PROBE), else the platform's.
+        Returns:
+          - (page size, probe requests used)
+        """
+        if self.args.page_size:
+            self.frontier.set_setting("page_size", self.args.page_size)
+            return self.args.page_size, 0
+        if not PAGE_SIZE_PROBE:
+            return self.frontier.get_setting("page_size", self.context.profile.page_size), 0
+        candidates = self.frontier.pending_coordinates(limit=PAGE_SIZE_PROBE_COORDINATES)
+        return page_size_for(self.context, candidates, self.frontier)
+
+    def ordered_coordinates(self):
+        """
+        Pending coordinates of this run (read lazily from the frontier),
+        those in already covered areas last (or skipped).
+        """
+        coordinates = self.frontier.iter_pending()
+        if self.spatial is None:
+            return coordinates
+        context = self.context
+        return prioritize(
+            coordinates, self.spatial, self.args.spatial,
+            on_skip=lambda lat, lng: context.finish(lat, lng, END_COVERED),
+        )
+
+    def page_size_stats(self):
+        return {
+            "page_size": self.context.page_size,
+            "probe_requests": self.probe_requests,
+            "requests_saved": requests_saved(
+                self.context.vendors_fetched, self.context.page_size, self.context.profile.page_size
+            ),
+        }
+
+    def register_metrics(self):
+        suffix = f"_{self.name}" if self.many else ""
+        if WRITER_ENABLED:
+            METRICS.gauges("writer" + suffix, self.sink.stats)
+        METRICS.gauges("frontier" + suffix, self.frontier.summary)
+        METRICS.gauges("pagination" + suffix, self.page_size_stats)
+        if self.index is not None:
+            METRICS.gauges("dedup" + suffix, self.index.stats)
+        if self.incremental:
+            METRICS.gauges("incremental" + suffix, self.incremental.stats)
+        if self.spatial is not None:
+            METRICS.gauges("spatial" + suffix, self.spatial.stats)
+
+    def finish(self):
+        """
+        Flush and close outputs (removals of a complete incremental pass first).
+        """
+        label = self.label
+        self.sink.flush()
+        if self.incremental and not self.frontier.pending_coordinates():
+            print(f"{label}Pass complete, {len(self.delta_sink.finish_run())} vendors removed")
+        self.sink.close()
+        if WRITER_ENABLED:
+            print(f"{label}Writer: {self.sink.stats()}")
+        if self.incremental:
+            print(f"{label}Incremental: {self.incremental.stats()}")
+            self.incremental.close()
+        if self.spatial is not None:
+            self.spatial.close()
+            print(f"{label}Spatial index: {self.spatial.stats()}")
+
+    def report(self):
+        label = self.label
+        print(f"{label}Frontier: {self.frontier.summary()}")
+        stats = self.page_size_stats()
+        if stats["requests_saved"] or stats["probe_requests"]:
+            print(f"{label}Page size {stats['page_size']}: about {stats['requests_saved']} requests saved "
+                  f"(probe used {stats['probe_requests']})")
+        dead = self.frontier.dead_letters()
+        if dead:
+            print(f"{label}Dead-letter queue: {len(dead)} pages (retry them with --replay-dead)")
+        if self.index is not None:
+            self.index.close()
+            print(f"{label}Vendors: {len(self.index)} unique, dedup {self.index.stats()}")
+
+
+def main():
+    """
+    Main function to run the crawler.
+    - Loads coordinates from .env file
+    - For each coordinate, fetches pages one by one
+    - With --platforms, crawls several platforms together
+    """
+    args = parse_args()
+    print("Starting crawler...")
+    platforms = list(dict.fromkeys(args.platforms))
+    worker_mode = args.worker or args.queue
+    if worker_mode and args.incremental:
+        print("--incremental runs in a single process and cannot be combined with --worker / --queue. Exiting.")
+        return
+    if worker_mode and (args.fresh or args.replay_dead):
+        # other workers may be crawling the same frontier right now
+        print("--fresh and --replay-dead change the frontier all workers share; run them before starting "
+              "the workers, on the queue machine (py -m crawler.workqueue --fresh / --replay-dead). Exiting.")
+        return
+    if worker_mode and len(platforms) > 1:
+        print("Workers crawl one platform; start one worker per platform. Exiting.")
+        return
+
+    if args.queue:
+        coordinates = []
+    else:
+        # Stream coordinates from .env (or --coordinates), snapped and deduplicated
+        coordinates = open_coordinates(args.coordinates)
+
+        if coordinates.first() is None:
+            print("No coordinates found in .env file. Exiting.")
+            return
+
+    many = len(platforms) > 1
+    runs = [PlatformRun(name, args, coordinates, many) for name in platforms]
+    if not args.queue:
+        print(f"Coordinates from {coordinates.path}: {coordinates.stats}")
+    remaining = sum(run.pending for run in runs)
+    print(f"Remaining coordinates: {remaining}\n")
+
+    # Where the time goes: endpoint, periodic snapshot and component gauges
+    METRICS.gauges("transport", STATS.snapshot)
+    for run in runs:
+        run.register_metrics()
+    metrics_server = serve(METRICS, args.metrics_port) if args.metrics_port else None
+    snapshot_path = METRICS_SNAPSHOT_PATH
+    if worker_mode:
+        # one snapshot file per worker
+        worker = args.worker_id or default_worker_id()
+        root, ext = os.path.splitext(METRICS_SNAPSHOT_PATH)
+        snapshot_path = f"{root}-{worker}{ext}"
+    snapshots = SnapshotWriter(METRICS, snapshot_path, METRICS_SNAPSHOT_SECONDS)
+
+    jobs = [(run.ordered_coordinates(), run.context) for run in runs]
+    if worker_mode:
+        print(f"Worker mode: {worker} leasing coordinates from {args.queue or 'the local frontier'}\n")
+        print(f"Coordinates crawled by this worker: {run_worker(runs[0].frontier, runs[0].context, worker)}")
+    elif args.use_async:
+        print(f"Async mode: concurrency={args.concurrency}, budget={args.rpm} requests/minute "
+              f"per platform ({', '.join(platforms)})\n")
+        run_platforms(jobs, args.concurrency, args.rpm)
+    else:
+        process_sequential(jobs, remaining)
+
+    for run in runs:
+        run.finish()
+    snapshots.close()
+    if metrics_server:
+        metrics_server.shutdown()
+
+    print("\n" + "=" * 60)
+    print("Crawler finished successfully!")
+    print(f"Connections: {STATS.snapshot()}")
+    print(f"Metrics snapshot: {snapshot_path}")
+    for run in runs:
+        run.report()
+    print("=" * 60)
+
+
+def process_sequential(jobs, total):
+    """
+    Process each coordinate one after another with client.search(),
+    resuming every coordinate from its first unfinished page
+    (platforms take turns)
+    """
+    for idx, (lat, lng, context) in enumerate(interleave(jobs), 1):
+        label = f" [{context.profile.name}]" if len(jobs) > 1 else ""
+        print(f"\n{'=' * 60}")
+        print(f"Processing coordinate {idx}/{total}{label}: ({lat}, {lng})")
+        print(f"{'=' * 60}")
+
+        search(lat, lng, context)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+"""
+yield-driven recrawl scheduler (long-running)
+  - every coordinate sits in a priority queue ordered by when it is due
+  - a visit is an incremental crawl of one coordinate; the vendors it
+    inserted or updated give the coordinate's change rate
+  - removals are only detected once a pass has crawled every coordinate
+    (a vendor missing at one coordinate may still be listed by a neighbour);
+    they count for the coordinate the vendor was last seen at, on its next visit
+  - revisit intervals follow the change rate and the requests a visit costs
+    (square-root allocation of the budget), clamped to
+    [SCHEDULER_MIN_REVISIT, SCHEDULER_MAX_REVISIT]: hot areas come back
+    often, stale ones rarely
+  - all visits share one requests-per-hour budget
+  - state survives restarts (outputs/schedule.db)
+
+usage:
+  py -m crawler.scheduler
+  py -m crawler.scheduler --budget 300 --coordinates outputs/coordinates.env
+"""
+
+import argparse
+import heapq
+import math
+import os
+import sqlite3
+import threading
+from collections import Counter
+
+from .client import METRICS, CrawlContext, search
+from .config import (
+    PLATFORM,
+    BASE_URL,
+    SCHEDULE_PATH,
+    SCHEDULER_REQUESTS_PER_HOUR,
+    SCHEDULER_MIN_REVISIT,
+    SCHEDULER_MAX_REVISIT,
+    SCHEDULER_SMOOTHING,
+    SCHEDULER_PRIOR_RATE,
+    METRICS_PORT,
+    METRICS_SNAPSHOT_PATH,
+    METRICS_SNAPSHOT_SECONDS,
+    load_coordinates,
+)
+from .incremental import DeltaSink, Incremental, INSERT, UPDATE
+from .metrics import SnapshotWriter, serve
+from .pagesize import PageSizeCache
+from .transport import STATS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS schedule (
+    platform TEXT NOT NULL,
+    lat REAL NOT NULL,
+    long REAL NOT NULL,
+    position INTEGER NOT NULL,
+    visits INTEGER NOT NULL DEFAULT 0,
+    last_visit REAL,
+    rate REAL,
+    cost REAL,
+    changes INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (platform, lat, long)
+);
+"""
+
+# requests per visit assumed before a coordinate was visited
+DEFAULT_COST = 2.0
+
+
+class Schedule:
+    """
+    Per-coordinate visit history: last visit (wall-clock time), change rate
+    (changed vendors per hour) and cost (requests per visit), both smoothed.
+    """
+
+    def __init__(self, path=SCHEDULE_PATH, platform=PLATFORM):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        self.platform = platform
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def add_coordinates(self, coordinates):
+        """
+        Register coordinates (already known ones keep their history).
+        """
+        with self._lock:
+            start = self.conn.execute(
+                "SELECT COALESCE(MAX(position), -1) + 1 FROM schedule WHERE platform = ?", (self.platform,)
+            ).fetchone()[0]
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO schedule (platform, lat, long, position) VALUES (?, ?, ?, ?)",
+                [(self.platform, lat, lng, start + i) for i, (lat, lng) in enumerate(coordinates)],
+            )
+            self.conn.commit()
+
+    def load(self, coordinates):
+        """
+        Returns:
+          - dict (lat, long) -> row dict, for the given coordinates only
+        """
+        wanted = set(coordinates)
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT lat, long, position, visits, last_visit, rate, cost, changes "
+                "FROM schedule WHERE platform = ?",
+                (self.platform,),
+            ).fetchall()
+        keys = ("position", "visits", "last_visit", "rate", "cost", "changes")
+        return {(lat, lng): dict(zip(keys, rest)) for lat, lng, *rest in rows if (lat, lng) in wanted}
+
+    def save(self, lat, long, row):
+        with self._lock:
+            self.conn.execute(
+                "UPDATE schedule SET visits = ?, last_visit = ?, rate = ?, cost = ?, changes = ? "
+                "WHERE platform = ? AND lat = ? AND long = ?",
+                (row["visits"], row["last_visit"], row["rate"], row["cost"], row["changes"],
+                 self.platform, lat, long),
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def smooth(previous, value, weight=SCHEDULER_SMOOTHING):
+    return value if previous is None else weight * value + (1 - weight) * previous
+
+
+class Scheduler:
+    """
+    Picks the next coordinate to visit and keeps the budget.
+
+    With change rate r and cost c per coordinate and a budget of B requests
+    per hour, visiting each coordinate f = B * sqrt(r / c) / sum(sqrt(r * c))
+    times an hour spends exactly B and minimises how long a change stays
+    unseen on average. Queue entries are re-checked when they come up,
+    because the allocation shifts a little after every visit.
+    """
+
+    def __init__(
+        self,
+        schedule,
+        coordinates,
+        context,
+        delta_sink,
+        requests_per_hour=SCHEDULER_REQUESTS_PER_HOUR,
+        min_revisit=SCHEDULER_MIN_REVISIT,
+        max_revisit=SCHEDULER_MAX_REVISIT,
+        prior_rate=SCHEDULER_PRIOR_RATE,
+    ):
+        self.schedule = schedule
+        self.context = context
+        self.clock = context.clock
+        self.delta_sink = delta_sink
+        self.incremental = delta_sink.incremental
+        self.requests_per_hour = requests_per_hour
+        self.min_revisit = min_revisit
+        self.max_revisit = max_revisit
+        self.prior_rate = prior_rate
+        self.visits = 0
+        self.requests = 0
+        self._next_slot = self.clock.time()
+
+        schedule.add_coordinates(coordinates)
+        self.rows = schedule.load(coordinates)
+        # coordinates the open incremental run (the pass) has not finished yet
+        self.pass_left = set(self.rows) - self.incremental.finished_coordinates()
+        # vendors removed at the end of a pass, by coordinate, until its next visit
+        self.removed = Counter()
+        allocation = self.allocation()
+        self.queue = [(self.due(key, allocation), row["position"], key) for key, row in self.rows.items()]
+        heapq.heapify(self.queue)
+
+    def _weights(self, row, default_rate):
+        rate = max(row["rate"] if row["rate"] is not None else default_rate, self.prior_rate)
+        return rate, row["cost"] or DEFAULT_COST
+
+    def allocation(self):
+        """
+        Returns:
+          - (rate assumed for unmeasured coordinates, sum of sqrt(rate * cost))
+        """
+        # coordinates without two visits yet get the average measured rate
+        rates = [row["rate"] for row in self.rows.values() if row["rate"] is not None]
+        default_rate = sum(rates) / len(rates) if rates else self.prior_rate
+        total = sum(math.sqrt(rate * cost) for rate, cost in
+                    (self._weights(row, default_rate) for row in self.rows.values()))
+        return default_rate, total
+
+    def revisit_interval(self, key, allocation=None):
+        """
+        Seconds between two visits of the coordinate under the current allocation.
+        """
+        default_rate, total = allocation or self.allocation()
+        rate, cost = self._weights(self.rows[key], default_rate)
+        visits_per_hour = self.requests_per_hour * math.sqrt(rate / cost) / total
+        return min(max(3600.0 / visits_per_hour, self.min_revisit), self.max_revisit)
+
+    def due(self, key, allocation=None):
+        row = self.rows[key]
+        if row["last_visit"] is None:
+            return 0.0
+        return row["last_visit"] + self.revisit_interval(key, allocation)
+
+    def next_coordinate(self):
+        """
+        Pop the coordinate that is due first (waiting until it is due).
+        """
+        allocation = self.allocation()
+        while True:
+            due, position, key = heapq.heappop(self.queue)
+            current = self.due(key, allocation)
+            if current > due + 1:
+                # the allocation moved this coordinate back
+                heapq.heappush(self.queue, (current, position, key))
+                continue
+            wait = current - self.clock.time()
+            if wait > 0:
+                # waits are measured, not printed: this loop runs for days
+                self.clock.sleep(wait)
+                METRICS.observe("phase_seconds", wait, phase="schedule")
+            return key
+
+    def wait_for_budget(self):
+        wait = self._next_slot - self.clock.time()
+        if wait > 0:
+            self.clock.sleep(wait)
+            METRICS.observe("phase_seconds", wait, phase="budget")
+
+    def visit(self, key):
+        """
+        Crawl one coordinate incrementally and update its rate and cost.
+        The budget is charged with every request sent (retries too), the
+        cost is the pages the coordinate needed.
+        Returns:
+          - (changed vendors, requests used)
+        """
+        lat, lng = key
+        counts = self.incremental.counts
+        before_changes = counts[INSERT] + counts[UPDATE]
+        before_requests = STATS.snapshot()["requests"]
+        started = self.clock.time()
+
+        search(lat, lng, self.context)
+        self.delta_sink.flush()
+        self.end_pass()
+
+        changes = counts[INSERT] + counts[UPDATE] - before_changes + self.removed.pop(key, 0)
+        requests = STATS.snapshot()["requests"] - before_requests
+        pages = self.context.pages_fetched.pop(key, 0)
+        self._next_slot = max(self._next_slot, started) + requests * 3600.0 / self.requests_per_hour
+
+        row = self.rows[key]
+        if row["last_visit"] is not None:
+            # the first visit only builds the snapshot; rates need two visits
+            hours = max(started - row["last_visit"], 1.0) / 3600
+            row["rate"] = smooth(row["rate"], changes / hours)
+        row["cost"] = smooth(row["cost"], max(pages, 1))
+        row["visits"] += 1
+        row["changes"] += changes
+        row["last_visit"] = started
+        self.schedule.save(lat, lng, row)
+
+        self.visits += 1
+        self.requests += requests
+        METRICS.inc("scheduler_visits_total")
+        METRICS.inc("scheduler_changes_total", changes)
+        return changes, requests
+
+    def end_pass(self):
+        """
+        Close the incremental run once every coordinate was crawled to its
+        last page in it: only then is a vendor that no coordinate returned
+        really gone. Closing it after every visit removed vendors that had
+        only dropped out of one coordinate's list.
+        """
+        self.pass_left -= self.incremental.finished_coordinates()
+        if self.pass_left:
+            return
+        removed = self.delta_sink.finish_run()
+        self.incremental.start_run()
+        self.pass_left = set(self.rows)
+        self.removed.update((lat, lng) for _, lat, lng in removed)
+        print(f"Pass complete, {len(removed)} vendors removed")
+
+    def run(self, max_visits=None):
+        """
+        Visit coordinates forever (or `max_visits` times).
+        """
+        while max_visits is None or self.visits < max_visits:
+            key = self.next_coordinate()
+            self.wait_for_budget()
+
+            print(f"\n{'=' * 60}")
+            print(f"Visit {self.visits + 1}: ({key[0]}, {key[1]})")
+            print(f"{'=' * 60}")
+            changes, requests = self.visit(key)
+
+            interval = self.revisit_interval(key)
+            heapq.heappush(self.queue, (self.rows[key]["last_visit"] + interval, self.rows[key]["position"], key))
+            print(f"{changes} changed vendors in {requests} requests, "
+                  f"next visit in {interval / 3600:.2f} hours")
+
+    def stats(self):
+        now = self.clock.time()
+        allocation = self.allocation()
+        overdue = sum(1 for key in self.rows if self.due(key, allocation) <= now)
+        return {
+            "coordinates": len(self.rows),
+            "visits": self.visits,
+            "requests": self.requests,
+            "overdue": overdue,
+            "budget_per_hour": self.requests_per_hour,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="yield-driven recrawl scheduler")
+    parser.add_argument("--coordinates", default=None,
+                        help="coordinates file: .env lines (e.g. from crawler.planner), .csv, .ndjson or .geojson")
+    parser.add_argument("--budget", type=int, default=SCHEDULER_REQUESTS_PER_HOUR,
+                        help="requests per hour for all visits together")
+    parser.add_argument("--visits", type=int, default=None, help="stop after this many visits")
+    parser.add_argument("--base-url", default=BASE_URL,
+                        help="vendors-list endpoint (e.g. a local crawler.mockapi server)")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="serve Prometheus metrics on this local port")
+    args = parser.parse_args()
+
+    coordinates = load_coordinates(args.coordinates)
+    if not coordinates:
+        print("No coordinates found in .env file. Exiting.")
+        return
+
+    schedule = Schedule()
+    incremental = Incremental()
+    delta_sink = DeltaSink(incremental)
+    context = CrawlContext(sink=delta_sink, base_url=args.base_url, incremental=incremental)
+    context.log_waits = False
+    # page size probed by run.py / crawler.pagesize, if any
+    context.page_size = PageSizeCache().get(context.profile.name, context.base_url)
+    scheduler = Scheduler(schedule, coordinates, context, delta_sink, requests_per_hour=args.budget)
+    print(f"Scheduler: {len(coordinates)} coordinates, budget {args.budget} requests/hour")
+
+    METRICS.counter("scheduler_visits_total", "Coordinate visits of the recrawl scheduler")
+    METRICS.counter("scheduler_changes_total", "Inserted, updated and removed vendors found by visits")
+    METRICS.gauges("scheduler", scheduler.stats)
+    METRICS.gauges("incremental", incremental.stats)
+    METRICS.gauges("transport", STATS.snapshot)
+    metrics_server = serve(METRICS, args.metrics_port) if args.metrics_port else None
+    snapshots = SnapshotWriter(METRICS, METRICS_SNAPSHOT_PATH, METRICS_SNAPSHOT_SECONDS)
+
+    try:
+        scheduler.run(args.visits)
+    except KeyboardInterrupt:
+        print("\nStopping scheduler...")
+    finally:
+        delta_sink.close()
+        snapshots.close()
+        if metrics_server:
+            metrics_server.shutdown()
+        print(f"Scheduler: {scheduler.stats()}")
+        print(f"Incremental: {incremental.stats()}")
+        if context.dead_letters:
+            print(f"Dead-lettered pages (not retried): {len(context.dead_letters)}")
+        incremental.close()
+        schedule.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+output sinks for crawled pages
+  - FileSink: one pretty-printed outputs/result_{lat}_{long}_p{page}.json per page
+  - NDJSONSink: streaming, compressed NDJSON segments with one record per
+    page or per vendor, flushed by size/time and rotated by size
+  - segment names carry host and pid, so several workers can share one
+    stream directory
+"""
+
+import gzip
+import json
+import os
+import re
+import socket
+import threading
+import time
+import zlib
+
+from .config import (
+    PLATFORM,
+    OUTPUT_DIR,
+    OUTPUT_SINK,
+    STREAM_DIR,
+    STREAM_RECORD,
+    STREAM_COMPRESSION,
+    STREAM_SEGMENT_BYTES,
+    STREAM_FLUSH_BYTES,
+    STREAM_FLUSH_SECONDS,
+)
+from .profiles import get_profile
+from .vendors import iter_vendors
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional
+    zstandard = None
+
+EXTENSIONS = {"gzip": ".ndjson.gz", "zstd": ".ndjson.zst", "none": ".ndjson"}
+PART_SUFFIX = ".part"
+
+# segment-{date}-{time}-{host}-{pid}-{sequence}.ndjson...
+HOST = re.sub(r"[^A-Za-z0-9.]", "_", socket.gethostname()) or "localhost"
+SEGMENT_OWNER = re.compile(r"^segment-\d{8}-\d{6}-(?P<host>[A-Za-z0-9._]+)-(?P<pid>\d+)-\d+\.")
+
+
+def process_alive(pid):
+    """
+    True if a process with this pid runs on this machine.
+    """
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        # os.kill() would terminate the process on Windows
+        import ctypes
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        ctypes.windll.kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def abandoned(name):
+    """
+    True if a .part segment's writer is gone: it ran on this host and its
+    process is no longer alive (segments of other hosts are left to them).
+    """
+    match = SEGMENT_OWNER.match(name)
+    if not match:
+        return True  # older names without owner
+    return match["host"] == HOST and not process_alive(int(match["pid"]))
+
+
+class Sink:
+    """
+    Base class. write_page() returns a short description of where the page went.
+    """
+
+    def write_page(self, data, lat, long, page):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def enable_sync(self):
+        """
+        Called once by the background writer when an fsync policy is active.
+        """
+
+    def sync(self):
+        """
+        Flush and fsync everything written so far.
+        """
+        self.flush()
+
+    def close(self):
+        self.flush()
+
+
+class FileSink(Sink):
+    """
+    The original layout: every page in its own indented JSON file.
+    """
+
+    def __init__(self, output_dir=OUTPUT_DIR):
+        self.output_dir = output_dir
+        self._track_sync = False
+        self._unsynced = []
+
+    def write_page(self, data, lat, long, page):
+        if not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir, exist_ok=True)
+
+        filename = f"{self.output_dir}/result_{lat}_{long}_p{page}.json"
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+        if self._track_sync:
+            self._unsynced.append(filename)
+        return filename
+
+    def enable_sync(self):
+        self._track_sync = True
+
+    def sync(self):
+        filenames, self._unsynced = self._unsynced, []
+        for filename in filenames:
+            with open(filename, "rb") as f:
+                os.fsync(f.fileno())
+        if filenames and hasattr(os, "O_DIRECTORY"):
+            fd = os.open(self.output_dir, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+
+def open_segment(path, compression):
+    """
+    Open a binary stream for a new segment.
+    """
+    raw = open(path, "wb")
+    if compression == "gzip":
+        return raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6)
+    if compression == "zstd":
+        return raw, zstandard.ZstdCompressor(level=3).stream_writer(raw)
+    return raw, raw
+
+
+def page_records(data, lat, long, page, record=STREAM_RECORD, platform=PLATFORM):
+    """
+    Records written for one page: the whole response, or one per vendor.
+    """
+    base = {"platform": platform, "lat": lat, "long": long, "page": page, "fetched_at": time.time()}
+    if record == "vendor":
+        final_result = get_profile(platform).extract(data)
+        for vendor in iter_vendors(final_result):
+            yield {**base, "vendor": vendor}
+    else:
+        yield {**base, "data": data}
+
+
+class NDJSONSink(Sink):
+    """
+    Appends records to rotating NDJSON segments in `stream_dir`.
+    The open segment is named *.part; it is renamed when rotated or closed,
+    so readers only pick up finished segments. Segments left as .part by a
+    killed process of this host are renamed on start (readable up to the
+    last flush); .part files of live workers are left alone.
+    A background thread flushes records left unflushed for `flush_seconds`,
+    so an idle stream does not wait for the next page to become readable.
+    """
+
+    def __init__(
+        self,
+        stream_dir=STREAM_DIR,
+        record=STREAM_RECORD,
+        compression=STREAM_COMPRESSION,
+        segment_bytes=STREAM_SEGMENT_BYTES,
+        flush_bytes=STREAM_FLUSH_BYTES,
+        flush_seconds=STREAM_FLUSH_SECONDS,
+        platform=PLATFORM,
+    ):
+        if compression == "zstd" and zstandard is None:
+            print("Warning: zstandard is not installed, falling back to gzip (pip install zstandard)")
+            compression = "gzip"
+
+        self.stream_dir = stream_dir
+        self.record = record
+        self.compression = compression
+        self.segment_bytes = segment_bytes
+        self.flush_bytes = flush_bytes
+        self.flush_seconds = flush_seconds
+        self.platform = platform
+
+        self._lock = threading.Lock()
+        self._raw = self._stream = None
+        self._path = None
+        self._sequence = 0
+        self._segment_written = 0
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+        os.makedirs(stream_dir, exist_ok=True)
+        self._recover_parts()
+
+        self._stop = threading.Event()
+        self._flusher = None
+        if flush_seconds:
+            self._flusher = threading.Thread(target=self._flush_on_time, name="stream-flush", daemon=True)
+            self._flusher.start()
+
+    def _recover_parts(self):
+        for name in os.listdir(self.stream_dir):
+            if name.endswith(PART_SUFFIX) and abandoned(name):
+                path = os.path.join(self.stream_dir, name)
+                os.replace(path, path[: -len(PART_SUFFIX)])
+                print(f"Recovered unfinished segment {name}")
+
+    def _open(self):
+        self._sequence += 1
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        name = f"segment-{stamp}-{HOST}-{os.getpid()}-{self._sequence:05d}{EXTENSIONS[self.compression]}"
+        self._path = os.path.join(self.stream_dir, name)
+        self._raw, self._stream = open_segment(self._path + PART_SUFFIX, self.compression)
+        self._segment_written = 0
+
+    def _flush(self):
+        if self._stream is None:
+            return
+        if self.compression == "gzip":
+            # sync flush keeps everything written so far decodable
+            self._stream.flush(zlib.Z_SYNC_FLUSH)
+        elif self.compression == "zstd":
+            self._stream.flush(zstandard.FLUSH_BLOCK)
+        self._raw.flush()
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def _flush_on_time(self):
+        while not self._stop.wait(min(self.flush_seconds, 1.0)):
+            with self._lock:
+                if self._unflushed and time.monotonic() - self._last_flush >= self.flush_seconds:
+                    self._flush()
+
+    def _close_segment(self):
+        if self._stream is None:
+            return
+        self._stream.close()
+        if not self._raw.closed:
+            self._raw.close()
+        os.replace(self._path + PART_SUFFIX, self._path)
+        self._raw = self._stream = None
+
+    def write_lines(self, lines):
+        """
+        Append already encoded NDJSON lines (bytes ending in newline).
+        """
+        with self._lock:
+            if self._stream is None:
+                self._open()
+            for line in lines:
+                self._stream.write(line)
+                self._segment_written += len(line)
+                self._unflushed += len(line)
+
+            if self._segment_written >= self.segment_bytes:
+                self._close_segment()
+            elif (self._unflushed >= self.flush_bytes
+                  or time.monotonic() - self._last_flush >= self.flush_seconds):
+                self._flush()
+            return self._path
+
+    def write_page(self, data, lat, long, page):
+        lines = [
+            json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+            for record in page_records(data, lat, long, page, self.record, self.platform)
+        ]
+        return self.write_lines(lines)
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def sync(self):
+        with self._lock:
+            self._flush()
+            if self._raw is not None:
+                os.fsync(self._raw.fileno())
+
+    def close(self):
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self._lock:
+            self._close_segment()
+
+
+SINKS = {
+    "files": FileSink,
+    "ndjson": NDJSONSink,
+}
+
+
+def open_sink(kind=OUTPUT_SINK, platform=PLATFORM, per_platform=False):
+    """
+    Sink of one platform. With `per_platform` (several platforms in one run)
+    its files go to a subdirectory named after the platform.
+    """
+    if kind == "ndjson":
+        stream_dir = os.path.join(STREAM_DIR, platform) if per_platform else STREAM_DIR
+        return NDJSONSink(stream_dir, platform=platform)
+    return SINKS[kind](os.path.join(OUTPUT_DIR, platform) if per_platform else OUTPUT_DIR)
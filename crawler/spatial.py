@@ -0,0 +1,351 @@
+"""
+spatial index of collected vendors
+  - vendors (and the coordinates already crawled) sit in grid buckets of
+    SPATIAL_CELL_KM, filled while pages come in and saved to
+    outputs/spatial.json as coordinates finish (at most every
+    SPATIAL_SAVE_SECONDS) and at the end of a run; saves merge with the
+    file under a lock, so local workers sharing it keep each other's entries
+  - answers radius and nearest-vendor queries
+  - coverage(): known vendors around a coordinate compared with what the
+    nearest crawled coordinate returned (its data.count when the API sent
+    one); a coordinate at SPATIAL_SATURATION or more is saturated
+  - prioritize() crawls saturated coordinates last or skips them
+
+usage:
+  py -m crawler.spatial --near 35.70 51.40 --radius 3
+  py -m crawler.spatial --rebuild
+"""
+
+import argparse
+import json
+import math
+import os
+import threading
+import time
+
+from .config import (
+    PLATFORM, OUTPUT_DIR, STREAM_DIR,
+    SPATIAL_PATH, SPATIAL_CELL_KM, SPATIAL_RADIUS_KM, SPATIAL_SATURATION, SPATIAL_ACTION, SPATIAL_SAVE_SECONDS,
+)
+from .filelock import file_lock
+from .frontier import Frontier
+from .planner import KM_PER_DEGREE, distance_km, km_to_degrees
+from .vendors import iter_vendors, vendor_id, vendor_location
+
+
+class Grid:
+    """
+    Keyed points in square buckets of `cell_km` (north-south) for radius
+    and nearest queries. Not thread safe on its own.
+    """
+
+    def __init__(self, cell_km=SPATIAL_CELL_KM):
+        self.cell = cell_km / KM_PER_DEGREE
+        self.cells = {}
+        self.points = {}
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cell_of(self, lat, lng):
+        return int(lat // self.cell), int(lng // self.cell)
+
+    def add(self, key, lat, lng):
+        """
+        Insert or move a point.
+        Returns:
+          - True if the key is new
+        """
+        old = self.points.get(key)
+        if old == (lat, lng):
+            return False
+        if old is not None:
+            self.cells[self._cell_of(*old)].discard(key)
+        self.points[key] = (lat, lng)
+        self.cells.setdefault(self._cell_of(lat, lng), set()).add(key)
+        return old is None
+
+    def within(self, lat, lng, radius_km):
+        """
+        Returns:
+          - list of (distance km, key) within `radius_km`, nearest first
+        """
+        dlat, dlng = km_to_degrees(lat, radius_km)
+        rows = range(int((lat - dlat) // self.cell), int((lat + dlat) // self.cell) + 1)
+        cols = range(int((lng - dlng) // self.cell), int((lng + dlng) // self.cell) + 1)
+        if len(rows) * len(cols) > len(self.cells):
+            # a huge radius: walking the occupied cells is cheaper
+            cells = (keys for (row, col), keys in self.cells.items() if row in rows and col in cols)
+        else:
+            cells = (self.cells.get((row, col), ()) for row in rows for col in cols)
+
+        found = []
+        for keys in cells:
+            for key in keys:
+                p_lat, p_lng = self.points[key]
+                distance = distance_km(lat, lng, p_lat, p_lng)
+                if distance <= radius_km:
+                    found.append((distance, key))
+        found.sort()
+        return found
+
+    def nearest(self, lat, lng, k=1, max_km=None):
+        """
+        Returns:
+          - up to `k` (distance km, key), nearest first
+        """
+        if not self.points:
+            return []
+        radius = self.cell * KM_PER_DEGREE
+        limit = max_km if max_km is not None else 2 * math.pi * 6371.0
+        while True:
+            radius = min(radius, limit)
+            found = self.within(lat, lng, radius)
+            if len(found) >= k or radius >= limit:
+                return found[:k]
+            radius *= 2
+
+
+class SpatialIndex:
+    """
+    Vendor locations plus the coordinates crawled so far (with data.count).
+    Safe to share between crawl threads.
+    """
+
+    def __init__(self, path=SPATIAL_PATH, cell_km=SPATIAL_CELL_KM, save_seconds=SPATIAL_SAVE_SECONDS):
+        self.path = path
+        self.cell_km = cell_km
+        self.save_seconds = save_seconds
+        self._saved_at = time.monotonic()
+        self.vendors = Grid(cell_km)
+        self.crawled = Grid(cell_km)
+        self.totals = {}
+        self.crawl_pass = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def _read(self):
+        if not self.path or not os.path.exists(self.path):
+            return None
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _load(self):
+        state = self._read()
+        if state is None:
+            return
+        self.crawl_pass = state.get("pass")
+        self._merge(state)
+
+    def _merge(self, state):
+        # entries already in memory are newer than the file's
+        for key, lat, lng in state.get("vendors", []):
+            if key not in self.vendors.points:
+                self.vendors.add(key, lat, lng)
+        for lat, lng, total in state.get("crawled", []):
+            self.crawled.add((lat, lng), lat, lng)
+            if self.totals.get((lat, lng)) is None:
+                self.totals[(lat, lng)] = total
+
+    def __len__(self):
+        return len(self.vendors)
+
+    def bind(self, crawl_pass):
+        """
+        Tie the index to one pass of the frontier (Frontier.crawl_pass()):
+        vendors and coordinates of another pass, e.g. before --fresh, are
+        dropped so they do not mark coordinates of this one as covered.
+        The cleared index is saved at once, so a resumed run finds this pass.
+        Returns:
+          - True if the index was cleared
+        """
+        with self._lock:
+            if self.crawl_pass == crawl_pass:
+                return False
+            self.vendors = Grid(self.cell_km)
+            self.crawled = Grid(self.cell_km)
+            self.totals = {}
+            self.crawl_pass = crawl_pass
+        self.save()
+        return True
+
+    def add(self, key, lat, lng):
+        with self._lock:
+            return self.vendors.add(key, lat, lng)
+
+    def add_vendors(self, final_result):
+        """
+        Index the vendors of a page that have an id and a location.
+        Returns:
+          - number of new vendors
+        """
+        added = 0
+        with self._lock:
+            for vendor in iter_vendors(final_result):
+                key, location = vendor_id(vendor), vendor_location(vendor)
+                if key is not None and location is not None:
+                    added += self.vendors.add(key, *location)
+        return added
+
+    def add_crawled(self, lat, long, total=None):
+        """
+        Remember a crawled coordinate and its data.count (None if unknown);
+        saves the index when the last save is `save_seconds` old.
+        """
+        with self._lock:
+            self.crawled.add((lat, long), lat, long)
+            if total is not None or (lat, long) not in self.totals:
+                self.totals[(lat, long)] = total
+            due = time.monotonic() - self._saved_at >= self.save_seconds
+        if due:
+            self.save()
+
+    def within(self, lat, lng, radius_km=SPATIAL_RADIUS_KM):
+        """
+        Returns:
+          - list of (distance km, vendor id) within `radius_km`, nearest first
+        """
+        with self._lock:
+            return self.vendors.within(lat, lng, radius_km)
+
+    def nearest(self, lat, lng, k=1, max_km=None):
+        """
+        Returns:
+          - up to `k` (distance km, vendor id), nearest first
+        """
+        with self._lock:
+            return self.vendors.nearest(lat, lng, k, max_km)
+
+    def coverage(self, lat, lng, radius_km=SPATIAL_RADIUS_KM):
+        """
+        Share of the vendors expected at (lat, lng) that are already known:
+        vendors within `radius_km` against what the nearest crawled
+        coordinate (within the same radius) returned.
+        Returns:
+          - fraction in [0, 1], None without a crawled neighbour
+        """
+        with self._lock:
+            neighbour = self.crawled.nearest(lat, lng, 1, radius_km)
+            if not neighbour:
+                return None
+            c_lat, c_lng = neighbour[0][1]
+            expected = self.totals.get((c_lat, c_lng)) or len(self.vendors.within(c_lat, c_lng, radius_km))
+            if not expected:
+                return None
+            known = len(self.vendors.within(lat, lng, radius_km))
+        return min(1.0, known / expected)
+
+    def saturated(self, lat, lng, radius_km=SPATIAL_RADIUS_KM, threshold=SPATIAL_SATURATION):
+        coverage = self.coverage(lat, lng, radius_km)
+        return coverage is not None and coverage >= threshold
+
+    def stats(self):
+        with self._lock:
+            return {"vendors": len(self.vendors), "crawled": len(self.crawled)}
+
+    def save(self):
+        """
+        Write the index; entries another worker saved for the same pass
+        meanwhile are merged in first.
+        """
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with file_lock(self.path):
+            saved = self._read()
+            with self._lock:
+                self._saved_at = time.monotonic()
+                if saved is not None and saved.get("pass") == self.crawl_pass:
+                    self._merge(saved)
+                state = {
+                    "pass": self.crawl_pass,
+                    "cell_km": self.cell_km,
+                    "vendors": [[key, lat, lng] for key, (lat, lng) in self.vendors.points.items()],
+                    "crawled": [[lat, lng, self.totals.get((lat, lng))] for lat, lng in self.crawled.points.values()],
+                }
+            temp = self.path + ".tmp"
+            with open(temp, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(temp, self.path)
+
+    def close(self):
+        self.save()
+
+
+def prioritize(coordinates, index, action=SPATIAL_ACTION, on_skip=None):
+    """
+    Yield coordinates whose service area is not saturated first. Saturated
+    ones are checked again at the end (the index grew meanwhile): with
+    action "skip" those still saturated are left out (`on_skip(lat, long)`
+    is called), with "defer" they are crawled last.
+    """
+    deferred = []
+    for lat, lng in coordinates:
+        if index.saturated(lat, lng):
+            deferred.append((lat, lng))
+            continue
+        yield lat, lng
+
+    if deferred:
+        print(f"{len(deferred)} coordinates in already covered areas, checking them again at the end")
+    for lat, lng in deferred:
+        if action == "skip" and index.saturated(lat, lng):
+            print(f"Skipping ({lat}, {lng}): its service area is already covered")
+            if on_skip:
+                on_skip(lat, lng)
+            continue
+        yield lat, lng
+
+
+def rebuild(index, platform=PLATFORM, output_dir=OUTPUT_DIR, stream_dir=STREAM_DIR):
+    """
+    Index the vendors of every saved page of `platform` (page files,
+    spilled pages and segments).
+    Returns:
+      - number of vendors in the index
+    """
+    from .export import discover_sources, read_page_file, read_segment
+
+    for path, owner in discover_sources(output_dir, stream_dir, platform):
+        if owner != platform:
+            continue
+        rows = read_segment(path) if ".ndjson" in path else read_page_file(path, owner)
+        for row in rows:
+            if row["platform"] != platform:
+                continue
+            if row["vendor_id"] is not None and row["lat"] is not None and row["lon"] is not None:
+                index.add(row["vendor_id"], row["lat"], row["lon"])
+            index.add_crawled(row["crawl_lat"], row["crawl_long"])
+    return len(index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="query or rebuild the spatial vendor index")
+    parser.add_argument("--path", default=SPATIAL_PATH)
+    parser.add_argument("--near", nargs=2, type=float, metavar=("LAT", "LNG"),
+                        help="nearest vendors and coverage of a point")
+    parser.add_argument("--radius", type=float, default=SPATIAL_RADIUS_KM, help="service radius in km")
+    parser.add_argument("--rebuild", action="store_true", help="index the pages already saved in outputs/")
+    parser.add_argument("--platform", default=PLATFORM)
+    args = parser.parse_args()
+
+    index = SpatialIndex(args.path)
+    if args.rebuild:
+        # the saved pages count as the crawl in progress
+        index.bind(Frontier(platform=args.platform).crawl_pass())
+        print(f"Indexed {rebuild(index, args.platform)} vendors")
+        index.save()
+    print(f"Spatial index: {index.stats()}")
+    if args.near:
+        lat, lng = args.near
+        nearest = index.nearest(lat, lng, 5)
+        print(f"Nearest vendors: {[(key, round(distance, 3)) for distance, key in nearest]}")
+        print(f"Vendors within {args.radius} km: {len(index.within(lat, lng, args.radius))}")
+        coverage = index.coverage(lat, lng, args.radius)
+        print(f"Coverage: {'unknown (no crawled coordinate nearby)' if coverage is None else f'{coverage:.0%}'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+shared HTTP transport
+  - one keep-alive connection pool per host (requests.Session + HTTPAdapter)
+  - optional HTTP/2 multiplexing through httpx (pip install "httpx[http2]")
+  - process-wide DNS cache with a TTL
+  - counters for requests, new connections and connection reuse
+    (connection counters cover the requests pool; httpx keeps its own)
+
+Shared by the vendors-list crawler (cr2, cr3) and the site crawler (cr1).
+"""
+
+import socket
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+import urllib3.util.connection
+
+try:
+    import httpx
+except ImportError:  # HTTP/2 is optional
+    httpx = None
+
+try:
+    import h2  # httpx.Client(http2=True) needs it
+except ImportError:
+    h2 = None
+
+
+# defaults
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 16
+DNS_CACHE_TTL = 300
+
+
+class TransportStats:
+    """
+    Process-wide connection counters.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.http2_requests = 0
+        self.new_connections = 0
+        self.dns_hits = 0
+        self.dns_misses = 0
+
+    def add(self, name, value=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "http2_requests": self.http2_requests,
+                "new_connections": self.new_connections,
+                "reused_connections": max(self.requests - self.new_connections, 0),
+                "dns_hits": self.dns_hits,
+                "dns_misses": self.dns_misses,
+            }
+
+
+STATS = TransportStats()
+
+
+class DNSCache:
+    """
+    getaddrinfo() results cached per (host, port) for `ttl` seconds.
+    """
+
+    def __init__(self, ttl=DNS_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def resolve(self, host, port):
+        key = (host, port)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                STATS.add("dns_hits")
+                return entry[1]
+
+        STATS.add("dns_misses")
+        infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        with self._lock:
+            self._entries[key] = (now + self.ttl, addresses)
+        return addresses
+
+
+_dns_cache = None
+_original_create_connection = urllib3.util.connection.create_connection
+
+
+def _create_connection(address, *args, **kwargs):
+    # every call here is a brand new TCP connection
+    STATS.add("new_connections")
+    host, port = address
+    if _dns_cache is None:
+        return _original_create_connection(address, *args, **kwargs)
+
+    error = None
+    for ip in _dns_cache.resolve(host, port):
+        try:
+            return _original_create_connection((ip, port), *args, **kwargs)
+        except OSError as e:
+            error = e
+    raise error or OSError(f"could not connect to {host}:{port}")
+
+
+def install_connection_hook(dns_ttl=DNS_CACHE_TTL):
+    """
+    Route urllib3 connections through the DNS cache and connection counter.
+    TLS still verifies the original host name, only the lookup is cached.
+    """
+    global _dns_cache
+    if dns_ttl and _dns_cache is None:
+        _dns_cache = DNSCache(dns_ttl)
+    urllib3.util.connection.create_connection = _create_connection
+
+
+def _to_requests_response(response):
+    # httpx response -> requests.Response so callers only see one API
+    result = requests.Response()
+    result.status_code = response.status_code
+    result.headers = CaseInsensitiveDict(response.headers)
+    result._content = response.content
+    result.url = str(response.url)
+    result.reason = response.reason_phrase
+    result.encoding = response.encoding
+    result.elapsed = response.elapsed
+    # redirects followed on the way, oldest first (the HTTP cache skips redirected responses)
+    result.history = [_to_requests_response(hop) for hop in response.history]
+    return result
+
+
+class Transport:
+    """
+    Pooled HTTP client. Use one instance for the whole process
+    (see get_transport()) so connections are reused between pages.
+    """
+
+    def __init__(self, http2=False, pool_connections=POOL_CONNECTIONS,
+                 pool_maxsize=POOL_MAXSIZE, dns_ttl=DNS_CACHE_TTL):
+        self.http2 = bool(http2 and httpx is not None and h2 is not None)
+        if http2 and not self.http2:
+            print("Warning: httpx or h2 is not installed, HTTP/2 disabled (pip install \"httpx[http2]\")")
+
+        install_connection_hook(dns_ttl)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.client = None
+        if self.http2:
+            limits = httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize)
+            self.client = httpx.Client(http2=True, limits=limits)
+
+    def get(self, url, params=None, headers=None, timeout=30, allow_redirects=True):
+        """
+        GET through the pool.
+        Returns:
+          - requests.Response (also for HTTP/2)
+        Raises:
+          - requests.exceptions.RequestException on network errors
+        """
+        if self.client is None:
+            STATS.add("requests")
+            return self.session.get(
+                url, params=params, headers=headers, timeout=timeout,
+                allow_redirects=allow_redirects,
+            )
+
+        STATS.add("http2_requests")
+        try:
+            response = self.client.get(
+                url, params=params, headers=headers, timeout=timeout,
+                follow_redirects=allow_redirects,
+            )
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e)) from e
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ConnectionError(str(e)) from e
+
+        return _to_requests_response(response)
+
+    def stats(self):
+        return STATS.snapshot()
+
+    def close(self):
+        self.session.close()
+        if self.client is not None:
+            self.client.close()
+
+
+_default_transport = None
+_default_lock = threading.Lock()
+
+
+def get_transport(**kwargs):
+    """
+    Process-wide transport; kwargs are only used on the first call.
+    """
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = Transport(**kwargs)
+        return _default_transport
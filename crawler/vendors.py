@@ -0,0 +1,39 @@
+"""
+helpers for vendor records inside finalResult
+"""
+
+
+def iter_vendors(final_result):
+    """
+    Yield the vendor dict of every finalResult entry.
+    Entries look like {"type": "VENDOR", "data": {...}}; bare dicts are accepted too.
+    """
+    for item in final_result:
+        if not isinstance(item, dict):
+            continue
+        vendor = item.get("data", item)
+        if isinstance(vendor, dict):
+            yield vendor
+
+
+def vendor_id(vendor):
+    """
+    Stable vendor identifier (id, then vendorCode / code), or None.
+    """
+    for key in ("id", "vendorCode", "code"):
+        value = vendor.get(key)
+        if value not in (None, ""):
+            return str(value)
+    return None
+
+
+def vendor_location(vendor):
+    """
+    (lat, lng) of a vendor as floats, or None when missing.
+    """
+    lat = next((vendor[k] for k in ("lat", "latitude") if vendor.get(k) not in (None, "")), None)
+    lng = next((vendor[k] for k in ("lon", "lng", "long", "longitude") if vendor.get(k) not in (None, "")), None)
+    try:
+        return float(lat), float(lng)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,233 @@
+"""
+shared work queue for crawling with several workers
+  - workers lease one coordinate at a time from the frontier and crawl it
+    from its first unfinished page; a heartbeat keeps the lease alive
+  - leases of killed workers expire after LEASE_SECONDS and their
+    coordinates are picked up by the next worker that asks
+  - processes on one machine share outputs/frontier.db directly;
+    other machines reach it through the queue server (HTTP)
+  - every worker writes to the same sink (unique file / segment names)
+
+usage:
+  py run.py --worker                                   (one per process)
+  py -m crawler.workqueue --host 0.0.0.0 --port 8765   (on the queue machine,
+                                                        also --fresh / --replay-dead)
+  py run.py --queue http://queue-host:8765             (on other machines)
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from .client import search
+from .config import LEASE_SECONDS, LEASE_POLL_SECONDS, QUEUE_HOST, QUEUE_PORT
+from .coordinates import open_coordinates
+from .frontier import Frontier
+from .sinks import HOST
+
+# frontier methods a remote worker may call; the queue is not authenticated,
+# so reset() and replay_dead() are only run on the queue machine (see main())
+REMOTE_METHODS = {
+    "add_coordinates", "recover", "pending_coordinates", "count_pending", "lease", "renew", "release", "leases",
+    "next_page", "mark", "forget_page", "dead_letter", "dead_letters", "finish_coordinate",
+    "coordinate_stats", "crawl_pass", "get_setting", "set_setting", "setdefault_setting", "summary",
+}
+
+
+def default_worker_id():
+    return f"{HOST}-{os.getpid()}"
+
+
+class Heartbeat:
+    """
+    Renews the lease of the coordinate being crawled every `seconds` / 3.
+    `lost` is set once another worker took the coordinate over; search()
+    leaves the coordinate at the next page.
+    """
+
+    def __init__(self, frontier, lat, long, worker, seconds=LEASE_SECONDS):
+        self.frontier = frontier
+        self.lat, self.long = lat, long
+        self.worker = worker
+        self.seconds = seconds
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lease-heartbeat", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.seconds / 3):
+            try:
+                if not self.frontier.renew(self.lat, self.long, self.worker, self.seconds):
+                    self.lost = True
+                    print(f"Lease on ({self.lat}, {self.long}) expired and was taken over")
+                    return
+            except Exception as e:
+                print(f"Could not renew lease on ({self.lat}, {self.long}): {e}")
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_worker(frontier, context, worker=None, seconds=LEASE_SECONDS, poll=LEASE_POLL_SECONDS):
+    """
+    Lease and crawl coordinates until none are left.
+    While other workers still hold leases, wait for them: a lease that
+    expires (dead worker) comes back to the queue.
+    Returns:
+      - number of coordinates crawled by this worker
+    """
+    worker = worker or default_worker_id()
+    crawled = 0
+    while True:
+        coordinate = frontier.lease(worker, seconds)
+        if coordinate is None:
+            leased = frontier.summary()["leased"]
+            if not leased:
+                break
+            print(f"No free coordinates, {leased} leased by other workers; asking again in {poll} seconds...")
+            context.clock.sleep(poll)
+            continue
+
+        lat, lng = coordinate
+        print(f"\n{'=' * 60}")
+        print(f"Worker {worker} leased coordinate ({lat}, {lng})")
+        print(f"{'=' * 60}")
+        heartbeat = Heartbeat(frontier, lat, lng, worker, seconds)
+        try:
+            search(lat, lng, context, lease=heartbeat)
+            # pages queued in a background writer are marked done before the lease goes
+            context.sink.flush()
+        finally:
+            heartbeat.stop()
+            if not heartbeat.lost:
+                frontier.release(lat, lng, worker)
+        crawled += 1
+    return crawled
+
+
+class RemoteFrontier:
+    """
+    Frontier proxy for workers on other machines (see serve_queue()).
+    Used from the crawl, writer and heartbeat threads: one session per thread.
+    """
+
+    def __init__(self, url, timeout=30, retries=3):
+        self.url = url.rstrip("/") + "/call"
+        self.timeout = timeout
+        self.retries = retries
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _call(self, method, *args):
+        for attempt in range(1, self.retries + 1):
+            try:
+                response = self.session.post(
+                    self.url, json={"method": method, "args": args}, timeout=self.timeout
+                )
+                if response.status_code == 400:
+                    # the frontier call itself failed: retrying will not help
+                    raise RuntimeError(f"queue server: {response.json()['error']}")
+                response.raise_for_status()
+                return response.json()["result"]
+            except requests.exceptions.RequestException as e:
+                if attempt == self.retries:
+                    raise
+                print(f"Queue server unreachable ({e}), retrying in {2 ** attempt} seconds...")
+                time.sleep(2 ** attempt)
+
+    def __getattr__(self, method):
+        if method not in REMOTE_METHODS:
+            raise AttributeError(method)
+        return lambda *args: self._call(method, *args)
+
+    def lease(self, worker, seconds):
+        result = self._call("lease", worker, seconds)
+        return tuple(result) if result else None
+
+    def pending_coordinates(self, limit=None):
+        return [tuple(c) for c in self._call("pending_coordinates", limit)]
+
+    def close(self):
+        self.session.close()
+
+
+def serve_queue(frontier, port=QUEUE_PORT, host=QUEUE_HOST):
+    """
+    Serve the frontier to remote workers (POST /call {"method", "args"}).
+    Returns:
+      - the HTTP server (serve_forever() runs it)
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_POST(self):
+            if self.path != "/call":
+                self.send_error(404)
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                if request["method"] not in REMOTE_METHODS:
+                    raise ValueError(f"unknown method {request['method']}")
+                result = getattr(frontier, request["method"])(*request.get("args", []))
+                body, status = json.dumps({"result": result}).encode("utf-8"), 200
+            except Exception as e:
+                body, status = json.dumps({"error": str(e)}).encode("utf-8"), 400
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    print(f"Work queue at http://{host}:{server.server_address[1]}")
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="work queue server for remote crawler workers")
+    parser.add_argument("--coordinates", default=None,
+                        help="coordinates file: .env lines (e.g. from crawler.planner), .csv, .ndjson or .geojson")
+    parser.add_argument("--host", default=QUEUE_HOST, help="listen address (0.0.0.0 for other machines)")
+    parser.add_argument("--port", type=int, default=QUEUE_PORT)
+    parser.add_argument("--fresh", action="store_true", help="ignore saved progress and start from scratch")
+    parser.add_argument("--replay-dead", action="store_true", help="retry the pages in the dead-letter queue")
+    args = parser.parse_args()
+
+    frontier = Frontier()
+    if args.fresh:
+        frontier.reset()
+    if args.replay_dead:
+        print(f"Replaying {frontier.replay_dead()} dead-lettered pages")
+    coordinates = open_coordinates(args.coordinates)
+    added = frontier.add_coordinates(coordinates)
+    print(f"Queue: {added} new coordinates ({coordinates.stats}), {frontier.summary()}")
+
+    server = serve_queue(frontier, args.port, args.host)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping work queue...")
+    finally:
+        server.server_close()
+        print(f"Frontier: {frontier.summary()}")
+        frontier.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+background writer
+  - fetchers hand pages to a bounded queue and go back to fetching
+  - one writer thread drains the queue in batches into the real sink
+  - a full queue blocks the fetchers (backpressure)
+  - storage errors are retried here and never cause another API request
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+
+from .config import (
+    OUTPUT_DIR,
+    WRITER_QUEUE_SIZE,
+    WRITER_BATCH_SIZE,
+    WRITER_BATCH_SECONDS,
+    WRITER_FSYNC,
+    WRITER_FSYNC_SECONDS,
+    WRITER_RETRIES,
+)
+from .client import METRICS
+from .frontier import DONE, FAILED
+from .sinks import Sink
+
+_STOP = object()
+
+
+class BackgroundWriter(Sink):
+    """
+    Sink wrapper that persists pages on a dedicated thread.
+    fsync policy:
+      - "batch": sync the sink after every batch
+      - "interval": sync at most every `fsync_seconds`
+      - "never": leave it to the OS
+    Pages are marked done in the frontier only after they are written,
+    and only then do their vendor ids join the dedup `index`.
+    """
+
+    deferred = True
+
+    def __init__(
+        self,
+        sink,
+        frontier=None,
+        index=None,
+        queue_size=WRITER_QUEUE_SIZE,
+        batch_size=WRITER_BATCH_SIZE,
+        batch_seconds=WRITER_BATCH_SECONDS,
+        fsync=WRITER_FSYNC,
+        fsync_seconds=WRITER_FSYNC_SECONDS,
+        retries=WRITER_RETRIES,
+        spill_dir=os.path.join(OUTPUT_DIR, "unwritten"),
+    ):
+        self.sink = sink
+        self.frontier = frontier
+        self.index = index
+        self.batch_size = batch_size
+        self.batch_seconds = batch_seconds
+        self.fsync = fsync
+        self.fsync_seconds = fsync_seconds
+        self.retries = retries
+        self.spill_dir = spill_dir
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.written = 0
+        self.failed = 0
+        self.blocked_seconds = 0.0
+        self._last_sync = time.monotonic()
+        if fsync != "never":
+            sink.enable_sync()
+        self._thread = threading.Thread(target=self._run, name="page-writer", daemon=True)
+        self._thread.start()
+
+    def write_page(self, data, lat, long, page):
+        """
+        Queue a page; blocks while the queue is full.
+        """
+        started = time.monotonic()
+        self.queue.put((data, lat, long, page))
+        self.blocked_seconds += time.monotonic() - started
+        return f"write queue ({self.queue.qsize()}/{self.queue.maxsize})"
+
+    def _next_batch(self):
+        item = self.queue.get()
+        batch = [item]
+        deadline = time.monotonic() + self.batch_seconds
+        while item is not _STOP and len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            stop = batch[-1] is _STOP
+            pages = [item for item in batch if item is not _STOP]
+
+            written = [item for item in pages if self._write(item)]
+            self._sync(force=stop)
+            for _, lat, long, page in written:
+                self._done(lat, long, page)
+
+            for _ in batch:
+                self.queue.task_done()
+            if stop:
+                return
+
+    def _write(self, item):
+        data, lat, long, page = item
+        error = None
+        for attempt in range(self.retries + 1):
+            try:
+                with METRICS.timer("phase_seconds", phase="store"):
+                    self.sink.write_page(data, lat, long, page)
+                self.written += 1
+                return True
+            except Exception as e:
+                error = e
+                print(f"Storage error ({lat}, {long}, p{page}), attempt {attempt + 1}: {e}")
+                time.sleep(min(2 ** attempt, 30))
+
+        self.failed += 1
+        self._spill(item, error)
+        return False
+
+    def _spill(self, item, error):
+        # last resort: keep the fetched page so it does not have to be requested again
+        data, lat, long, page = item
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            filename = os.path.join(self.spill_dir, f"result_{lat}_{long}_p{page}.json")
+            with open(filename, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            print(f"Page spilled to {filename}")
+            self._done(lat, long, page, f"spilled: {error}")
+        except Exception as e:
+            print(f"Could not spill page ({lat}, {long}, p{page}): {e}")
+            if self.frontier:
+                self.frontier.mark(lat, long, page, FAILED, f"storage: {error}")
+            if self.index is not None:
+                self.index.discard((lat, long, page))
+
+    def _done(self, lat, long, page, error=None):
+        if self.frontier:
+            self.frontier.mark(lat, long, page, DONE, error)
+        if self.index is not None:
+            self.index.commit((lat, long, page))
+
+    def _sync(self, force=False):
+        if self.fsync == "never":
+            return
+        if self.fsync == "interval" and not force:
+            if time.monotonic() - self._last_sync < self.fsync_seconds:
+                return
+        try:
+            with METRICS.timer("phase_seconds", phase="fsync"):
+                self.sink.sync()
+        except Exception as e:
+            print(f"fsync failed: {e}")
+        self._last_sync = time.monotonic()
+
+    def flush(self):
+        """
+        Wait until everything queued so far is written.
+        """
+        self.queue.join()
+
+    def stats(self):
+        return {
+            "written": self.written,
+            "failed": self.failed,
+            "queued": self.queue.qsize(),
+            "blocked_seconds": round(self.blocked_seconds, 3),
+        }
+
+    def close(self):
+        self.queue.put(_STOP)
+        self._thread.join()
+        self.sink.close()